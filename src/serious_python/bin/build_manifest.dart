@@ -0,0 +1,81 @@
+import 'dart:convert';
+import 'dart:io';
+
+import 'package:crypto/crypto.dart';
+import 'package:path/path.dart' as path;
+
+// Build manifests record the inputs a previous `package` run produced its
+// output from, so a rerun with the same inputs can skip that work. Bump
+// [manifestVersion] whenever what a manifest key covers changes; older
+// manifests are then ignored and everything is rebuilt once.
+const manifestVersion = 1;
+
+/// Stable digest of a JSON-encodable description of build inputs.
+String hashKey(Object? inputs) =>
+    sha256.convert(utf8.encode(jsonEncode(inputs))).toString();
+
+/// sha256 of every file under [dir], keyed by its POSIX path relative to
+/// [dir]. At most [jobs] files are open at a time, well under the default
+/// descriptor limit (256 on macOS) even for a large site-packages.
+Future<Map<String, String>> hashTree(Directory dir, {int jobs = 16}) async {
+  final files = await dir
+      .list(recursive: true, followLinks: false)
+      .where((e) => e is File)
+      .cast<File>()
+      .toList();
+  final digests = List<String>.filled(files.length, "");
+  await forEachBounded(Iterable<int>.generate(files.length), jobs, (i) async {
+    digests[i] = (await sha256.bind(files[i].openRead()).first).toString();
+  });
+  return {
+    for (var i = 0; i < files.length; i++)
+      _posixRelative(files[i].path, dir.path): digests[i]
+  };
+}
+
+/// Run [action] for each of [items], at most [limit] at a time.
+Future<void> forEachBounded<T>(
+    Iterable<T> items, int limit, Future<void> Function(T) action) async {
+  final iterator = items.iterator;
+  Future<void> worker() async {
+    while (iterator.moveNext()) {
+      await action(iterator.current);
+    }
+  }
+
+  await Future.wait([for (var i = 0; i < limit; i++) worker()]);
+}
+
+String _posixRelative(String filePath, String from) =>
+    path.posix.joinAll(path.split(path.relative(filePath, from: from)));
+
+/// The manifest in [file], or null if it is missing, unreadable or from
+/// another [manifestVersion].
+Future<Map<String, dynamic>?> readManifest(File file) async {
+  if (!await file.exists()) return null;
+  try {
+    final data = jsonDecode(await file.readAsString());
+    if (data is Map<String, dynamic> && data["version"] == manifestVersion) {
+      return data;
+    }
+  } on FormatException {
+    // corrupt (e.g. interrupted write): treat as absent
+  }
+  return null;
+}
+
+/// Write [data] as the manifest in [file], atomically.
+Future<void> writeManifest(File file, Map<String, dynamic> data) async {
+  await file.parent.create(recursive: true);
+  final tmp = File("${file.path}.tmp");
+  await tmp.writeAsString(jsonEncode({"version": manifestVersion, ...data}));
+  await tmp.rename(file.path);
+}
+
+/// Delete the manifest in [file], if any — done before rebuilding what it
+/// describes, so an interrupted build is never mistaken for a current one.
+Future<void> invalidateManifest(File file) async {
+  if (await file.exists()) {
+    await file.delete();
+  }
+}
@@ -1,10 +1,14 @@
 import 'dart:async';
 import 'dart:io';
 
+import 'package:crypto/crypto.dart';
 import 'package:path/path.dart' as path;
 
-Future<void> mergeMacOsSitePackages(String arm64Path, String x86_64Path,
-    String targetPath, bool verbose) async {
+import 'build_manifest.dart' show forEachBounded;
+
+Future<void> mergeMacOsSitePackages(
+    String arm64Path, String x86_64Path, String targetPath, bool verbose,
+    {int? jobs, String? cachePath}) async {
   final arm64Dir = Directory(arm64Path);
   final x86_64Dir = Directory(x86_64Path);
   final targetDir = Directory(targetPath);
@@ -23,7 +27,8 @@ Future<void> mergeMacOsSitePackages(String arm64Path, String x86_64Path,
     await copyDirectory(arm64Dir, targetDir);
   } else if (await arm64Dir.exists() && await x86_64Dir.exists()) {
     stdout.writeln('Merging macOS arm64 and x86_64 site-packages');
-    await mergeDirs(arm64Dir, x86_64Dir, targetDir, verbose);
+    await mergeDirs(arm64Dir, x86_64Dir, targetDir, verbose,
+        jobs: jobs, cacheDir: cachePath != null ? Directory(cachePath) : null);
   } else {
     stdout.writeln('Cannot merge macOS packages. No arch directories found.');
     exit(1);
@@ -40,51 +45,114 @@ Future<void> mergeMacOsSitePackages(String arm64Path, String x86_64Path,
   stdout.writeln('Merging completed successfully.');
 }
 
+/// Merges [arm64Dir] and [x86_64Dir] into [targetDir]: files that are
+/// byte-identical in both trees are copied once, `.so` files that differ are
+/// `lipo`'d into universal binaries, [jobs] files at a time (default: the
+/// number of CPUs). With [cacheDir], merged binaries are kept there keyed by
+/// the hashes of both inputs, so a later build with the same wheels copies
+/// them instead of running `lipo` again.
 Future<void> mergeDirs(Directory arm64Dir, Directory x86_64Dir,
-    Directory targetDir, bool verbose) async {
+    Directory targetDir, bool verbose,
+    {int? jobs, Directory? cacheDir}) async {
   // Create the destination directory if it doesn't exist
   if (!await targetDir.exists()) {
     await targetDir.create(recursive: true);
   }
 
-  // Iterate over the items in the arm64 directory
-  await for (var item in arm64Dir.list(recursive: true)) {
-    final x8664Itempath = path.join(
-        x86_64Dir.path, path.relative(item.path, from: arm64Dir.path));
-    final targetItemPath = path.join(
-        targetDir.path, path.relative(item.path, from: arm64Dir.path));
+  final files = await arm64Dir
+      .list(recursive: true)
+      .where((item) => item is File)
+      .cast<File>()
+      .toList();
+
+  var identical = 0;
+  var lipoed = 0;
+  var fromCache = 0;
+
+  Future<void> mergeFile(File item) async {
+    final relativePath = path.relative(item.path, from: arm64Dir.path);
+    final x8664Item = File(path.join(x86_64Dir.path, relativePath));
+    final targetItemPath = path.join(targetDir.path, relativePath);
+
+    if (!await File(targetItemPath).parent.exists()) {
+      await File(targetItemPath).parent.create(recursive: true);
+    }
+
+    // Only in the arm64 tree: nothing to merge it with.
+    if (!await x8664Item.exists()) {
+      if (verbose) {
+        stdout.writeln('Copying ${item.path}...');
+      }
+      await item.copy(targetItemPath);
+      return;
+    }
+
+    final hashes = await Future.wait([_hashFile(item), _hashFile(x8664Item)]);
+    if (hashes[0] == hashes[1]) {
+      // Pure-Python files, data, and wheels that already ship universal2.
+      identical++;
+      await item.copy(targetItemPath);
+      return;
+    }
+
+    if (!item.path.endsWith('.so')) {
+      // Copy non-.so files
+      if (verbose) {
+        stdout.writeln('Copying ${item.path}...');
+      }
+      await item.copy(targetItemPath);
+      return;
+    }
+
+    final cacheFile = cacheDir != null
+        ? File(path.join(cacheDir.path, '${hashes[0]}-${hashes[1]}.so'))
+        : null;
+    if (cacheFile != null && await cacheFile.exists()) {
+      if (verbose) {
+        stdout.writeln('${item.path}: universal binary from cache');
+      }
+      fromCache++;
+      await cacheFile.copy(targetItemPath);
+      return;
+    }
 
-    if (item is File) {
-      if (!await File(targetItemPath).parent.exists()) {
-        await File(targetItemPath).parent.create(recursive: true);
+    if (await isUniversalBinary(item.path)) {
+      if (verbose) {
+        stdout.writeln(
+            '${item.path} is already a universal binary. Copying...');
       }
-      if (item.path.endsWith('.so')) {
-        if (await isUniversalBinary(item.path)) {
-          if (verbose) {
-            stdout.writeln(
-                '${item.path} is already a universal binary. Copying...');
-          }
-          await item.copy(targetItemPath);
-        } else if (await isUniversalBinary(x8664Itempath)) {
-          if (verbose) {
-            stdout.writeln(
-                '${item.path} is already a universal binary. Copying...');
-          }
-          await File(x8664Itempath).copy(targetItemPath);
-        } else {
-          if (verbose) {
-            stdout.writeln("Lipo'ing ${item.path} and $x8664Itempath...");
-          }
-          await lipo(item.path, x8664Itempath, targetItemPath);
-        }
-      } else {
-        // Copy non-.so files
-        if (verbose) {
-          stdout.writeln('Copying ${item.path}...');
-        }
-        await item.copy(targetItemPath);
+      await item.copy(targetItemPath);
+      return;
+    } else if (await isUniversalBinary(x8664Item.path)) {
+      if (verbose) {
+        stdout.writeln(
+            '${item.path} is already a universal binary. Copying...');
       }
+      await x8664Item.copy(targetItemPath);
+      return;
+    }
+
+    if (verbose) {
+      stdout.writeln("Lipo'ing ${item.path} and ${x8664Item.path}...");
     }
+    await lipo(item.path, x8664Item.path, targetItemPath);
+    lipoed++;
+
+    if (cacheFile != null && await File(targetItemPath).exists()) {
+      // Write under a temporary name and rename, so an interrupted or
+      // concurrent build never sees a partial binary.
+      await cacheDir!.create(recursive: true);
+      final tmp = File('${cacheFile.path}.$pid.tmp');
+      await File(targetItemPath).copy(tmp.path);
+      await tmp.rename(cacheFile.path);
+    }
+  }
+
+  await forEachBounded(files, jobs ?? Platform.numberOfProcessors, mergeFile);
+
+  if (verbose) {
+    stdout.writeln('Merged ${files.length} files: $identical identical, '
+        '$lipoed lipo\'d, $fromCache from cache');
   }
 }
 
@@ -115,3 +183,6 @@ Future<void> lipo(
   await Process.run(
       'lipo', ['-create', '-output', outputPath, arm64Path, x86_64Path]);
 }
+
+Future<String> _hashFile(File file) async =>
+    (await sha256.bind(file.openRead()).first).toString();
@@ -12,8 +12,11 @@ import 'package:shelf/shelf.dart';
 import 'package:serious_python/src/python_versions.dart';
 import 'package:shelf/shelf_io.dart' as shelf_io;
 
+import 'build_manifest.dart';
 import 'macos_utils.dart' as macos_utils;
 import 'sitecustomize.dart';
+import 'treeshake.dart';
+import 'web_bundle.dart';
 
 const mobilePyPiUrl = "https://pypi.flet.dev";
 const pyodideLockFile = "pyodide-lock.json";
@@ -42,6 +45,18 @@ const allowSourceDistrosEnvironmentVariable =
 const darwinSpmEnvironmentVariable = "SERIOUS_PYTHON_DARWIN_SPM";
 const darwinDirEnvironmentVariable = "SERIOUS_PYTHON_DARWIN_DIR";
 const spmKeyFileEnvironmentVariable = "SERIOUS_PYTHON_SPM_KEY_FILE";
+// Python side of `package:serious_python/bridge.dart`, shipped in this
+// package's `python/` dir and bundled into every native app.
+const bridgeHelpersPackage = "sp_bridge";
+// Build manifests (in the project's `build/` dir) recording what the last run
+// installed and staged, so unchanged arches and app files are skipped.
+const sitePackagesManifestFile = ".serious_python_site_packages.json";
+const appManifestFile = ".serious_python_app.json";
+// Drop list written by `--tree-shake` at the root of the site-packages dir:
+// top-level modules the Android build leaves out of stdlib.zip,
+// sitepackages.zip and jniLibs. Keep the name and `sp-treeshake/1` header in
+// sync with `treeShakeFile` in serious_python_android's build.gradle.kts.
+const treeShakeFile = ".sp_treeshake";
 
 // Python runtime version data — `defaultPythonVersion`, `pythonReleases`, the
 // `*EnvironmentVariable` names, `dartBridgeVersion`, `pythonReleaseDate` — lives
@@ -112,8 +127,12 @@ const junkFilesMobile = [
 
 class PackageCommand extends Command {
   bool _verbose = false;
+  int _jobs = 1;
+  bool _offline = false;
+  List<String> _compileOptions = const [];
   Directory? _buildDir;
   Directory? _pythonDir;
+  Future<void>? _pythonReady;
   late String _pythonShortVersion;
   late PythonRelease _release;
 
@@ -172,6 +191,20 @@ class PackageCommand extends Command {
     argParser.addFlag("compile-packages",
         help: "Compile application packages before packaging.",
         negatable: false);
+    argParser.addOption("compile-optimize",
+        help: "Optimization level of the compiled bytecode: 1 strips assert "
+            "statements, 2 also strips docstrings.",
+        allowed: ["0", "1", "2"],
+        defaultsTo: "0");
+    argParser.addOption("compile-invalidation",
+        help: "How compiled bytecode is checked against its source. The hash "
+            "modes make .pyc files independent of file modification times, "
+            "so unchanged sources compile to identical files.",
+        allowed: ["timestamp", "checked-hash", "unchecked-hash"],
+        defaultsTo: "timestamp");
+    argParser.addOption("compile-workers",
+        help: "Processes to compile Python sources with. Defaults to the "
+            "number of CPUs.");
     argParser.addFlag("cleanup",
         help:
             "Cleanup app and packages from unneccessary files and directories.",
@@ -186,6 +219,35 @@ class PackageCommand extends Command {
         negatable: false);
     argParser.addMultiOption('cleanup-package-files',
         help: "List of globs to delete extra packages files and directories.");
+    argParser.addFlag("web-chunks",
+        help: "Web: also write the app as content-addressed chunks and a "
+            "<asset>.chunks.json manifest next to the app archive, so "
+            "browsers re-download only the chunks that changed.",
+        negatable: false);
+    argParser.addFlag("tree-shake",
+        help: "Android: leave stdlib and site-packages modules the app can't "
+            "import out of the bundle.",
+        negatable: false);
+    argParser.addMultiOption('tree-shake-keep',
+        help: "Modules to keep when tree shaking, for imports the analysis "
+            "can't see (e.g. `importlib.import_module(name)`).");
+    argParser.addMultiOption('import-trace',
+        help: "sp_import_profile.json files recorded with "
+            "SERIOUS_PYTHON_IMPORT_PROFILE; every module they list is kept "
+            "when tree shaking.");
+    argParser.addOption("jobs",
+        abbr: "j",
+        help: "Maximum number of architectures to install packages for, "
+            "or macOS binaries to merge, concurrently. Defaults to the "
+            "number of CPUs.");
+    argParser.addFlag("offline",
+        help: "Install packages from the local wheelhouse cache only, without "
+            "network access. Fails if anything is not cached.",
+        negatable: false);
+    argParser.addFlag("force",
+        help: "Ignore build manifests: reinstall all packages and reprocess "
+            "the whole app.",
+        negatable: false);
     argParser.addFlag("verbose", help: "Verbose output.", negatable: false);
   }
 
@@ -203,6 +265,7 @@ class PackageCommand extends Command {
 
     Directory? tempDir;
     HttpServer? pyodidePyPiServer;
+    var failed = false;
 
     try {
       final currentPath = Directory.current.path;
@@ -222,7 +285,38 @@ class PackageCommand extends Command {
       List<String> cleanupAppFiles = argResults?['cleanup-app-files'];
       bool cleanupPackages = argResults?["cleanup-packages"];
       List<String> cleanupPackageFiles = argResults?['cleanup-package-files'];
+      bool force = argResults?["force"];
+      bool treeShake = argResults?["tree-shake"];
+      bool webChunks = argResults?["web-chunks"];
+      List<String> treeShakeKeep = argResults?['tree-shake-keep'];
+      List<String> importTraces = argResults?['import-trace'];
+      String? jobsArg = argResults?["jobs"];
       _verbose = argResults?["verbose"];
+      _offline = argResults?["offline"];
+      _jobs = jobsArg != null
+          ? int.tryParse(jobsArg) ?? 0
+          : Platform.numberOfProcessors;
+      if (_jobs < 1) {
+        stderr.writeln("--jobs must be a positive integer, got $jobsArg");
+        exit(2);
+      }
+      String? compileWorkersArg = argResults?["compile-workers"];
+      final compileWorkers = compileWorkersArg != null
+          ? int.tryParse(compileWorkersArg) ?? 0
+          : Platform.numberOfProcessors;
+      if (compileWorkers < 1) {
+        stderr.writeln("--compile-workers must be a positive integer, "
+            "got $compileWorkersArg");
+        exit(2);
+      }
+      _compileOptions = [
+        "-o",
+        argResults?["compile-optimize"],
+        "--invalidation-mode",
+        argResults?["compile-invalidation"],
+        "-j",
+        "$compileWorkers",
+      ];
 
       _pythonShortVersion = argResults?['python-version'] ??
           Platform.environment[pythonVersionEnvironmentVariable] ??
@@ -279,20 +373,25 @@ class PackageCommand extends Command {
 
       var junkFiles = isMobile ? junkFilesMobile : junkFilesDesktop;
 
+      // ensure standard Dart/Flutter "build" directory exists
+      _buildDir = Directory(path.join(currentPath, "build"));
+      if (!await _buildDir!.exists()) {
+        await _buildDir!.create();
+      }
+
       // Extra indexs
       List<String> extraPyPiIndexes = [mobilePyPiUrl];
-      if (platform == "Emscripten") {
+      if (platform == "Emscripten" && !_offline) {
         pyodidePyPiServer = await startSimpleServer();
         extraPyPiIndexes.add(
             "http://${pyodidePyPiServer.address.host}:${pyodidePyPiServer.port}/simple");
       }
 
-      stdout.writeln("Extra PyPi indexes: $extraPyPiIndexes");
-
-      // ensure standard Dart/Flutter "build" directory exists
-      _buildDir = Directory(path.join(currentPath, "build"));
-      if (!await _buildDir!.exists()) {
-        await _buildDir!.create();
+      if (_offline) {
+        stdout.writeln("Offline: installing packages from the wheelhouse "
+            "cache only");
+      } else {
+        stdout.writeln("Extra PyPi indexes: $extraPyPiIndexes");
       }
 
       // asset path (only the web/Emscripten target produces an `app.zip` asset;
@@ -320,25 +419,9 @@ class PackageCommand extends Command {
       await copyDirectory(sourceDir, tempDir, sourceDir.path,
           exclude.map((s) => s.trim()).toList());
 
-      // compile all python code
-      if (compileApp) {
-        stdout.writeln("Compiling Python sources in a temp directory");
-        await runPython(['-m', 'compileall', '-b', tempDir.path]);
-
-        verbose("Deleting original .py files");
-        await cleanupDir(tempDir, ["**.py"]);
-      }
-
-      // cleanup
-      if (cleanupApp || cleanup) {
-        var allJunkFiles = [...junkFiles, ...cleanupAppFiles];
-        if (_verbose) {
-          verbose(
-              "Delete unnecessary app files and directories: $allJunkFiles");
-        } else {
-          stdout.writeln(("Cleanup app"));
-        }
-        await cleanupDir(tempDir, allJunkFiles);
+      // bundle the bridge helpers next to the app (dart_bridge is native-only)
+      if (!isWeb) {
+        await _bundleBridgeHelpers(currentPath, tempDir);
       }
 
       // site-packages root
@@ -362,39 +445,212 @@ class PackageCommand extends Command {
               ? appPackageRootEnv
               : null;
 
+      // Everything besides the source files themselves that decides what the
+      // app output looks like. Web bundles site-packages into the same zip,
+      // so their inputs count too.
+      final installPackages = requirements.isNotEmpty && !skipSitePackages;
+      final appKey = hashKey({
+        "platform": platform,
+        "python": _release.standaloneVersion,
+        "compile": compileApp ? _compileKey : false,
+        "cleanup": (cleanupApp || cleanup)
+            ? [...junkFiles, ...cleanupAppFiles]
+            : null,
+        "output": isWeb ? dest.absolute.path : appPackageRoot,
+        if (isWeb && requirements.isNotEmpty)
+          "packages": await _requirementsKey(currentPath, requirements),
+        if (isWeb) "chunks": webChunks,
+      });
+      final appManifest = File(path.join(_buildDir!.path, appManifestFile));
+      final appSources = await hashTree(tempDir);
+      final previousApp = force ? null : await readManifest(appManifest);
+      Map<String, String>? previousSources;
+      if (previousApp != null &&
+          previousApp["key"] == appKey &&
+          (isWeb
+              ? await dest.exists() &&
+                  (!webChunks ||
+                      await File(chunksManifestPath(dest)).exists())
+              : appPackageRoot != null &&
+                  await Directory(appPackageRoot).exists())) {
+        previousSources = (previousApp["files"] as Map).cast<String, String>();
+      }
+      final changedSources = {
+        for (final e in appSources.entries)
+          if (previousSources?[e.key] != e.value) e.key
+      };
+      final removedSources = previousSources == null
+          ? <String>{}
+          : previousSources.keys.toSet().difference(appSources.keys.toSet());
+      final appUpToDate = previousSources != null &&
+          changedSources.isEmpty &&
+          removedSources.isEmpty;
+      await invalidateManifest(appManifest);
+      if (previousSources != null) {
+        if (!isWeb) {
+          // Only changed files go through compile/cleanup and get copied over
+          // the staged app; outputs of changed and removed sources are
+          // dropped from it first.
+          stdout.writeln("App: ${changedSources.length} changed, "
+              "${removedSources.length} removed file(s) since last package");
+          for (final rel in appSources.keys) {
+            if (!changedSources.contains(rel)) {
+              await File(path.join(tempDir.path, rel)).delete();
+            }
+          }
+          for (final rel in [...changedSources, ...removedSources]) {
+            for (final out in [
+              rel,
+              if (compileApp && rel.endsWith(".py")) "${rel}c"
+            ]) {
+              final f = File(path.join(appPackageRoot!, out));
+              if (await f.exists()) await f.delete();
+            }
+          }
+        }
+      }
+
+      // compile all python code
+      if (compileApp && !(isWeb && appUpToDate)) {
+        stdout.writeln("Compiling Python sources in a temp directory");
+        await _compileAll(tempDir.path);
+
+        verbose("Deleting original .py files");
+        await cleanupDir(tempDir, ["**.py"]);
+      }
+
+      // cleanup
+      if (cleanupApp || cleanup) {
+        var allJunkFiles = [...junkFiles, ...cleanupAppFiles];
+        if (_verbose) {
+          verbose(
+              "Delete unnecessary app files and directories: $allJunkFiles");
+        } else {
+          stdout.writeln(("Cleanup app"));
+        }
+        await cleanupDir(tempDir, allJunkFiles);
+      }
+
       // install requirements
-      if (requirements.isNotEmpty && !skipSitePackages) {
+      if (installPackages) {
+        final arches = [
+          for (var arch in platforms[platform]!.entries)
+            if ((archArg.isEmpty || archArg.contains(arch.key)) &&
+                // Only install wheels for ABIs python-build publishes for
+                // this minor (per python-build's manifest `android_abis`);
+                // installing for an unpublished ABI would be wasted work.
+                (platform != "Android" ||
+                    pythonReleases[_pythonShortVersion]!
+                        .androidAbis
+                        .contains(arch.key)))
+              arch
+        ];
+
+        // Per-arch keys over everything that decides an arch's installed
+        // tree. Android/iOS keep one dir per arch, so each is skipped on its
+        // own; elsewhere the arches share (or are merged into) the root, which
+        // is reused only if no arch changed.
+        final requirementsKey =
+            await _requirementsKey(currentPath, requirements);
+        final archKeys = {
+          for (final arch in arches)
+            arch.key: hashKey({
+              "requirements": requirementsKey,
+              "python": _release.standaloneVersion,
+              "platform": platform,
+              "arch": arch.key,
+              "tag": platform == "Emscripten"
+                  ? _release.pyodidePlatformTag
+                  : arch.value["tag"],
+              "mac_ver": arch.value["mac_ver"],
+              "pyodide": isWeb ? _release.pyodideVersion : null,
+              "compile": compilePackages ? _compileKey : false,
+              "cleanup": (cleanupPackages || cleanup)
+                  ? [...junkFiles, ...cleanupPackageFiles]
+                  : null,
+              "sdists": Platform
+                  .environment[allowSourceDistrosEnvironmentVariable],
+              "flutter": Platform
+                  .environment[flutterPackagesFlutterEnvironmentVariable],
+            })
+        };
+        final perArchDirs = platform == "Android" || platform == "iOS";
+        final packagesManifest =
+            File(path.join(_buildDir!.path, sitePackagesManifestFile));
+        final previousPackages =
+            force ? null : await readManifest(packagesManifest);
+        final previousKeys = previousPackages != null &&
+                previousPackages["root"] ==
+                    Directory(sitePackagesRoot).absolute.path
+            ? (previousPackages["arches"] as Map).cast<String, String>()
+            : const <String, String>{};
+        final upToDate = <String>{};
+        if (perArchDirs) {
+          for (final arch in arches) {
+            if (previousKeys[arch.key] == archKeys[arch.key] &&
+                await Directory(path.join(sitePackagesRoot, arch.key))
+                    .exists()) {
+              upToDate.add(arch.key);
+            }
+          }
+        } else if (await Directory(sitePackagesRoot).exists() &&
+            previousKeys.length == archKeys.length &&
+            archKeys.entries.every((e) => previousKeys[e.key] == e.value)) {
+          upToDate.addAll(archKeys.keys);
+        }
+        await invalidateManifest(packagesManifest);
+
         if (await Directory(sitePackagesRoot).exists()) {
           await for (var f in Directory(sitePackagesRoot)
               .list()
               .where((f) => !path.basename(f.path).startsWith("."))) {
-            await f.delete(recursive: true);
+            final keep = perArchDirs
+                ? upToDate.contains(path.basename(f.path))
+                : upToDate.isNotEmpty;
+            if (!keep) {
+              await f.delete(recursive: true);
+            }
           }
         }
 
-        bool flutterPackagesCopied = false;
-        // invoke pip for every platform arch
-        for (var arch in platforms[platform]!.entries) {
-          if (archArg.isNotEmpty && !archArg.contains(arch.key)) {
-            continue;
+        final pending = <MapEntry<String, Map<String, String>>>[];
+        for (var arch in arches) {
+          if (upToDate.contains(arch.key)) {
+            stdout.writeln("Site packages for $platform/${arch.key} are up to "
+                "date, skipping pip install");
+          } else {
+            pending.add(arch);
           }
-          // Only install wheels for ABIs python-build publishes for this
-          // minor (per python-build's manifest `android_abis`); installing
-          // for an unpublished ABI would be wasted work.
-          if (platform == "Android" &&
-              !pythonReleases[_pythonShortVersion]!.androidAbis
-                  .contains(arch.key)) {
-            continue;
+        }
+
+        List<String> pipArgs = ["--disable-pip-version-check"];
+        if (isMobile || isWeb) {
+          pipArgs.addAll(["--only-binary", ":all:"]);
+          if (Platform.environment
+              .containsKey(allowSourceDistrosEnvironmentVariable)) {
+            pipArgs.addAll([
+              "--no-binary",
+              Platform.environment[allowSourceDistrosEnvironmentVariable]!
+            ]);
           }
-          String? sitePackagesDir;
-          Map<String, String>? pipEnv;
-          Directory? sitecustomizeDir;
-
-          try {
-            // customized pip
-            // create temp dir with sitecustomize.py for mobile and web
-            sitecustomizeDir = await Directory.systemTemp
+        }
+        for (var index in extraPyPiIndexes) {
+          pipArgs.addAll(["--extra-index-url", index]);
+        }
+
+        // customized pip: one temp dir with sitecustomize.py per arch, for
+        // mobile and web
+        final pipEnvs = <String, Map<String, String>>{};
+        final installArgs = <String, List<String>>{};
+        final wheelhouses = <String, String>{};
+        final sitecustomizeDirs = <Directory>[];
+        Directory? sharedDir;
+        final offlineMisses = <String>[];
+        try {
+          for (var arch in pending) {
+            final sitecustomizeDir = await Directory.systemTemp
                 .createTemp('serious_python_sitecustomize');
+            sitecustomizeDirs.add(sitecustomizeDir);
             var sitecustomizePath =
                 path.join(sitecustomizeDir.path, "sitecustomize.py");
             if (_verbose) {
@@ -418,9 +674,7 @@ class PackageCommand extends Command {
                 .replaceAll("{tag}", platformTag)
                 .replaceAll("{mac_ver}", arch.value["mac_ver"]!));
 
-            // print(File(sitecustomizePath).readAsStringSync());
-
-            pipEnv = {
+            pipEnvs[arch.key] = {
               "PYTHONPATH":
                   [sitecustomizeDir.path].join(Platform.isWindows ? ";" : ":"),
               // Prevent importing user-site packages (e.g. ~/.local/.../site-packages)
@@ -431,44 +685,105 @@ class PackageCommand extends Command {
               "PIP_REQUIRE_VIRTUALENV": "false",
             };
 
-            sitePackagesDir = arch.key.isNotEmpty
+            // Wheels are downloaded to a persistent wheelhouse per Python
+            // version and platform tag and installed from there; pip prefers
+            // a wheelhouse file over the same release on an index.
+            final wheelhouse = _wheelhouseDir(platform, arch, platformTag);
+            wheelhouses[arch.key] = wheelhouse;
+            if (_offline) {
+              if (!await Directory(wheelhouse).exists()) {
+                offlineMisses.add("--offline: no wheelhouse for "
+                    "$platform/${arch.key} at $wheelhouse. Run package once "
+                    "without --offline to populate it.");
+                continue;
+              }
+              installArgs[arch.key] = [
+                ...pipArgs,
+                '--no-index',
+                '--find-links',
+                wheelhouse
+              ];
+            } else {
+              await Directory(wheelhouse).create(recursive: true);
+              installArgs[arch.key] = [...pipArgs, '--find-links', wheelhouse];
+            }
+          }
+
+          if (offlineMisses.isNotEmpty) {
+            // thrown, not exit(1), so the finally below removes the temp dirs
+            throw _OfflineCacheMiss(offlineMisses);
+          }
+
+          if (!_offline) {
+            // fetch only what the wheelhouses don't have yet
+            await forEachBounded(pending, _jobs, (arch) async {
+              final wheelhouse = wheelhouses[arch.key]!;
+              stdout.writeln("Downloading $requirements for "
+                  "$platform/${arch.key} to $wheelhouse");
+              await runPython([
+                '-m',
+                'pip',
+                'download',
+                ...installArgs[arch.key]!,
+                '--dest',
+                wheelhouse,
+                ...requirements
+              ], environment: pipEnvs[arch.key]);
+            });
+          }
+
+          // With several arches to install, resolve each one first and
+          // install the pure-Python wheels they all share just once; each
+          // arch then only installs what is specific to it.
+          Map<String, List<String>>? archUrls;
+          if (pending.length > 1) {
+            sharedDir =
+                await Directory.systemTemp.createTemp('serious_python_shared');
+            archUrls = await _installSharedWheels(
+                pending.map((a) => a.key).toList(),
+                pipEnvs,
+                installArgs,
+                requirements,
+                sharedDir);
+          }
+
+          bool flutterPackagesCopied = false;
+          // invoke pip for every platform arch, a few at a time
+          await forEachBounded(pending, _jobs, (arch) async {
+            final pipEnv = pipEnvs[arch.key]!;
+            final sitePackagesDir = arch.key.isNotEmpty
                 ? path.join(sitePackagesRoot, arch.key)
                 : sitePackagesRoot;
             if (!await Directory(sitePackagesDir).exists()) {
               await Directory(sitePackagesDir).create(recursive: true);
             }
 
-            stdout.writeln(
-                "Installing $requirements with pip command to $sitePackagesDir");
-
-            List<String> pipArgs = ["--disable-pip-version-check"];
-
-            if (isMobile || isWeb) {
-              pipArgs.addAll(["--only-binary", ":all:"]);
-              if (Platform.environment
-                  .containsKey(allowSourceDistrosEnvironmentVariable)) {
-                pipArgs.addAll([
-                  "--no-binary",
-                  Platform.environment[allowSourceDistrosEnvironmentVariable]!
-                ]);
+            if (archUrls == null) {
+              stdout.writeln(
+                  "Installing $requirements with pip command to $sitePackagesDir");
+              await runPython([
+                '-m',
+                'pip',
+                'install',
+                '--upgrade',
+                ...installArgs[arch.key]!,
+                '--target',
+                sitePackagesDir,
+                ...requirements
+              ], environment: pipEnv);
+            } else {
+              final urls = archUrls[arch.key]!;
+              if (urls.isNotEmpty) {
+                stdout.writeln("Installing ${urls.length} $platform/${arch.key}"
+                    "-specific distribution(s) to $sitePackagesDir");
+                await _pipInstallUrls(
+                    urls, installArgs[arch.key]!, sitePackagesDir, pipEnv);
               }
+              verbose("Copying shared pure-Python packages to $sitePackagesDir");
+              await copyDirectory(
+                  sharedDir!, Directory(sitePackagesDir), sharedDir.path, []);
             }
 
-            for (var index in extraPyPiIndexes) {
-              pipArgs.addAll(["--extra-index-url", index]);
-            }
-
-            await runPython([
-              '-m',
-              'pip',
-              'install',
-              '--upgrade',
-              ...pipArgs,
-              '--target',
-              sitePackagesDir,
-              ...requirements
-            ], environment: pipEnv);
-
             // move $sitePackagesDir/flutter if env var is defined
             if (Platform.environment
                 .containsKey(flutterPackagesFlutterEnvironmentVariable)) {
@@ -479,6 +794,8 @@ class PackageCommand extends Command {
                   Directory(path.join(sitePackagesDir, "flutter"));
               if (await sitePackagesFlutterDir.exists()) {
                 if (!flutterPackagesCopied) {
+                  // claimed before the first await: arches run concurrently
+                  flutterPackagesCopied = true;
                   stdout.writeln(
                       "Copying Flutter packages to $flutterPackagesRoot");
                   if (!await flutterPackagesRootDir.exists()) {
@@ -486,7 +803,6 @@ class PackageCommand extends Command {
                   }
                   await copyDirectory(sitePackagesFlutterDir,
                       flutterPackagesRootDir, sitePackagesFlutterDir.path, []);
-                  flutterPackagesCopied = true;
                 }
                 await sitePackagesFlutterDir.delete(recursive: true);
               }
@@ -495,7 +811,7 @@ class PackageCommand extends Command {
             // compile packages
             if (compilePackages) {
               stdout.writeln("Compiling app packages at $sitePackagesDir");
-              await runPython(['-m', 'compileall', '-b', sitePackagesDir]);
+              await _compileAll(sitePackagesDir);
 
               verbose("Deleting original .py files");
               await cleanupDir(Directory(sitePackagesDir), ["**.py"]);
@@ -512,21 +828,27 @@ class PackageCommand extends Command {
               }
               await cleanupDir(Directory(sitePackagesDir), allJunkFiles);
             }
-          } finally {
-            if (sitecustomizeDir != null && await sitecustomizeDir.exists()) {
-              verbose(
-                  "Deleting sitecustomize directory ${sitecustomizeDir.path}");
-              await sitecustomizeDir.delete(recursive: true);
+          });
+        } finally {
+          for (final dir in [
+            ...sitecustomizeDirs,
+            if (sharedDir != null) sharedDir
+          ]) {
+            if (await dir.exists()) {
+              verbose("Deleting temp directory ${dir.path}");
+              await dir.delete(recursive: true);
             }
           }
-        } // for each arch
+        }
 
-        if (platform == "Darwin") {
+        if (platform == "Darwin" && upToDate.isEmpty) {
           await macos_utils.mergeMacOsSitePackages(
               path.join(sitePackagesRoot, "arm64"),
               path.join(sitePackagesRoot, "x86_64"),
               path.join(sitePackagesRoot),
-              _verbose);
+              _verbose,
+              jobs: _jobs,
+              cachePath: path.join(_fletCacheRoot(), 'lipo'));
         }
 
         // synchronize pod
@@ -535,10 +857,17 @@ class PackageCommand extends Command {
         if (await syncSh.exists()) {
           await runExec("/bin/sh", [syncSh.path]);
         }
+
+        await writeManifest(packagesManifest, {
+          "root": Directory(sitePackagesRoot).absolute.path,
+          "arches": archKeys,
+        });
       }
 
       // copy site packages to temp dir for web platform
-      if (platform == "Emscripten" && requirements.isNotEmpty) {
+      if (platform == "Emscripten" &&
+          requirements.isNotEmpty &&
+          !appUpToDate) {
         final sitePackagesSrcDir = Directory(sitePackagesRoot);
         if (await sitePackagesSrcDir.exists()) {
           stdout.writeln("Copying site packages to app archive");
@@ -552,7 +881,9 @@ class PackageCommand extends Command {
         }
       }
 
-      if (isWeb) {
+      if (isWeb && appUpToDate) {
+        stdout.writeln("App archive ${dest.path} is up to date");
+      } else if (isWeb) {
         // Web (Pyodide) still ships the app as a zip asset.
         stdout.writeln(
             "Creating app archive at ${dest.path} from a temp directory");
@@ -562,6 +893,15 @@ class PackageCommand extends Command {
         stdout.writeln("Writing app archive hash to ${dest.path}.hash");
         await File("${dest.path}.hash")
             .writeAsString(await calculateFileHash(dest.path));
+
+        if (webChunks) {
+          stdout.writeln(
+              "Writing chunked app bundle to ${chunksManifestPath(dest)}");
+          final chunks = await writeChunkedBundle(tempDir, dest,
+              sitePackagesDir: defaultSitePackagesDir);
+          verbose("${chunks.written} chunk(s) written, "
+              "${chunks.reused} unchanged");
+        }
       } else {
         // Native platforms: stage the unpacked app for the platform native
         // build to copy into the bundle (Android zips it as a stored asset).
@@ -571,11 +911,15 @@ class PackageCommand extends Command {
               "$platform packaging (staging dir for the unpacked app).");
         }
         final appStagingDir = Directory(appPackageRoot);
-        stdout.writeln("Staging unpacked app to ${appStagingDir.path}");
-        if (await appStagingDir.exists()) {
-          await appStagingDir.delete(recursive: true);
+        if (previousSources != null) {
+          stdout.writeln("Updating staged app at ${appStagingDir.path}");
+        } else {
+          stdout.writeln("Staging unpacked app to ${appStagingDir.path}");
+          if (await appStagingDir.exists()) {
+            await appStagingDir.delete(recursive: true);
+          }
+          await appStagingDir.create(recursive: true);
         }
-        await appStagingDir.create(recursive: true);
         await copyDirectory(tempDir, appStagingDir, tempDir.path, []);
 
         // Swift Package Manager (darwin) host-side staging: the podspec
@@ -589,6 +933,31 @@ class PackageCommand extends Command {
           await _stageDarwinSpm(platform, currentPath);
         }
       }
+
+      // tree shaking: analyze the whole staged app, not just what changed
+      final treeShakeList = File(path.join(sitePackagesRoot, treeShakeFile));
+      if (treeShake && platform == "Android") {
+        final siteDir = platforms[platform]!
+            .keys
+            .map((abi) => path.join(sitePackagesRoot, abi))
+            .where((d) => Directory(d).existsSync())
+            .firstOrNull;
+        await _treeShake(appPackageRoot!, siteDir, treeShakeKeep,
+            importTraces, treeShakeList);
+      } else {
+        if (treeShake) {
+          stdout.writeln("Tree shaking is only supported for Android, "
+              "skipping");
+        }
+        if (await treeShakeList.exists()) {
+          await treeShakeList.delete();
+        }
+      }
+
+      await writeManifest(appManifest, {"key": appKey, "files": appSources});
+    } on _OfflineCacheMiss catch (e) {
+      stderr.writeln(e);
+      failed = true;
     } catch (e) {
       stdout.writeln("Error: $e");
     } finally {
@@ -601,6 +970,7 @@ class PackageCommand extends Command {
         pyodidePyPiServer.close();
       }
     }
+    if (failed) exit(1);
   }
 
   Future<void> copyDirectory(Directory source, Directory destination,
@@ -622,6 +992,15 @@ class PackageCommand extends Command {
     }
   }
 
+  // Options that change the compiled output (not the worker count).
+  List<String> get _compileKey =>
+      _compileOptions.sublist(0, _compileOptions.indexOf("-j"));
+
+  // Compile every .py under [dir] to a .pyc next to it (legacy layout, so
+  // the sources can be deleted), with the --compile-* options.
+  Future<void> _compileAll(String dir) =>
+      runPython(['-m', 'compileall', '-b', ..._compileOptions, dir]);
+
   Future<void> cleanupDir(Directory directory, List<String> filesGlobs) async {
     verbose("Cleanup directory ${directory.path}: $filesGlobs");
     await cleanupDirRecursive(
@@ -712,20 +1091,220 @@ class PackageCommand extends Command {
   Future<String?> _resolveDarwinDir(String projectPath) async {
     final override = Platform.environment[darwinDirEnvironmentVariable];
     if (override != null && override.isNotEmpty) return override;
+    final root =
+        await _resolvePackageRoot(projectPath, "serious_python_darwin");
+    return root == null ? null : path.join(root, "darwin");
+  }
+
+  // Resolve a dependency's root directory from the flutter project's package
+  // config, or null if the config or the package isn't there.
+  Future<String?> _resolvePackageRoot(
+      String projectPath, String packageName) async {
     final pc =
         File(path.join(projectPath, ".dart_tool", "package_config.json"));
     if (!await pc.exists()) return null;
     final data = jsonDecode(await pc.readAsString()) as Map<String, dynamic>;
     for (final pkg in (data["packages"] as List)) {
-      if (pkg["name"] == "serious_python_darwin") {
+      if (pkg["name"] == packageName) {
         final base = Uri.directory(path.join(projectPath, ".dart_tool"));
-        final root = base.resolve(pkg["rootUri"] as String).toFilePath();
-        return path.join(root, "darwin");
+        return base.resolve(pkg["rootUri"] as String).toFilePath();
       }
     }
     return null;
   }
 
+  // Requirements plus the contents of the requirements files and local
+  // package dirs they name, so editing those invalidates the manifest too.
+  Future<List<Object>> _requirementsKey(
+      String projectPath, List<String> requirements) async {
+    final referenced = <String, String>{};
+    for (final token in requirements.expand((r) => r.split(RegExp(r"\s+")))) {
+      if (token.isEmpty || token.startsWith("-")) continue;
+      final p = path.isAbsolute(token) ? token : path.join(projectPath, token);
+      if (await File(p).exists()) {
+        referenced[token] = await calculateFileHash(p);
+      } else if (await Directory(p).exists()) {
+        // A dir holding the build output never hashes the same twice; treat
+        // it as always changed rather than hashing it.
+        referenced[token] = path.isWithin(p, _buildDir!.path)
+            ? DateTime.now().toIso8601String()
+            : hashKey(await hashTree(Directory(p)));
+      }
+    }
+    return [requirements, referenced];
+  }
+
+  // Resolve [requirements] for each of [archs] with `pip install --dry-run
+  // --report`, install the pure-Python wheels that every arch resolved to
+  // into [sharedDir] once, and return each arch's remaining distribution URLs.
+  // Wheels are matched by file name, as each arch resolves them from its own
+  // wheelhouse.
+  // Returns null — plain per-arch installs — if any arch resolves to
+  // something other than a downloadable archive (VCS checkout, local dir).
+  Future<Map<String, List<String>>?> _installSharedWheels(
+      List<String> archs,
+      Map<String, Map<String, String>> pipEnvs,
+      Map<String, List<String>> pipArgs,
+      List<String> requirements,
+      Directory sharedDir) async {
+    final resolved = <String, List<String>>{};
+    var archivesOnly = true;
+    await forEachBounded(archs, _jobs, (arch) async {
+      final report = File("${sharedDir.path}.$arch.json");
+      try {
+        stdout.writeln("Resolving $requirements for $arch");
+        await runPython([
+          '-m',
+          'pip',
+          'install',
+          '--dry-run',
+          '--ignore-installed',
+          '--quiet',
+          '--report',
+          report.path,
+          ...pipArgs[arch]!,
+          ...requirements
+        ], environment: pipEnvs[arch]);
+        final data = jsonDecode(await report.readAsString());
+        resolved[arch] = [
+          for (final item in data["install"] as List)
+            item["download_info"]["url"] as String
+        ];
+        if ((data["install"] as List)
+            .any((item) => item["download_info"]["archive_info"] == null)) {
+          archivesOnly = false;
+        }
+      } finally {
+        if (await report.exists()) await report.delete();
+      }
+    });
+    if (!archivesOnly) {
+      stdout.writeln("Requirements include non-archive distributions; "
+          "installing every arch separately");
+      return null;
+    }
+
+    final shared = {
+      for (final url in resolved[archs.first]!)
+        if (_fileName(url).endsWith("-none-any.whl") &&
+            resolved.values
+                .every((r) => r.any((u) => _fileName(u) == _fileName(url))))
+          _fileName(url): url
+    };
+    if (shared.isNotEmpty) {
+      stdout.writeln("Installing ${shared.length} pure-Python distribution(s) "
+          "shared by ${archs.length} architectures");
+      await _pipInstallUrls(shared.values.toList(), pipArgs[archs.first]!,
+          sharedDir.path, pipEnvs[archs.first]!);
+    }
+    return {
+      for (final e in resolved.entries)
+        e.key: e.value
+            .where((url) => !shared.containsKey(_fileName(url)))
+            .toList()
+    };
+  }
+
+  static String _fileName(String url) => Uri.parse(url).pathSegments.last;
+
+  // Persistent wheelhouse for one arch: downloaded distributions keyed by
+  // Python version and wheel platform tag. Pyodide wheels are also keyed by
+  // the Pyodide release (it rebuilds packages without bumping their version);
+  // desktop builds use the build Python's own tags, i.e. the host's.
+  String _wheelhouseDir(String platform,
+      MapEntry<String, Map<String, String>> arch, String platformTag) {
+    String tag;
+    if (platform == "Emscripten") {
+      tag = "$platformTag-${_release.pyodideVersion}";
+    } else if (platformTag.isNotEmpty) {
+      tag = platformTag;
+    } else {
+      final hostArch = Platform.version.contains("arm64") ? "arm64" : "x86_64";
+      final macVer = arch.value["mac_ver"]!;
+      tag = "${platform.toLowerCase()}-"
+          "${macVer.isNotEmpty ? macVer : hostArch}";
+    }
+    return path.join(
+        _fletCacheRoot(), 'wheelhouse', 'python$_pythonShortVersion', tag);
+  }
+
+  // Install exactly the distributions at [urls] (as resolved by pip earlier)
+  // into [target], without resolving dependencies again.
+  Future<void> _pipInstallUrls(List<String> urls, List<String> pipArgs,
+      String target, Map<String, String> environment) async {
+    final tmp = await Directory.systemTemp.createTemp('serious_python_reqs');
+    try {
+      final reqs = File(path.join(tmp.path, "requirements.txt"));
+      await reqs.writeAsString(urls.join("\n"));
+      await runPython([
+        '-m',
+        'pip',
+        'install',
+        '--no-deps',
+        ...pipArgs,
+        '--target',
+        target,
+        '-r',
+        reqs.path
+      ], environment: environment);
+    } finally {
+      await tmp.delete(recursive: true);
+    }
+  }
+
+  // Write to [out] the top-level stdlib and site-packages modules the app in
+  // [appDir] can't import, as found by [treeShakePy] run with the build
+  // Python. [keep] modules and those listed in [traces] are always reachable.
+  Future<void> _treeShake(String appDir, String? siteDir, List<String> keep,
+      List<String> traces, File out) async {
+    stdout.writeln("Tree shaking: finding modules the app can't import");
+    final tmp = await Directory.systemTemp.createTemp('serious_python_shake');
+    try {
+      final script = File(path.join(tmp.path, "treeshake.py"));
+      await script.writeAsString(treeShakePy);
+      await out.parent.create(recursive: true);
+      await runPython([
+        script.path,
+        '--app',
+        appDir,
+        if (siteDir != null) ...['--site', siteDir],
+        for (final module in keep) ...['--keep', module],
+        for (final trace in traces) ...['--trace', trace],
+        '--out',
+        out.path
+      ]);
+    } finally {
+      await tmp.delete(recursive: true);
+    }
+    final dropped = (await out.readAsLines()).skip(1).toList();
+    stdout.writeln("Tree shaking: leaving out ${dropped.length} "
+        "unreachable top-level module(s)");
+    verbose(dropped.join(", "));
+  }
+
+  // Copy the `sp_bridge` Python package (codec and friends for PythonBridge
+  // channels) into the app, unless the app ships its own.
+  Future<void> _bundleBridgeHelpers(
+      String projectPath, Directory appDir) async {
+    final dest = Directory(path.join(appDir.path, bridgeHelpersPackage));
+    if (await dest.exists()) {
+      verbose("App provides its own $bridgeHelpersPackage package");
+      return;
+    }
+    final root = await _resolvePackageRoot(projectPath, "serious_python");
+    final src = root == null
+        ? null
+        : Directory(path.join(root, "python", bridgeHelpersPackage));
+    if (src == null || !await src.exists()) {
+      stdout.writeln("$bridgeHelpersPackage not bundled: could not resolve "
+          "serious_python (ensure .dart_tool/package_config.json is present).");
+      return;
+    }
+    verbose("Bundling $bridgeHelpersPackage from ${src.path}");
+    await dest.create();
+    await copyDirectory(src, dest, src.path, ["__pycache__"]);
+  }
+
   Future<void> zipDirectoryPosix(Directory source, File dest) async {
     final encoder = ZipFileEncoder();
     encoder.create(dest.path);
@@ -743,89 +1322,100 @@ class PackageCommand extends Command {
 
   Future<int> runPython(List<String> args,
       {Map<String, String>? environment}) async {
-    if (_pythonDir == null) {
-      _pythonDir = Directory(path.join(
-          _buildDir!.path, "build_python_${_release.standaloneVersion}"));
-
-      if (!await _pythonDir!.exists()) {
-        await _pythonDir!.create();
-
-        var isArm64 = Platform.version.contains("arm64");
-
-        String arch = "";
-        if (Platform.isMacOS && !isArm64) {
-          arch = 'x86_64-apple-darwin';
-        } else if (Platform.isMacOS && isArm64) {
-          arch = 'aarch64-apple-darwin';
-        } else if (Platform.isLinux && !isArm64) {
-          arch = 'x86_64-unknown-linux-gnu';
-        } else if (Platform.isLinux && isArm64) {
-          arch = 'aarch64-unknown-linux-gnu';
-        } else if (Platform.isWindows) {
-          // python-build-standalone dropped the explicit `-shared` MSVC
-          // variant; the remaining install_only_stripped build is shared.
-          arch = 'x86_64-pc-windows-msvc';
-        }
+    // Shared, so concurrent callers wait for a single download/extract.
+    await (_pythonReady ??= _preparePython());
 
-        var pythonArchiveFilename =
-            "cpython-${_release.standaloneVersion}+${_release.standaloneReleaseDate}-$arch-install_only_stripped.tar.gz";
-
-        // Cache CPython by release date: the same tarball is reused across
-        // every example/project until `_release.standaloneReleaseDate` bumps.
-        var pythonCacheDir = Directory(path.join(_fletCacheRoot(),
-            'python-build-standalone', _release.standaloneReleaseDate));
-        await pythonCacheDir.create(recursive: true);
-        var pythonArchivePath =
-            path.join(pythonCacheDir.path, pythonArchiveFilename);
+    var pythonExePath = Platform.isWindows
+        ? path.join(_pythonDir!.path, 'python', 'python.exe')
+        : path.join(_pythonDir!.path, 'python', 'bin', 'python3');
 
-        if (!await File(pythonArchivePath).exists()) {
-          // download Python distr from GitHub
-          final url =
-              "https://github.com/astral-sh/python-build-standalone/releases/download/${_release.standaloneReleaseDate}/$pythonArchiveFilename";
+    // Always log the Python command so a silent pip install (typical during
+    // `pip install git+…` while git is cloning) doesn't look like a hang.
+    stdout.writeln("Running: ${[pythonExePath, ...args].join(" ")}");
+    return await runExec(pythonExePath, args, environment: environment);
+  }
 
-          if (_verbose) {
-            verbose(
-                "Downloading Python distributive from $url to $pythonArchivePath");
-          } else {
-            stdout.writeln(
-                "Downloading Python distributive from $url to $pythonArchivePath");
-          }
+  Future<void> _preparePython() async {
+    _pythonDir = Directory(path.join(
+        _buildDir!.path, "build_python_${_release.standaloneVersion}"));
+
+    if (!await _pythonDir!.exists()) {
+      await _pythonDir!.create();
+
+      var isArm64 = Platform.version.contains("arm64");
+
+      String arch = "";
+      if (Platform.isMacOS && !isArm64) {
+        arch = 'x86_64-apple-darwin';
+      } else if (Platform.isMacOS && isArm64) {
+        arch = 'aarch64-apple-darwin';
+      } else if (Platform.isLinux && !isArm64) {
+        arch = 'x86_64-unknown-linux-gnu';
+      } else if (Platform.isLinux && isArm64) {
+        arch = 'aarch64-unknown-linux-gnu';
+      } else if (Platform.isWindows) {
+        // python-build-standalone dropped the explicit `-shared` MSVC
+        // variant; the remaining install_only_stripped build is shared.
+        arch = 'x86_64-pc-windows-msvc';
+      }
 
-          // Write to a .tmp sibling first so a Ctrl-C / network blip doesn't
-          // poison the cache with a truncated archive on the next run.
-          var tmpPath = "$pythonArchivePath.tmp";
-          var response = await http.get(Uri.parse(url));
-          await File(tmpPath).writeAsBytes(response.bodyBytes);
-          await File(tmpPath).rename(pythonArchivePath);
+      var pythonArchiveFilename =
+          "cpython-${_release.standaloneVersion}+${_release.standaloneReleaseDate}-$arch-install_only_stripped.tar.gz";
+
+      // Cache CPython by release date: the same tarball is reused across
+      // every example/project until `_release.standaloneReleaseDate` bumps.
+      var pythonCacheDir = Directory(path.join(_fletCacheRoot(),
+          'python-build-standalone', _release.standaloneReleaseDate));
+      await pythonCacheDir.create(recursive: true);
+      var pythonArchivePath =
+          path.join(pythonCacheDir.path, pythonArchiveFilename);
+
+      if (!await File(pythonArchivePath).exists()) {
+        if (_offline) {
+          await _pythonDir!.delete();
+          throw _OfflineCacheMiss([
+            "--offline: build Python $pythonArchiveFilename is "
+                "not cached in ${pythonCacheDir.path}."
+          ]);
         }
 
-        // extract Python from archive
+        // download Python distr from GitHub
+        final url =
+            "https://github.com/astral-sh/python-build-standalone/releases/download/${_release.standaloneReleaseDate}/$pythonArchiveFilename";
+
         if (_verbose) {
           verbose(
-              "Extracting Python distributive from $pythonArchivePath to ${_pythonDir!.path}");
+              "Downloading Python distributive from $url to $pythonArchivePath");
         } else {
-          stdout.writeln("Extracting Python distributive");
+          stdout.writeln(
+              "Downloading Python distributive from $url to $pythonArchivePath");
         }
 
-        await Process.run(
-            'tar', ['-xzf', pythonArchivePath, '-C', _pythonDir!.path]);
-
-        stdout.writeln("Python distributive extracted to ${_pythonDir!.path}");
+        // Write to a .tmp sibling first so a Ctrl-C / network blip doesn't
+        // poison the cache with a truncated archive on the next run.
+        var tmpPath = "$pythonArchivePath.tmp";
+        var response = await http.get(Uri.parse(url));
+        await File(tmpPath).writeAsBytes(response.bodyBytes);
+        await File(tmpPath).rename(pythonArchivePath);
+      }
 
-        if (Platform.isMacOS) {
-          duplicateSysconfigFile(_pythonDir!.path);
-        }
+      // extract Python from archive
+      if (_verbose) {
+        verbose(
+            "Extracting Python distributive from $pythonArchivePath to ${_pythonDir!.path}");
+      } else {
+        stdout.writeln("Extracting Python distributive");
       }
-    }
 
-    var pythonExePath = Platform.isWindows
-        ? path.join(_pythonDir!.path, 'python', 'python.exe')
-        : path.join(_pythonDir!.path, 'python', 'bin', 'python3');
+      await Process.run(
+          'tar', ['-xzf', pythonArchivePath, '-C', _pythonDir!.path]);
 
-    // Always log the Python command so a silent pip install (typical during
-    // `pip install git+…` while git is cloning) doesn't look like a hang.
-    stdout.writeln("Running: ${[pythonExePath, ...args].join(" ")}");
-    return await runExec(pythonExePath, args, environment: environment);
+      stdout.writeln("Python distributive extracted to ${_pythonDir!.path}");
+
+      if (Platform.isMacOS) {
+        duplicateSysconfigFile(_pythonDir!.path);
+      }
+    }
   }
 
   void duplicateSysconfigFile(String pythonDir) {
@@ -854,8 +1444,7 @@ class PackageCommand extends Command {
     const htmlHeader = "<!DOCTYPE html><html><body>\n";
     const htmlFooter = "</body></html>\n";
 
-    var pyodidePackages =
-        await fetchJsonFromUrl("$_pyodideRootUrl/$pyodideLockFile");
+    var pyodidePackages = await _pyodideLock();
 
     var wheels = Map.from(pyodidePackages["packages"])
       ..removeWhere((k, p) => !p["file_name"].endsWith(".whl"));
@@ -899,6 +1488,22 @@ class PackageCommand extends Command {
     return server;
   }
 
+  // The Pyodide package index. A published Pyodide release never changes it,
+  // so it is downloaded once per release into the cache.
+  Future<Map<String, dynamic>> _pyodideLock() async {
+    final cached = File(path.join(_fletCacheRoot(), 'pyodide',
+        _release.pyodideVersion, pyodideLockFile));
+    if (await cached.exists()) {
+      return json.decode(await cached.readAsString());
+    }
+    final data = await fetchJsonFromUrl("$_pyodideRootUrl/$pyodideLockFile");
+    await cached.parent.create(recursive: true);
+    final tmp = File("${cached.path}.tmp");
+    await tmp.writeAsString(json.encode(data));
+    await tmp.rename(cached.path);
+    return data;
+  }
+
   Future<int> getUnusedPort() {
     return ServerSocket.bind("127.0.0.1", 0).then((socket) {
       var port = socket.port;
@@ -930,3 +1535,13 @@ class PackageCommand extends Command {
     }
   }
 }
+
+/// `--offline` without the wheelhouses it needs; one line per platform/arch.
+class _OfflineCacheMiss implements Exception {
+  _OfflineCacheMiss(this.misses);
+
+  final List<String> misses;
+
+  @override
+  String toString() => misses.join("\n");
+}
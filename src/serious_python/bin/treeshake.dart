@@ -0,0 +1,194 @@
+// Run by `package --tree-shake` with the build Python (same minor version as
+// the bundled one). Works out which top-level stdlib and site-packages modules
+// the app can import — statically with `modulefinder` from every app module,
+// plus modules named by import traces and `--keep` — and writes the others,
+// one per line after a `sp-treeshake/1` header, to the `--out` drop list.
+//
+// Granularity is the top-level module or package: a reachable package ships
+// whole, so imports made from inside it (including from its extension modules)
+// keep working. Names a module tries to import but modulefinder can't resolve
+// (optional imports, namespace packages) count as reachable too. Development
+// modules the stdlib only imports from `__main__` blocks and debug hooks
+// (`heapq` -> `doctest` -> `unittest` -> ...) are not followed, and are kept
+// only if the app, site-packages, a trace or `--keep` asks for them.
+String treeShakePy = r"""
+import argparse
+import json
+import modulefinder
+import os
+import re
+import sys
+import sysconfig
+
+# Modules the interpreter itself or serious_python imports at startup.
+ROOTS = [
+    "site",
+    "encodings",
+    "runpy",
+    "traceback",
+    "linecache",
+    "warnings",
+    "sysconfig",
+    "ctypes",
+    "zipimport",
+    "importlib",
+]
+# Imported at runtime by C code, which modulefinder can't see: `time.strptime`
+# and `datetime.strptime` import `_strptime`, `pickle`'s accelerator imports
+# `copyreg` and `_compat_pickle`, `decimal`'s imports `numbers`. The codec
+# registry imports `encodings.<name>` on first use of an encoding, so every
+# one is a root too (`encodings.idna`, which hostname lookups in `socket`
+# need, pulls in `stringprep` and `unicodedata`).
+RUNTIME_IMPORTS = [
+    "_strptime",
+    "copyreg",
+    "_compat_pickle",
+    "numbers",
+    "stringprep",
+    "unicodedata",
+]
+DEV_ONLY = [
+    "doctest",
+    "ensurepip",
+    "idlelib",
+    "lib2to3",
+    "pdb",
+    "pydoc",
+    "pydoc_data",
+    "test",
+    "tkinter",
+    "turtle",
+    "turtledemo",
+    "unittest",
+    "venv",
+]
+NEVER_DROP = re.compile(r"^(_sysconfigdata|_sp_|sitecustomize$|usercustomize$)")
+EXT_MODULE = re.compile(r"^(\w+)\.(cpython-[^.]+|abi3)\.so$")
+MODULE_EXTS = (".py", ".pyc")
+
+
+def module_name(entry):
+    m = EXT_MODULE.match(entry)
+    if m:
+        return m.group(1)
+    stem, ext = os.path.splitext(entry)
+    if ext in MODULE_EXTS and stem.isidentifier():
+        return stem
+    return None
+
+
+def has_modules(d):
+    for _, _, files in os.walk(d):
+        if any(module_name(f) for f in files):
+            return True
+    return False
+
+
+def top_level_names(d):
+    names = set()
+    if not d or not os.path.isdir(d):
+        return names
+    for entry in os.listdir(d):
+        full = os.path.join(d, entry)
+        if os.path.isdir(full):
+            if entry.isidentifier() and entry != "__pycache__" and has_modules(full):
+                names.add(entry)
+        else:
+            name = module_name(entry)
+            if name:
+                names.add(name)
+    return names
+
+
+def app_modules(app):
+    for root, dirs, files in os.walk(app):
+        dirs[:] = [d for d in dirs if d.isidentifier()]
+        rel = os.path.relpath(root, app)
+        parts = [] if rel == "." else rel.split(os.sep)
+        for f in files:
+            stem, ext = os.path.splitext(f)
+            if ext not in MODULE_EXTS or not stem.isidentifier():
+                continue
+            dotted = parts if stem == "__init__" else parts + [stem]
+            if dotted:
+                yield ".".join(dotted)
+
+
+def encodings_modules(stdlib):
+    d = os.path.join(stdlib, "encodings")
+    return sorted(
+        "encodings." + name
+        for name in (module_name(f) for f in os.listdir(d))
+        if name and name != "__init__"
+    )
+
+
+def traced_modules(trace):
+    with open(trace, encoding="utf-8") as f:
+        data = json.load(f)
+    return [m["name"] for m in data.get("modules", [])]
+
+
+def reachable_names(search, excludes, roots, stdlib_names):
+    finder = modulefinder.ModuleFinder(path=search, excludes=list(excludes))
+    for name in roots:
+        try:
+            finder.import_hook(name)
+        except Exception:
+            pass
+    reachable = {name.split(".")[0] for name in list(finder.modules) + roots}
+    for name, importers in finder.badmodules.items():
+        top = name.split(".")[0]
+        if top not in excludes or any(
+            i.split(".")[0] not in stdlib_names for i in importers
+        ):
+            reachable.add(top)
+    return reachable
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app", required=True)
+    parser.add_argument("--site")
+    parser.add_argument("--keep", action="append", default=[])
+    parser.add_argument("--trace", action="append", default=[])
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(10000)
+    stdlib = sysconfig.get_paths()["stdlib"]
+    stdlib_dirs = [stdlib, os.path.join(stdlib, "lib-dynload")]
+    search = [args.app] + ([args.site] if args.site else []) + stdlib_dirs
+    stdlib_names = set()
+    for d in stdlib_dirs:
+        stdlib_names |= top_level_names(d)
+
+    roots = list(ROOTS) + RUNTIME_IMPORTS + encodings_modules(stdlib)
+    roots += list(app_modules(args.app)) + list(args.keep)
+    for trace in args.trace:
+        roots += traced_modules(trace)
+
+    # A development module something outside the stdlib needs is followed
+    # after all: analyze again without excluding it.
+    excludes = set(DEV_ONLY)
+    while True:
+        reachable = reachable_names(search, excludes, roots, stdlib_names)
+        needed = excludes & reachable
+        if not needed:
+            break
+        excludes -= needed
+
+    candidates = stdlib_names | top_level_names(args.site)
+    candidates -= top_level_names(args.app)
+    drop = sorted(
+        n for n in candidates if n not in reachable and not NEVER_DROP.match(n)
+    )
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write("sp-treeshake/1\n")
+        f.writelines(n + "\n" for n in drop)
+    print("%d of %d top-level modules unreachable" % (len(drop), len(candidates)))
+
+
+main()
+""";
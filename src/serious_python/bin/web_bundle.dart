@@ -0,0 +1,182 @@
+import 'dart:convert';
+import 'dart:io';
+
+import 'package:archive/archive_io.dart';
+import 'package:path/path.dart' as path;
+
+import 'build_manifest.dart';
+
+// Chunked web (Pyodide) bundle, written by `package --web-chunks` next to the
+// app archive: the same tree as `app.zip`, split into zips named after their
+// content, plus a manifest listing them.
+//
+//   app/app.chunks.json             fetched on every load (no-cache)
+//   app/app.<content hash>.zip      immutable, cached by the browser for good
+//
+// Files are grouped so that a change touches as few chunks as possible: app
+// code by top-level package (loose top-level files together), site-packages
+// by distribution (a wheel's modules and its .dist-info, per its RECORD).
+// Groups larger than [defaultChunkSize] are split into several chunks. A chunk
+// is named after the paths and digests of its files, so an unchanged group
+// keeps its name — and its cached copy — across builds.
+
+const chunksManifestFormat = "sp-chunks/1";
+const defaultChunkSize = 8 * 1024 * 1024;
+
+/// Path of the chunk manifest for the app archive [dest].
+String chunksManifestPath(File dest) => path.join(dest.parent.path,
+    "${path.basenameWithoutExtension(dest.path)}.chunks.json");
+
+/// Writes [source] as a chunked bundle next to [dest], reusing chunks that
+/// are already there and deleting ones the new manifest doesn't list.
+/// Returns how many chunks were written and reused.
+Future<({int written, int reused})> writeChunkedBundle(
+    Directory source, File dest,
+    {required String sitePackagesDir,
+    int chunkSize = defaultChunkSize}) async {
+  final stem = path.basenameWithoutExtension(dest.path);
+  final outDir = dest.parent;
+  final digests = await hashTree(source);
+  final sizes = {
+    for (final rel in digests.keys)
+      rel: await File(path.join(source.path, rel)).length()
+  };
+
+  final recordOwners = await _recordOwners(
+      Directory(path.join(source.path, sitePackagesDir)));
+  final groups = <String, List<String>>{};
+  for (final rel in digests.keys.toList()..sort()) {
+    final parts = path.posix.split(rel);
+    String group;
+    if (parts.first == sitePackagesDir && parts.length > 1) {
+      group = "site-packages/${recordOwners[parts[1]] ?? parts[1]}";
+    } else {
+      group = parts.length > 1 ? "app/${parts.first}" : "app";
+    }
+    groups.putIfAbsent(group, () => []).add(rel);
+  }
+
+  // The app (and `main.py` at its top level) first, so a loader that
+  // unpacks chunks as they arrive gets to it soonest.
+  final names = groups.keys.toList()
+    ..sort((a, b) {
+      final order = _groupOrder(a).compareTo(_groupOrder(b));
+      return order != 0 ? order : a.compareTo(b);
+    });
+
+  var written = 0;
+  var reused = 0;
+  final chunks = <Map<String, dynamic>>[];
+  for (final group in names) {
+    for (final files in _split(groups[group]!, sizes, chunkSize)) {
+      final key = hashKey([for (final rel in files) "$rel:${digests[rel]}"])
+          .substring(0, 32);
+      final chunk = File(path.join(outDir.path, "$stem.$key.zip"));
+      if (await chunk.exists()) {
+        reused++;
+      } else {
+        final tmp = File("${chunk.path}.tmp");
+        final encoder = ZipFileEncoder();
+        encoder.create(tmp.path);
+        for (final rel in files) {
+          await encoder.addFile(File(path.join(source.path, rel)), rel);
+        }
+        await encoder.close();
+        await tmp.rename(chunk.path);
+        written++;
+      }
+      chunks.add({
+        "file": path.basename(chunk.path),
+        "group": group,
+        "size": await chunk.length(),
+        "files": files.length,
+        "top_level": _topLevel(files, sitePackagesDir),
+      });
+    }
+  }
+
+  final manifest = File(chunksManifestPath(dest));
+  final tmp = File("${manifest.path}.tmp");
+  await tmp.writeAsString(jsonEncode({
+    "format": chunksManifestFormat,
+    "site_packages": sitePackagesDir,
+    "chunks": chunks,
+  }));
+  await tmp.rename(manifest.path);
+
+  // Chunks of earlier builds nothing refers to any more.
+  final live = {for (final c in chunks) c["file"]};
+  final chunkName =
+      RegExp("^${RegExp.escape(stem)}\\.[0-9a-f]{32}\\.zip(\\.tmp)?\$");
+  await for (final entity in outDir.list()) {
+    final name = path.basename(entity.path);
+    if (entity is File && chunkName.hasMatch(name) && !live.contains(name)) {
+      await entity.delete();
+    }
+  }
+
+  return (written: written, reused: reused);
+}
+
+int _groupOrder(String group) => group == "app"
+    ? 0
+    : group.startsWith("app/")
+        ? 1
+        : 2;
+
+// Consecutive runs of [files] (sorted) of at most [chunkSize] bytes; a file
+// larger than that gets a chunk of its own.
+List<List<String>> _split(
+    List<String> files, Map<String, int> sizes, int chunkSize) {
+  final result = <List<String>>[];
+  var current = <String>[];
+  var size = 0;
+  for (final rel in files) {
+    if (current.isNotEmpty && size + sizes[rel]! > chunkSize) {
+      result.add(current);
+      current = [];
+      size = 0;
+    }
+    current.add(rel);
+    size += sizes[rel]!;
+  }
+  if (current.isNotEmpty) result.add(current);
+  return result;
+}
+
+// Top-level entries of the app, or of site-packages, that [files] belong to.
+List<String> _topLevel(List<String> files, String sitePackagesDir) {
+  final names = <String>{};
+  for (final rel in files) {
+    final parts = path.posix.split(rel);
+    names.add(parts.first == sitePackagesDir && parts.length > 1
+        ? parts[1]
+        : parts.first);
+  }
+  return names.toList()..sort();
+}
+
+// Maps each top-level site-packages entry a wheel installed (per the RECORD in
+// its .dist-info) to that distribution's name.
+Future<Map<String, String>> _recordOwners(Directory sitePackages) async {
+  final owners = <String, String>{};
+  if (!await sitePackages.exists()) return owners;
+  await for (final entity in sitePackages.list(followLinks: false)) {
+    final distInfo = path.basename(entity.path);
+    if (entity is! Directory || !distInfo.endsWith(".dist-info")) continue;
+    final dist = distInfo.split("-").first.toLowerCase();
+    owners[distInfo] = dist;
+    final record = File(path.join(entity.path, "RECORD"));
+    if (!await record.exists()) continue;
+    for (final line in await record.readAsLines()) {
+      final close = line.startsWith('"') ? line.indexOf('"', 1) : -1;
+      final entry =
+          close > 0 ? line.substring(1, close) : line.split(",").first;
+      if (entry.isEmpty || entry.startsWith("..") || entry.startsWith("/")) {
+        continue;
+      }
+      owners.putIfAbsent(path.posix.split(entry).first, () => dist);
+    }
+  }
+  return owners;
+}
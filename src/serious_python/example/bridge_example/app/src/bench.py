@@ -0,0 +1,144 @@
+"""Import timing for the benchmark suite (`benchmark_test.dart`).
+
+Imports are timed in this interpreter, through the app's real `sys.path`
+(the bundle's app dir, site-packages and stdlib). Each sample is a cold
+import: finder caches are invalidated first, and every module the import
+added to `sys.modules` is removed afterwards, so the next sample finds,
+loads and executes it again. Modules that were already imported when the
+benchmark started are skipped — timing a `sys.modules` hit says nothing.
+
+With `soref`, every module is timed a second time with the Android
+bootstrap's `_SorefFinder` at the front of `sys.meta_path` and a directory
+of simulated `.soref` markers (plus their `.soref_index`) at the end of
+`sys.path`, the way an Android build lays them out. The finder itself is
+loaded from `_sp_bootstrap.py` in the source tree; nothing here resolves to
+a real native library, so the numbers are the lookup overhead every import
+pays on Android, measured on the desktop.
+"""
+
+import contextlib
+import importlib
+import importlib.util
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+_MARKER_LIB = "libsimext_%d.so"
+
+
+def import_times(modules, repeat=5, soref=None):
+    """Median cold-import time of each of `modules`, in ms.
+
+    `soref`, if given, is ``{"bootstrap": <path of _sp_bootstrap.py>,
+    "markers": <count>}``. Returns ``{"modules": {name: {"plain_ms": ...,
+    "soref_ms": ...} or None if already imported}, "soref": {...}}``.
+    """
+    finder = sim_dir = None
+    if soref:
+        bootstrap = _load_bootstrap(soref["bootstrap"])
+        sim_dir = _simulate_markers(soref["markers"])
+        finder = bootstrap._SorefFinder()
+    try:
+        results = {}
+        for name in modules:
+            if name in sys.modules:
+                results[name] = None
+                continue
+            # Back to back, so drift (disk cache, CPU clock) hits both alike.
+            results[name] = {"plain_ms": _median_import(name, repeat)}
+            if finder is not None:
+                with _soref_installed(finder, sim_dir):
+                    results[name]["soref_ms"] = _median_import(name, repeat)
+        out = {"modules": results}
+        if finder is not None:
+            with _soref_installed(finder, sim_dir):
+                out["soref"] = _finder_lookups(finder, soref["markers"])
+        return out
+    finally:
+        if sim_dir is not None:
+            shutil.rmtree(sim_dir, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def _soref_installed(finder, sim_dir):
+    sys.path.append(sim_dir)
+    sys.meta_path.insert(0, finder)
+    try:
+        yield
+    finally:
+        sys.meta_path.remove(finder)
+        sys.path.remove(sim_dir)
+
+
+def _median_import(name, repeat):
+    samples = []
+    for _ in range(repeat):
+        before = set(sys.modules)
+        importlib.invalidate_caches()
+        t0 = time.perf_counter()
+        importlib.import_module(name)
+        samples.append((time.perf_counter() - t0) * 1000)
+        for added in set(sys.modules) - before:
+            del sys.modules[added]
+    return statistics.median(samples)
+
+
+def _finder_lookups(finder, markers):
+    # Index load: every sys.path entry's marker table, read once per process.
+    finder.invalidate_caches()
+    t0 = time.perf_counter()
+    finder.load_indexes()
+    index_load_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    for i in range(markers):
+        if finder.find_spec("simext_%d" % i) is None:
+            raise RuntimeError("simulated marker simext_%d not found" % i)
+    hit_us = (time.perf_counter() - t0) * 1e6 / markers
+
+    # A first miss walks every entry; repeats come from the negative cache.
+    names = ["nosuch_%d" % i for i in range(markers)]
+    t0 = time.perf_counter()
+    for name in names:
+        finder.find_spec(name)
+    miss_us = (time.perf_counter() - t0) * 1e6 / markers
+    t0 = time.perf_counter()
+    for name in names:
+        finder.find_spec(name)
+    cached_miss_us = (time.perf_counter() - t0) * 1e6 / markers
+
+    return {
+        "markers": markers,
+        "path_entries": len(sys.path),
+        "index_load_ms": index_load_ms,
+        "hit_us": hit_us,
+        "miss_us": miss_us,
+        "cached_miss_us": cached_miss_us,
+    }
+
+
+def _load_bootstrap(path):
+    # Under a name of its own: an Android build's real `_sp_bootstrap` (if
+    # any) stays untouched.
+    spec = importlib.util.spec_from_file_location("_sp_bootstrap_bench", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _simulate_markers(count):
+    # What the gradle split leaves for relocated extensions: a marker per
+    # module naming its lib, and the archive's `.soref_index`.
+    sim_dir = tempfile.mkdtemp(prefix="sp_soref_")
+    lines = ["sp-soref-index/1\t%d" % count]
+    for i in range(count):
+        lib = _MARKER_LIB % i
+        with open(os.path.join(sim_dir, "simext_%d.soref" % i), "w") as f:
+            f.write(lib)
+        lines.append("simext_%d\t%s\t0" % (i, lib))
+    with open(os.path.join(sim_dir, ".soref_index"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return sim_dir
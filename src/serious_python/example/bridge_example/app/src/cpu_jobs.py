@@ -0,0 +1,21 @@
+"""CPU-bound job for the subinterpreter pool benchmark (`pool_test.dart`).
+
+A module of its own, not part of `main.py`: pool jobs are named as
+``module:function`` and imported inside each subinterpreter, where
+`__main__` is not this app.
+"""
+
+
+def burn(n):
+    """Pure-Python busy work that holds the GIL throughout: sum of the
+    squares of the primes below `n`, by trial division."""
+    total = 0
+    for i in range(2, n):
+        d = 2
+        while d * d <= i:
+            if i % d == 0:
+                break
+            d += 1
+        else:
+            total += i * i
+    return total
@@ -12,6 +12,29 @@ PythonBridge instance has its own native port):
     by the memory test's hammer loop — keeping the per-frame cost on
     Python's side as close to zero as possible so any cost we measure
     is the transport's.
+  - **struct** (BRIDGE_EXAMPLE_STRUCT_PORT): structured messages. The
+    first byte picks the encoding — `j` for UTF-8 JSON, `c` for
+    `sp_bridge.codec` — and Python decodes the rest and sends it back
+    re-encoded the same way. Used by the throughput test's JSON vs
+    codec comparison, so both sides pay a full decode + encode.
+  - **burst** (BRIDGE_EXAMPLE_BURST_PORT, BRIDGE_EXAMPLE_BURST_BATCHED_PORT,
+    BRIDGE_EXAMPLE_BURST_SHARED_PORT): Dart sends a codec
+    `{"n", "size", "mode"}` request on the first port; Python answers
+    with `n` frames of `size` bytes — one `send_bytes` each on the first
+    port (`plain`), through an `sp_bridge.batch.BatchSender` on the
+    second, a batched PythonBridge (`batched`), or as
+    `sp_bridge.shm.BufferPool` handles on the third (`shared`). Used by
+    the throughput test's messages/sec and zero-copy comparisons.
+  - **rpc** (BRIDGE_EXAMPLE_RPC_PORT): `sp_bridge.rpc` request/response
+    calls from `PythonRpcClient`. Used by the RPC test: concurrent
+    calls, cancellation, error frames and busy backpressure.
+    The `pool_bench` method times CPU-bound `cpu_jobs.burn` jobs in this
+    interpreter and across an `sp_bridge.pool.InterpreterPool` (Python
+    3.14+). Used by the pool test. `bench_startup` and `bench_imports`
+    (see `bench.py`) serve the benchmark suite.
+  - **metrics** (SERIOUS_PYTHON_BRIDGE_METRICS_PORT, only set when the
+    app is built with `BRIDGE_EXAMPLE_METRICS=true`): `sp_bridge.metrics`
+    snapshots of every channel above. Used by the metrics test.
 
 Python keeps the interpreter alive indefinitely so messages can keep
 arriving; Dart drives the process lifetime.
@@ -19,25 +42,52 @@ arriving; Dart drives the process lifetime.
 
 from __future__ import annotations
 
+import time
+
+# As early as possible: the benchmark suite's cold start runs from Dart's
+# `SeriousPython.run` to here.
+STARTED_AT = time.time()
+READY_AT = None
+
+import asyncio
 import json
 import os
 import sys
 import threading
 import tracemalloc
 
+import bench
+import cpu_jobs
 import dart_bridge
+from sp_bridge import codec, metrics, pool, rpc
+from sp_bridge.batch import BatchSender
+from sp_bridge.shm import BufferPool
 
 CONTROL_PORT_ENV = "BRIDGE_EXAMPLE_CONTROL_PORT"
 ECHO_PORT_ENV = "BRIDGE_EXAMPLE_ECHO_PORT"
+STRUCT_PORT_ENV = "BRIDGE_EXAMPLE_STRUCT_PORT"
+RPC_PORT_ENV = "BRIDGE_EXAMPLE_RPC_PORT"
+BURST_PORT_ENV = "BRIDGE_EXAMPLE_BURST_PORT"
+BURST_BATCHED_PORT_ENV = "BRIDGE_EXAMPLE_BURST_BATCHED_PORT"
+BURST_SHARED_PORT_ENV = "BRIDGE_EXAMPLE_BURST_SHARED_PORT"
 
 try:
     control_port = int(os.environ[CONTROL_PORT_ENV])
     echo_port = int(os.environ[ECHO_PORT_ENV])
+    struct_port = int(os.environ[STRUCT_PORT_ENV])
+    rpc_port = int(os.environ[RPC_PORT_ENV])
+    burst_port = int(os.environ[BURST_PORT_ENV])
+    burst_batched_port = int(os.environ[BURST_BATCHED_PORT_ENV])
+    burst_shared_port = int(os.environ[BURST_SHARED_PORT_ENV])
 except (KeyError, ValueError) as e:
     print(f"[bridge_example] missing/invalid env var: {e}",
           file=sys.stderr, flush=True)
     raise SystemExit(1)
 
+# Before any handler is registered, so every channel is measured.
+if os.environ.get("SERIOUS_PYTHON_BRIDGE_METRICS_PORT"):
+    metrics.install()
+
 counter = 0
 
 
@@ -125,10 +175,138 @@ def on_echo(payload: bytes) -> None:
     dart_bridge.send_bytes(echo_port, payload)
 
 
+def on_struct(payload: bytes) -> None:
+    if not payload:
+        return
+    kind = payload[:1]
+    if kind == b"j":
+        msg = json.loads(payload[1:])
+        out = b"j" + json.dumps(msg).encode("utf-8")
+    elif kind == b"c":
+        # memoryview slice: typed arrays decode as views, no copy.
+        msg = codec.unpackb(memoryview(payload)[1:])
+        out = b"c" + codec.packb(msg)
+    else:
+        return
+    dart_bridge.send_bytes(struct_port, out)
+
+
+burst_sender = BatchSender(burst_batched_port)
+# Slots are only committed as they're touched, so the 64 MB reservation
+# costs nothing until a shared burst runs.
+burst_pool = BufferPool(burst_shared_port, slot_size=16 * 1024 * 1024, slots=4)
+
+
+def _burst(n: int, size: int, mode: str) -> None:
+    frame = bytes(size)
+    if mode == "batched":
+        send = burst_sender.send
+        for _ in range(n):
+            send(frame)
+        burst_sender.flush()
+    elif mode == "shared":
+        # A real producer writes its payload into buf.view in place; here
+        # only a sequence byte changes, so the loop measures the transport.
+        for i in range(n):
+            buf = burst_pool.acquire(timeout=30)
+            buf.view[0] = i & 0xFF
+            burst_pool.send(buf, size)
+    else:
+        send_bytes = dart_bridge.send_bytes
+        for _ in range(n):
+            send_bytes(burst_port, frame)
+
+
+def on_burst(payload: bytes) -> None:
+    req = codec.unpackb(payload)
+    # Off the delivering thread, so the Dart send returns immediately.
+    threading.Thread(
+        target=_burst, args=(req["n"], req["size"], req["mode"]), daemon=True
+    ).start()
+
+
+# Small max_pending so the RPC test can provoke busy frames cheaply.
+server = rpc.RpcServer(rpc_port, max_pending=16)
+
+
+@server.method(inline=True)
+def add(a, b):
+    return a + b
+
+
+@server.method
+async def sleep(seconds, value=None):
+    await asyncio.sleep(seconds)
+    return value
+
+
+@server.method
+def spin(seconds):
+    """Busy sync call that stops early when Dart cancels it."""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if rpc.cancelled():
+            server.notify("spin_cancelled", seconds)
+            return None
+        time.sleep(0.01)
+    return seconds
+
+
+@server.method
+def fail(message):
+    raise ValueError(message)
+
+
+bench_pool = None
+
+
+@server.method
+def pool_bench(jobs, n, interpreters):
+    """Seconds to run `jobs` x `cpu_jobs.burn(n)` here, one after another,
+    and spread over `interpreters` subinterpreters; None before 3.14."""
+    global bench_pool
+    if not pool.available():
+        return None
+    if bench_pool is None or bench_pool.size != interpreters:
+        if bench_pool is not None:
+            bench_pool.close()
+        # Created (and cpu_jobs preloaded) outside the timed region.
+        bench_pool = pool.InterpreterPool(interpreters, preload=["cpu_jobs"])
+
+    t0 = time.perf_counter()
+    single = [cpu_jobs.burn(n) for _ in range(jobs)]
+    single_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    pooled = bench_pool.map("cpu_jobs:burn", [n] * jobs)
+    pool_s = time.perf_counter() - t0
+    return {"single_s": single_s, "pool_s": pool_s, "same": single == pooled}
+
+
+@server.method(inline=True)
+def bench_startup():
+    """Wall-clock times (`time.time()`) main.py started and finished
+    registering its handlers."""
+    return {"started_at": STARTED_AT, "ready_at": READY_AT}
+
+
+@server.method
+def bench_imports(modules, repeat, soref=None):
+    return bench.import_times(modules, repeat, soref)
+
+
+server.start()
+# Registered before the channels bootAndAwaitReady probes, so it's live too.
+dart_bridge.set_enqueue_handler_func(burst_port, on_burst)
 dart_bridge.set_enqueue_handler_func(control_port, on_control)
 dart_bridge.set_enqueue_handler_func(echo_port, on_echo)
+dart_bridge.set_enqueue_handler_func(struct_port, on_struct)
+READY_AT = time.time()
 print(
-    f"[bridge_example] control_port={control_port} echo_port={echo_port}",
+    f"[bridge_example] control_port={control_port} echo_port={echo_port} "
+    f"struct_port={struct_port} rpc_port={rpc_port} burst_port={burst_port} "
+    f"burst_batched_port={burst_batched_port} "
+    f"burst_shared_port={burst_shared_port}",
     flush=True,
 )
 
@@ -6,7 +6,7 @@ import 'package:bridge_example/main.dart' as app;
 import 'package:flutter_test/flutter_test.dart';
 import 'package:serious_python/bridge.dart';
 
-/// Boot the host app and wait for both PythonBridge channels to be ready
+/// Boot the host app and wait for all PythonBridge channels to be ready
 /// (i.e. for Python to have registered its handlers via
 /// `dart_bridge.set_enqueue_handler_func`). Once this returns, [sendControl]
 /// and `echoRoundTrip` will succeed without retry overhead.
@@ -33,6 +33,8 @@ Future<app.BridgeExampleHandle> bootAndAwaitReady(WidgetTester tester) async {
   // Probe the echo channel separately — handlers register independently and
   // there's no inherent ordering guarantee.
   await _probeEchoReady(handle.echoBridge);
+  await _probeStructReady(handle.structBridge);
+  await _probeRpcReady(handle.rpc);
   return handle;
 }
 
@@ -55,6 +57,41 @@ Future<void> _probeEchoReady(PythonBridge echo) async {
   await reply;
 }
 
+Future<void> _probeStructReady(PythonBridge struct) async {
+  final probe = Uint8List.fromList(utf8.encode('j{}'));
+  final reply = struct.messages.first.timeout(const Duration(seconds: 30));
+  const interval = Duration(milliseconds: 100);
+  const deadline = Duration(seconds: 30);
+  final start = DateTime.now();
+  while (!struct.send(probe)) {
+    if (DateTime.now().difference(start) > deadline) {
+      throw TimeoutException(
+          'Python struct handler never registered after $deadline');
+    }
+    await Future<void>.delayed(interval);
+  }
+  await reply;
+}
+
+Future<void> _probeRpcReady(PythonRpcClient rpc) async {
+  const interval = Duration(milliseconds: 100);
+  const deadline = Duration(seconds: 30);
+  final start = DateTime.now();
+  while (true) {
+    try {
+      await rpc.call('add', [0, 0]);
+      return;
+    } on StateError {
+      // Server handler not registered yet.
+    }
+    if (DateTime.now().difference(start) > deadline) {
+      throw TimeoutException(
+          'Python RPC server never registered after $deadline');
+    }
+    await Future<void>.delayed(interval);
+  }
+}
+
 /// Send a JSON control op (Dart→Python).
 void sendControl(app.BridgeExampleHandle handle, Map<String, dynamic> op) {
   handle.sendControl(op);
@@ -119,3 +156,100 @@ Future<MemSnapshot> memSnapshot(app.BridgeExampleHandle handle) async {
     tracedPeak: msg['traced_peak'] as int,
   );
 }
+
+/// Structured-message encodings compared by the throughput test. Each frame
+/// on the struct channel starts with the encoding's tag byte.
+enum StructEncoding {
+  json(0x6a), // 'j'
+  codec(0x63); // 'c'
+
+  const StructEncoding(this.tag);
+  final int tag;
+}
+
+/// Encode [message] with [encoding], round-trip it through Python's decode +
+/// re-encode on the struct channel, and decode the reply. Measures the full
+/// per-message cost: Dart encode, transport both ways, Python decode/encode,
+/// Dart decode.
+Future<Object?> structRoundTrip(
+  app.BridgeExampleHandle handle,
+  StructEncoding encoding,
+  Object? message, {
+  Duration timeout = const Duration(seconds: 30),
+}) async {
+  final body = switch (encoding) {
+    StructEncoding.json => utf8.encode(jsonEncode(message)),
+    StructEncoding.codec => BridgeCodec.encode(message),
+  };
+  final frame = Uint8List(body.length + 1)
+    ..[0] = encoding.tag
+    ..setRange(1, body.length + 1, body);
+  final reply = handle.structBridge.messages.first.timeout(timeout);
+  if (!handle.structBridge.send(frame)) {
+    throw StateError(
+        'struct bridge handler not registered — call bootAndAwaitReady first');
+  }
+  final bytes = await reply;
+  final rest = Uint8List.sublistView(bytes, 1);
+  return switch (encoding) {
+    StructEncoding.json => jsonDecode(utf8.decode(rest)),
+    StructEncoding.codec => BridgeCodec.decode(rest),
+  };
+}
+
+/// How Python delivers a burst (see app/src/main.py).
+enum BurstMode {
+  /// One `dart_bridge.send_bytes` per frame.
+  plain,
+
+  /// Coalesced by `sp_bridge.batch.BatchSender` onto a batched bridge.
+  batched,
+
+  /// `sp_bridge.shm.BufferPool` handles, viewed in place and released.
+  shared,
+}
+
+/// Ask Python for [count] frames of [size] bytes delivered per [mode], and
+/// time how long it takes until Dart has received all of them.
+Future<Duration> burst(
+  app.BridgeExampleHandle handle, {
+  required int count,
+  required int size,
+  BurstMode mode = BurstMode.plain,
+  Duration timeout = const Duration(seconds: 60),
+}) async {
+  var received = 0;
+  final done = Completer<void>();
+  void onFrame(int length) {
+    if (length != size) return;
+    if (++received == count) done.complete();
+  }
+
+  final StreamSubscription<Object> sub;
+  switch (mode) {
+    case BurstMode.plain:
+      sub = handle.burstBridge.messages.listen((f) => onFrame(f.length));
+    case BurstMode.batched:
+      sub =
+          handle.burstBatchedBridge.messages.listen((f) => onFrame(f.length));
+    case BurstMode.shared:
+      sub = handle.burstShared.buffers.listen((buf) {
+        final length = buf.bytes.length;
+        buf.release();
+        onFrame(length);
+      });
+  }
+  final sw = Stopwatch()..start();
+  if (!handle.burstBridge
+      .sendMessage({'n': count, 'size': size, 'mode': mode.name})) {
+    await sub.cancel();
+    throw StateError('burst handler not registered');
+  }
+  try {
+    await done.future.timeout(timeout);
+  } finally {
+    await sub.cancel();
+  }
+  sw.stop();
+  return sw.elapsed;
+}
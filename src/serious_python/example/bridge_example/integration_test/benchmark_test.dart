@@ -0,0 +1,276 @@
+import 'dart:convert';
+import 'dart:io';
+import 'dart:math';
+import 'dart:typed_data';
+
+import 'package:flutter_test/flutter_test.dart';
+import 'package:integration_test/integration_test.dart';
+import 'package:serious_python/serious_python.dart';
+
+import '_helpers.dart';
+
+/// Where the JSON report goes. Relative paths resolve against the directory
+/// the app starts in; pass an absolute one from CI.
+const _out = String.fromEnvironment('BENCHMARK_OUT',
+    defaultValue: 'build/benchmark.json');
+
+/// A report of an earlier run to compare against; empty: no comparison.
+const _baseline = String.fromEnvironment('BENCHMARK_BASELINE');
+
+/// How much worse than the baseline a metric may get, as a fraction of the
+/// baseline value, on top of the metric's own noise allowance.
+const _tolerance = String.fromEnvironment('BENCHMARK_TOLERANCE',
+    defaultValue: '0.25');
+
+/// `_sp_bootstrap.py`, whose `.soref` finder the import benchmark runs with
+/// simulated markers. Skipped if the file isn't there.
+const _sorefBootstrap = String.fromEnvironment('BENCHMARK_SOREF_BOOTSTRAP',
+    defaultValue: '../../../serious_python_android/python/_sp_bootstrap.py');
+
+const _reportFormat = 'sp-bench/1';
+
+// Modules main.py doesn't import itself, so each one is timed cold.
+const _modules = [
+  'argparse',
+  'csv',
+  'difflib',
+  'email.message',
+  'http.client',
+  'tomllib',
+  'unittest',
+  'xml.dom.minidom',
+];
+const _importRepeat = 5;
+const _sorefMarkers = 500;
+
+// (payloadBytes, iterations) for the round-trip sweep.
+const _sizes = <(int, int)>[
+  (64, 2000),
+  (1024, 2000),
+  (64 * 1024, 500),
+  (1024 * 1024, 100),
+  (16 * 1024 * 1024, 20),
+];
+
+void main() {
+  IntegrationTestWidgetsFlutterBinding.ensureInitialized();
+
+  testWidgets('benchmark: startup, imports, bridge, memory', (tester) async {
+    // SeriousPython.run moves the current directory; resolve paths first.
+    final out = File(_out).absolute;
+    final baseline = _baseline.isEmpty ? null : File(_baseline).absolute;
+    final bootstrap = File(_sorefBootstrap).absolute;
+
+    final report = _Report();
+    final handle = await bootAndAwaitReady(tester);
+    final rpc = handle.rpc;
+
+    // Startup: Dart's SeriousPython.run -> first line of main.py (interpreter
+    // init, site, sys.path) -> every handler registered.
+    var startup = await rpc.call('bench_startup') as Map;
+    while (startup['ready_at'] == null) {
+      await Future<void>.delayed(const Duration(milliseconds: 50));
+      startup = await rpc.call('bench_startup') as Map;
+    }
+    final runAt = handle.runStartedAt.microsecondsSinceEpoch / 1000;
+    final startedAt = (startup['started_at'] as num) * 1000;
+    final readyAt = (startup['ready_at'] as num) * 1000;
+    report.add('startup.run_to_main_ms', startedAt - runAt, 'ms', noise: 20);
+    report.add('startup.run_to_ready_ms', readyAt - runAt, 'ms', noise: 20);
+
+    // prepareApp once the app is in place (as on every launch after the
+    // first).
+    final prepare = <double>[];
+    for (var i = 0; i < 5; i++) {
+      final sw = Stopwatch()..start();
+      await SeriousPython.prepareApp();
+      prepare.add(sw.elapsedMicroseconds / 1000);
+    }
+    report.add('startup.prepare_app_ms', _median(prepare), 'ms', noise: 5);
+
+    // Steady-state RSS of the idle app (Dart, Flutter and Python share the
+    // process on the desktop).
+    report.add('memory.idle_rss_mb', await _steadyRssMb(), 'MB', noise: 10);
+
+    // Imports, plain and through the .soref finder.
+    final hasBootstrap = await bootstrap.exists();
+    final imports = await rpc.call(
+        'bench_imports',
+        {
+          'modules': _modules,
+          'repeat': _importRepeat,
+          'soref': hasBootstrap
+              ? {'bootstrap': bootstrap.path, 'markers': _sorefMarkers}
+              : null,
+        },
+        const Duration(minutes: 5)) as Map;
+    for (final MapEntry(key: name, value: times)
+        in (imports['modules'] as Map).entries) {
+      if (times == null) continue; // imported by main.py already
+      report.add('import.$name.plain_ms', times['plain_ms'] as num, 'ms',
+          noise: 2);
+      if (times['soref_ms'] != null) {
+        report.add('import.$name.soref_ms', times['soref_ms'] as num, 'ms',
+            noise: 2);
+      }
+    }
+    final soref = imports['soref'] as Map?;
+    if (soref != null) {
+      report.add('soref.index_load_ms', soref['index_load_ms'] as num, 'ms',
+          noise: 1);
+      report.add('soref.hit_us', soref['hit_us'] as num, 'us', noise: 10);
+      report.add('soref.miss_us', soref['miss_us'] as num, 'us', noise: 10);
+      report.add('soref.cached_miss_us', soref['cached_miss_us'] as num, 'us',
+          noise: 1);
+    } else {
+      // ignore: avoid_print
+      print('[bridge_bench] .soref finder skipped: $bootstrap not found');
+    }
+
+    // Echo round trips.
+    for (final (size, iterations) in _sizes) {
+      final rng = Random(0xBE4C ^ size);
+      final payload =
+          Uint8List.fromList(List<int>.generate(size, (_) => rng.nextInt(256)));
+      for (var i = 0; i < 5; i++) {
+        await echoRoundTrip(handle, payload);
+      }
+      final samples = <double>[];
+      for (var i = 0; i < iterations; i++) {
+        final sw = Stopwatch()..start();
+        await echoRoundTrip(handle, payload);
+        samples.add(sw.elapsedMicroseconds.toDouble());
+      }
+      samples.sort();
+      final mean = samples.reduce((a, b) => a + b) / samples.length;
+      final p95 = samples[samples.length * 95 ~/ 100];
+      // Both directions cross the bridge.
+      final mbPerSec = 2 * size / (mean / 1e6) / (1024 * 1024);
+      report.add('bridge.$size.rtt_p50_us', _median(samples), 'us', noise: 50);
+      report.add('bridge.$size.rtt_p95_us', p95, 'us', noise: 100);
+      report.add('bridge.$size.throughput_mb_s', mbPerSec, 'MB/s',
+          higherIsBetter: true, noise: 1);
+    }
+
+    report.add('memory.loaded_rss_mb', await _steadyRssMb(), 'MB', noise: 10);
+
+    report.environment = {
+      'os': Platform.operatingSystem,
+      'os_version': Platform.operatingSystemVersion,
+      'cpus': Platform.numberOfProcessors,
+      'dart': Platform.version,
+      'python': handle.pythonVersion.value,
+      'timestamp': DateTime.now().toUtc().toIso8601String(),
+    };
+
+    var regressions = const <String>[];
+    if (baseline != null) {
+      regressions = report.compare(
+          jsonDecode(await baseline.readAsString()) as Map<String, dynamic>,
+          double.parse(_tolerance));
+    }
+    await out.parent.create(recursive: true);
+    await out.writeAsString(
+        const JsonEncoder.withIndent('  ').convert(report.toJson()));
+    // ignore: avoid_print
+    print('[bridge_bench] report written to ${out.path}');
+
+    expect(regressions, isEmpty,
+        reason: 'regressed against ${baseline?.path}:\n'
+            '${regressions.join('\n')}');
+  });
+}
+
+class _Metric {
+  _Metric(this.value, this.unit, this.higherIsBetter, this.noise);
+
+  final double value;
+  final String unit;
+  final bool higherIsBetter;
+
+  /// Absolute change that is run-to-run noise rather than a regression.
+  final double noise;
+}
+
+class _Report {
+  final Map<String, _Metric> metrics = {};
+  Map<String, Object?> environment = {};
+  Map<String, Object?>? comparison;
+
+  void add(String name, num value, String unit,
+      {bool higherIsBetter = false, num noise = 0}) {
+    metrics[name] =
+        _Metric(value.toDouble(), unit, higherIsBetter, noise.toDouble());
+    // ignore: avoid_print
+    print('[bridge_bench] $name=${value.toStringAsFixed(2)}$unit');
+  }
+
+  /// Compare with [baseline] (a report's JSON); returns one line per metric
+  /// that got worse by more than [tolerance] of its baseline value plus its
+  /// noise allowance. Metrics missing from either side are left out.
+  List<String> compare(Map<String, dynamic> baseline, double tolerance) {
+    if (baseline['format'] != _reportFormat) {
+      throw FormatException(
+          'baseline is ${baseline['format']}, expected $_reportFormat');
+    }
+    final base = baseline['metrics'] as Map<String, dynamic>;
+    final regressions = <String>[];
+    final rows = <String, Object?>{};
+    for (final MapEntry(key: name, value: m) in metrics.entries) {
+      final b = base[name] as Map<String, dynamic>?;
+      if (b == null) continue;
+      final was = (b['value'] as num).toDouble();
+      final worse = m.higherIsBetter ? was - m.value : m.value - was;
+      final regressed = worse > tolerance * was.abs() + m.noise;
+      final change = was == 0 ? 0.0 : (m.value - was) / was * 100;
+      rows[name] = {
+        'baseline': was,
+        'value': m.value,
+        'change_pct': change,
+        'regressed': regressed,
+      };
+      if (regressed) {
+        regressions.add('$name: ${was.toStringAsFixed(2)} -> '
+            '${m.value.toStringAsFixed(2)}${m.unit} '
+            '(${change >= 0 ? '+' : ''}${change.toStringAsFixed(1)}%)');
+      }
+    }
+    comparison = {
+      'baseline_environment': baseline['environment'],
+      'tolerance': tolerance,
+      'metrics': rows,
+    };
+    return regressions;
+  }
+
+  Map<String, Object?> toJson() => {
+        'format': _reportFormat,
+        'environment': environment,
+        'metrics': {
+          for (final MapEntry(key: name, value: m) in metrics.entries)
+            name: {
+              'value': m.value,
+              'unit': m.unit,
+              'better': m.higherIsBetter ? 'higher' : 'lower',
+              'noise': m.noise,
+            }
+        },
+        if (comparison != null) 'comparison': comparison,
+      };
+}
+
+double _median(List<double> samples) {
+  final sorted = [...samples]..sort();
+  return sorted[sorted.length ~/ 2];
+}
+
+// Median of RSS samples over two idle seconds, once allocations have
+// settled.
+Future<double> _steadyRssMb() async {
+  final samples = <double>[];
+  for (var i = 0; i < 10; i++) {
+    await Future<void>.delayed(const Duration(milliseconds: 200));
+    samples.add(ProcessInfo.currentRss / (1024 * 1024));
+  }
+  return _median(samples);
+}
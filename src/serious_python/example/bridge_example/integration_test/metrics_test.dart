@@ -0,0 +1,63 @@
+import 'dart:typed_data';
+
+import 'package:bridge_example/main.dart' as app;
+import 'package:flutter_test/flutter_test.dart';
+import 'package:integration_test/integration_test.dart';
+
+import '_helpers.dart';
+
+void main() {
+  IntegrationTestWidgetsFlutterBinding.ensureInitialized();
+
+  testWidgets('metrics: per-port counters, histograms and gauges',
+      (tester) async {
+    final handle = await bootAndAwaitReady(tester);
+    final metrics = handle.metrics;
+
+    final payload = Uint8List(4096);
+    for (var i = 0; i < 100; i++) {
+      await echoRoundTrip(handle, payload);
+    }
+    await Future.wait(
+        [for (var i = 0; i < 10; i++) handle.rpc.call('add', [i, 1])]);
+    await burst(handle, count: 500, size: 64, mode: BurstMode.batched);
+
+    final snap = await metrics.snapshot();
+    expect(snap['enabled'], isTrue);
+    final ports = snap['ports'] as Map;
+
+    // The readiness probe adds one echo on top of the hammer loop.
+    final echo = ports[handle.echoBridge.port] as Map;
+    expect(echo['in_messages'], greaterThanOrEqualTo(100));
+    expect(echo['out_bytes'], greaterThanOrEqualTo(100 * payload.length));
+    expect(echo['handler_errors'], 0);
+    expect(echo['dropped'], 0);
+    final handler = echo['handler'] as Map;
+    expect(handler['count'], echo['in_messages']);
+    expect((handler['buckets'] as List).fold<int>(0, (a, n) => a + (n as int)),
+        handler['count']);
+
+    final rpc = ports[handle.rpcBridge.port] as Map;
+    expect(rpc['in_messages'], greaterThanOrEqualTo(10));
+    expect((rpc['gauges'] as Map)['rpc_pending'], 0);
+
+    final batched = ports[handle.burstBatchedBridge.port] as Map;
+    expect((batched['gauges'] as Map)['batch_frames_sent'],
+        greaterThanOrEqualTo(500));
+    expect(batched['out_messages'], lessThan(500),
+        reason: 'BatchSender should post fewer messages than frames');
+
+    // The metrics port itself is never measured.
+    expect(ports.containsKey(handle.metricsBridge.port), isFalse);
+
+    for (final MapEntry(:key, :value) in ports.entries) {
+      final m = value as Map;
+      final h = m['handler'] as Map?;
+      // ignore: avoid_print
+      print('[bridge_perf] metrics port=$key in=${m['in_messages']} '
+          'out=${m['out_messages']} handler_p95=${h?['p95_us']}us '
+          'max_inflight=${m['max_inflight']} dropped=${m['dropped']} '
+          'gauges=${m['gauges']}');
+    }
+  }, skip: !app.metricsEnabled);
+}
@@ -0,0 +1,57 @@
+import 'dart:io';
+import 'dart:math';
+
+import 'package:flutter_test/flutter_test.dart';
+import 'package:integration_test/integration_test.dart';
+
+import '_helpers.dart';
+
+/// Speedup four interpreters must reach over one; empty (the default): the
+/// speedup is only reported. Shared CI runners are too noisy for a
+/// wall-clock gate, so set it on dedicated hardware only.
+const _minSpeedup = String.fromEnvironment('POOL_MIN_SPEEDUP');
+
+void main() {
+  IntegrationTestWidgetsFlutterBinding.ensureInitialized();
+
+  // Each job is ~0.25 s of pure-Python work on an M2 Pro; jobs per run scale
+  // with the pool so every interpreter gets several.
+  const n = 100000;
+  const jobsPerInterpreter = 4;
+
+  testWidgets('subinterpreter pool: CPU-bound jobs vs one interpreter',
+      (tester) async {
+    final handle = await bootAndAwaitReady(tester);
+    final cores = Platform.numberOfProcessors;
+    final sizes = {1, 2, 4, min(cores, 8)}.where((s) => s <= cores).toList()
+      ..sort();
+
+    final speedups = <int, double>{};
+    for (final size in sizes) {
+      final jobs = size * jobsPerInterpreter;
+      final result = await handle.rpc.call('pool_bench',
+          {'jobs': jobs, 'n': n, 'interpreters': size},
+          const Duration(minutes: 5)) as Map?;
+      if (result == null) {
+        // ignore: avoid_print
+        print('[bridge_perf] pool skipped: subinterpreters need Python 3.14+');
+        return;
+      }
+      expect(result['same'], isTrue,
+          reason: 'pool results differ from the single interpreter');
+      final single = (result['single_s'] as num).toDouble();
+      final pooled = (result['pool_s'] as num).toDouble();
+      speedups[size] = single / pooled;
+      // ignore: avoid_print
+      print('[bridge_perf] pool interpreters=$size jobs=$jobs '
+          'single=${(single * 1000).toStringAsFixed(0)}ms '
+          'pool=${(pooled * 1000).toStringAsFixed(0)}ms '
+          'speedup=${speedups[size]!.toStringAsFixed(2)}x');
+    }
+
+    if (_minSpeedup.isNotEmpty && speedups.containsKey(4)) {
+      expect(speedups[4]!, greaterThan(double.parse(_minSpeedup)),
+          reason: '4 subinterpreters did not scale past one interpreter');
+    }
+  });
+}
@@ -0,0 +1,72 @@
+import 'dart:async';
+
+import 'package:flutter_test/flutter_test.dart';
+import 'package:integration_test/integration_test.dart';
+import 'package:serious_python/bridge.dart';
+
+import '_helpers.dart';
+
+void main() {
+  IntegrationTestWidgetsFlutterBinding.ensureInitialized();
+
+  testWidgets('rpc: concurrent calls, errors, cancellation, backpressure',
+      (tester) async {
+    final handle = await bootAndAwaitReady(tester);
+    final rpc = handle.rpc;
+
+    // A slow call must not hold up fast ones on the same port.
+    final slow = rpc.call('sleep', [1.0, 'slow']);
+    var slowDone = false;
+    unawaited(slow.then((_) => slowDone = true));
+    final sums = await Future.wait(
+        [for (var i = 0; i < 20; i++) rpc.call('add', [i, i])]);
+    expect(sums, [for (var i = 0; i < 20; i++) 2 * i]);
+    expect(slowDone, isFalse,
+        reason: 'fast calls were serialized behind the slow one');
+    expect(await slow, 'slow');
+
+    // Results come back in completion order, matched by correlation id.
+    final ordered = await Future.wait([
+      rpc.call('sleep', [0.3, 'a']),
+      rpc.call('sleep', [0.1, 'b']),
+    ]);
+    expect(ordered, ['a', 'b']);
+
+    // Python exceptions arrive as error frames.
+    await expectLater(
+        rpc.call('fail', ['nope']),
+        throwsA(isA<PythonRpcException>()
+            .having((e) => e.type, 'type', 'ValueError')
+            .having((e) => e.message, 'message', 'nope')));
+
+    // Timeout cancels the call; a cooperative sync method sees it.
+    final cancelledNote = rpc.notifications
+        .firstWhere((n) => n.topic == 'spin_cancelled')
+        .timeout(const Duration(seconds: 5));
+    await expectLater(rpc.call('spin', [10], const Duration(milliseconds: 200)),
+        throwsA(isA<PythonRpcCancelledException>()));
+    await cancelledNote;
+
+    // Explicit cancel of an async call.
+    final call = rpc.start('sleep', [10]);
+    call.cancel();
+    await expectLater(
+        call.result, throwsA(isA<PythonRpcCancelledException>()));
+
+    // Flooding past the server's max_pending (16) yields busy frames rather
+    // than an unbounded queue.
+    final flood = [
+      for (var i = 0; i < 40; i++)
+        rpc.call('sleep', [0.5, i]).then<Object?>((v) => v,
+            onError: (Object e) => e)
+    ];
+    final outcomes = await Future.wait(flood);
+    final busy = outcomes.whereType<PythonRpcBusyException>().length;
+    final ok = outcomes.whereType<int>().length;
+    // ignore: avoid_print
+    print('[bridge_rpc] flood ok=$ok busy=$busy');
+    expect(busy, greaterThan(0));
+    expect(ok + busy, flood.length);
+    expect(rpc.pending, 0);
+  });
+}
@@ -1,3 +1,4 @@
+import 'dart:convert';
 import 'dart:math';
 import 'dart:typed_data';
 
@@ -69,4 +70,141 @@ void main() {
       }
     }
   });
+
+  // (elements, iterations) for the structured-message comparison. Each
+  // message carries `elements` float64 samples plus an `elements`-byte blob:
+  // ~9 B/element on the wire for the codec, far more as JSON text + base64.
+  const structSizes = <(int, int)>[
+    (16, 200),
+    (1024, 100),
+    (16 * 1024, 50),
+    (128 * 1024, 10),
+  ];
+
+  testWidgets('structured messages: JSON vs BridgeCodec', (tester) async {
+    final handle = await bootAndAwaitReady(tester);
+    for (final (elements, iterations) in structSizes) {
+      final rng = Random(0xC0DEC ^ elements);
+      final samples =
+          Float64List.fromList(List.generate(elements, (_) => rng.nextDouble()));
+      final blob = Uint8List.fromList(
+          List<int>.generate(elements, (_) => rng.nextInt(256)));
+
+      final means = <StructEncoding, double>{};
+      for (final encoding in StructEncoding.values) {
+        Object? message(int seq) => switch (encoding) {
+              StructEncoding.json => {
+                  'seq': seq,
+                  'samples': samples,
+                  'blob': base64Encode(blob),
+                },
+              StructEncoding.codec => {
+                  'seq': seq,
+                  'samples': samples,
+                  'blob': blob,
+                },
+            };
+
+        // Verify content once per size/encoding, outside the timed loop.
+        final first =
+            await structRoundTrip(handle, encoding, message(0)) as Map;
+        expect((first['samples'] as List).length, elements);
+        expect(first['samples'] as List, orderedEquals(samples),
+            reason: '${encoding.name} mutated samples at n=$elements');
+
+        final samplesUs = <int>[];
+        for (var i = 0; i < iterations; i++) {
+          final sw = Stopwatch()..start();
+          await structRoundTrip(handle, encoding, message(i));
+          sw.stop();
+          samplesUs.add(sw.elapsedMicroseconds);
+        }
+        samplesUs.sort();
+        final p50 = samplesUs[samplesUs.length ~/ 2];
+        final mean = samplesUs.reduce((a, b) => a + b) / samplesUs.length;
+        means[encoding] = mean;
+
+        // ignore: avoid_print
+        print('[bridge_perf] struct encoding=${encoding.name} '
+            'elements=$elements N=$iterations '
+            'p50=${(p50 / 1000).toStringAsFixed(2)}ms '
+            'mean=${(mean / 1000).toStringAsFixed(2)}ms');
+      }
+
+      final speedup =
+          means[StructEncoding.json]! / means[StructEncoding.codec]!;
+      // ignore: avoid_print
+      print('[bridge_perf] struct elements=$elements '
+          'codec_speedup=${speedup.toStringAsFixed(1)}x');
+
+      // At the larger sizes JSON's per-element text cost dominates; the
+      // codec should win comfortably there on every platform.
+      if (elements >= 16 * 1024) {
+        expect(speedup, greaterThan(2),
+            reason: 'codec not faster than JSON at n=$elements');
+      }
+    }
+  });
+
+  // (frameBytes, frames) for the batching comparison: small telemetry-style
+  // frames, where the per-post cost dominates.
+  const burstSizes = <(int, int)>[
+    (16, 20000),
+    (64, 20000),
+    (256, 20000),
+    (1024, 10000),
+  ];
+
+  testWidgets('python->dart messages/sec with and without batching',
+      (tester) async {
+    final handle = await bootAndAwaitReady(tester);
+    for (final (size, count) in burstSizes) {
+      final rates = <BurstMode, double>{};
+      for (final mode in [BurstMode.plain, BurstMode.batched]) {
+        // Warm-up burst, then the measured one.
+        await burst(handle, count: count ~/ 10, size: size, mode: mode);
+        final elapsed =
+            await burst(handle, count: count, size: size, mode: mode);
+        final rate = count / (elapsed.inMicroseconds / 1e6);
+        rates[mode] = rate;
+        // ignore: avoid_print
+        print('[bridge_perf] burst size=$size N=$count mode=${mode.name} '
+            'elapsed=${elapsed.inMilliseconds}ms '
+            'rate=${rate.toStringAsFixed(0)}msg/s');
+      }
+      // ignore: avoid_print
+      print('[bridge_perf] burst size=$size batching_speedup='
+          '${(rates[BurstMode.batched]! / rates[BurstMode.plain]!).toStringAsFixed(1)}x');
+    }
+  });
+
+  // (payloadBytes, frames) for copy vs shared-memory delivery of large
+  // Python -> Dart payloads.
+  const sharedSizes = <(int, int)>[
+    (1024 * 1024, 200),
+    (16 * 1024 * 1024, 30),
+  ];
+
+  testWidgets('large payloads: send_bytes copy vs shared buffers',
+      (tester) async {
+    final handle = await bootAndAwaitReady(tester);
+    for (final (size, count) in sharedSizes) {
+      final mbPerSec = <BurstMode, double>{};
+      for (final mode in [BurstMode.plain, BurstMode.shared]) {
+        await burst(handle, count: 3, size: size, mode: mode);
+        final elapsed =
+            await burst(handle, count: count, size: size, mode: mode);
+        final seconds = elapsed.inMicroseconds / 1e6;
+        mbPerSec[mode] = count * size / (seconds * 1024 * 1024);
+        // ignore: avoid_print
+        print('[bridge_perf] large size=$size N=$count mode=${mode.name} '
+            'mean=${(seconds * 1000 / count).toStringAsFixed(2)}ms '
+            'throughput=${mbPerSec[mode]!.toStringAsFixed(1)}MB/s');
+      }
+      // No copy per frame: the shared path must beat copying at these sizes.
+      expect(mbPerSec[BurstMode.shared]!,
+          greaterThan(mbPerSec[BurstMode.plain]!),
+          reason: 'shared buffers not faster than send_bytes at size=$size');
+    }
+  });
 }
@@ -11,12 +11,28 @@ import 'package:serious_python/serious_python.dart';
 /// reads them from os.environ.
 const _controlPortEnv = 'BRIDGE_EXAMPLE_CONTROL_PORT';
 const _echoPortEnv = 'BRIDGE_EXAMPLE_ECHO_PORT';
+const _structPortEnv = 'BRIDGE_EXAMPLE_STRUCT_PORT';
+const _rpcPortEnv = 'BRIDGE_EXAMPLE_RPC_PORT';
+const _burstPortEnv = 'BRIDGE_EXAMPLE_BURST_PORT';
+const _burstBatchedPortEnv = 'BRIDGE_EXAMPLE_BURST_BATCHED_PORT';
+const _burstSharedPortEnv = 'BRIDGE_EXAMPLE_BURST_SHARED_PORT';
+const _metricsPortEnv = 'SERIOUS_PYTHON_BRIDGE_METRICS_PORT';
 
-/// Top-level handle exposing the two bridges + the latest counter/version to
+/// Whether Python instruments the bridge with `sp_bridge.metrics`
+/// (`--dart-define=BRIDGE_EXAMPLE_METRICS=true`). Off by default so the
+/// throughput numbers measure the bare transport.
+const bool metricsEnabled = bool.fromEnvironment('BRIDGE_EXAMPLE_METRICS');
+
+/// Top-level handle exposing the bridges + the latest counter/version to
 /// integration tests, so they can interact with the transport without traversing
-/// the widget tree. Populated by `main()` once both bridges are constructed.
+/// the widget tree. Populated by `main()` once all bridges are constructed.
 class BridgeExampleHandle {
-  BridgeExampleHandle._(this.controlBridge, this.echoBridge);
+  BridgeExampleHandle._(this.controlBridge, this.echoBridge, this.structBridge,
+      this.rpcBridge, this.burstBridge, this.burstBatchedBridge,
+      this.burstSharedBridge, this.metricsBridge)
+      : rpc = PythonRpcClient(rpcBridge),
+        burstShared = PythonSharedBuffers(burstSharedBridge),
+        metrics = PythonBridgeMetrics(metricsBridge);
 
   static BridgeExampleHandle? _instance;
   static BridgeExampleHandle get instance {
@@ -31,6 +47,27 @@ class BridgeExampleHandle {
   final PythonBridge controlBridge;
   final PythonBridge echoBridge;
 
+  /// Structured-message channel: `j`/`c` prefixed JSON or [BridgeCodec]
+  /// frames that Python decodes and re-encodes (see app/src/main.py).
+  final PythonBridge structBridge;
+
+  /// Bridge served by the Python `sp_bridge.rpc.RpcServer`, and the client
+  /// that owns its message stream.
+  final PythonBridge rpcBridge;
+  final PythonRpcClient rpc;
+
+  /// Burst request channel (also receives plain bursts), the batched bridge
+  /// Python's `BatchSender` posts to, and the bridge carrying `BufferPool`
+  /// handles with its receiver.
+  final PythonBridge burstBridge;
+  final PythonBridge burstBatchedBridge;
+  final PythonBridge burstSharedBridge;
+  final PythonSharedBuffers burstShared;
+
+  /// Port `sp_bridge.metrics` serves snapshots on when [metricsEnabled].
+  final PythonBridge metricsBridge;
+  final PythonBridgeMetrics metrics;
+
   /// Current counter value (updated when Python emits {event: count}).
   final ValueNotifier<int> counter = ValueNotifier<int>(0);
 
@@ -38,6 +75,10 @@ class BridgeExampleHandle {
   /// event arrives.
   final ValueNotifier<String?> pythonVersion = ValueNotifier<String?>(null);
 
+  /// When `main()` called `SeriousPython.run` — where the benchmark suite's
+  /// cold-start timings begin.
+  late final DateTime runStartedAt;
+
   /// Send a JSON control op (Dart → Python) on the control channel.
   void sendControl(Map<String, dynamic> op) {
     final bytes = Uint8List.fromList(utf8.encode(jsonEncode(op)));
@@ -69,15 +110,28 @@ void main() {
   // testable handle is available immediately.
   final control = PythonBridge();
   final echo = PythonBridge();
-  BridgeExampleHandle._instance =
-      BridgeExampleHandle._(control, echo);
+  final struct = PythonBridge();
+  final rpc = PythonBridge();
+  final burst = PythonBridge();
+  final burstBatched = PythonBridge(batched: true);
+  final burstShared = PythonBridge();
+  final metrics = PythonBridge();
+  final handle = BridgeExampleHandle._instance = BridgeExampleHandle._(
+      control, echo, struct, rpc, burst, burstBatched, burstShared, metrics);
 
   // Fire-and-forget: Python's main.py blocks forever waiting for messages.
   // Awaiting SeriousPython.run() would deadlock the UI.
+  handle.runStartedAt = DateTime.now();
   unawaited(SeriousPython.run(
     environmentVariables: {
       _controlPortEnv: '${control.port}',
       _echoPortEnv: '${echo.port}',
+      _structPortEnv: '${struct.port}',
+      _rpcPortEnv: '${rpc.port}',
+      _burstPortEnv: '${burst.port}',
+      _burstBatchedPortEnv: '${burstBatched.port}',
+      _burstSharedPortEnv: '${burstShared.port}',
+      if (metricsEnabled) _metricsPortEnv: '${metrics.port}',
     },
   ));
 
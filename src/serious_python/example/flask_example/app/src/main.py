@@ -1,11 +1,10 @@
+import os
+import threading
 from contextlib import redirect_stdout
 from io import StringIO
 
 from flask import Flask, request
-
-port = 55001
-
-print("Trying to run a socket server on:", port)
+from sp_bridge import web
 
 
 class PythonRunner:
@@ -37,4 +36,6 @@ def run_python():
     except Exception as e:
         return str(e)
 
-app.run(port=port)
+# Served over the bridge the Dart side passes, not a loopback port.
+web.HttpServer(int(os.environ["FLASK_EXAMPLE_HTTP_PORT"]), app).start()
+threading.Event().wait()
@@ -1,16 +1,22 @@
 import 'dart:convert';
 
 import 'package:flutter/material.dart';
-import 'package:http/http.dart' as http;
+import 'package:serious_python/bridge.dart';
 import 'package:serious_python/serious_python.dart';
 
+// Requests go to the Flask app in-process, over this bridge.
+final httpBridge = PythonBridge();
+final client = PythonHttpClient(httpBridge);
+
 void main() {
   startPython();
   runApp(const MyApp());
 }
 
 void startPython() async {
-  SeriousPython.run(environmentVariables: {"a": "1", "b": "2"});
+  SeriousPython.run(environmentVariables: {
+    "FLASK_EXAMPLE_HTTP_PORT": "${httpBridge.port}",
+  });
 }
 
 class MyApp extends StatefulWidget {
@@ -40,7 +46,7 @@ class _MyAppState extends State<MyApp> {
   Future getServiceResult() async {
     while (true) {
       try {
-        var response = await http.get(Uri.parse("http://127.0.0.1:55001"));
+        var response = await client.get(Uri.parse("http://app/"));
         setState(() {
           _result = response.body;
         });
@@ -100,10 +106,8 @@ class _MyAppState extends State<MyApp> {
                               setState(() {
                                 _result = null;
                               });
-                              http
-                                  .post(
-                                      Uri.parse(
-                                          "http://127.0.0.1:55001/python"),
+                              client
+                                  .post(Uri.parse("http://app/python"),
                                       headers: {
                                         'Content-Type': 'application/json'
                                       },
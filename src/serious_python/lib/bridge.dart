@@ -1,11 +1,39 @@
 /// In-process Dart ↔ Python byte channel.
 ///
-/// See [PythonBridge] for the per-channel API. The lower-level [DartBridge]
-/// singleton (from the platform-interface package) is re-exported here for
-/// embedders that need the process-reuse / session-restart hooks added in
-/// libdart_bridge 1.3.0 — `isPythonInitialized` and `signalDartSession`.
+/// See [PythonBridge] for the per-channel API and [BridgeCodec] for the binary
+/// message format shared with the bundled Python `sp_bridge.codec` module;
+/// [PythonRpcClient] layers request/response calls on a bridge, served by
+/// `sp_bridge.rpc.RpcServer`, [PythonSharedBuffers] receives large
+/// payloads from a `sp_bridge.shm.BufferPool` without copying, and
+/// [PythonBridgeMetrics] reads `sp_bridge.metrics` snapshots.
+/// [PythonWorker] keeps one interpreter resident and runs jobs in it,
+/// re-attaching across Dart VM restarts, optionally with a pool of
+/// subinterpreters for CPU-bound jobs. [PythonHttpClient] is an
+/// `http.Client` for a WSGI or ASGI app served by `sp_bridge.web.HttpServer`,
+/// [PythonLogs] streams Python's log records and stdout/stderr, and
+/// [PythonMemory] has Python free memory when the OS runs low.
+/// The lower-level [DartBridge] singleton (from the platform-interface
+/// package) is re-exported here for embedders that need the process-reuse /
+/// session-restart hooks added in libdart_bridge 1.3.0 —
+/// `isPythonInitialized` and `signalDartSession`.
 library;
 
 export 'package:serious_python_platform_interface/src/dart_bridge_ffi.dart'
     show DartBridge;
+export 'src/bridge_codec.dart' show BridgeCodec;
 export 'src/python_bridge.dart' show PythonBridge;
+export 'src/python_bridge_metrics.dart' show PythonBridgeMetrics;
+export 'src/python_http_client.dart' show PythonHttpClient;
+export 'src/python_logs.dart' show PythonLogRecord, PythonLogs;
+export 'src/python_memory.dart' show PythonMemory;
+export 'src/python_rpc.dart'
+    show
+        PythonRpcBusyException,
+        PythonRpcCall,
+        PythonRpcCancelledException,
+        PythonRpcClient,
+        PythonRpcException,
+        PythonRpcNotification;
+export 'src/python_shared_buffers.dart'
+    show PythonSharedBuffer, PythonSharedBuffers;
+export 'src/python_worker.dart' show PythonWorker;
@@ -0,0 +1,450 @@
+import 'dart:convert';
+import 'dart:typed_data';
+
+/// Compact binary codec for [PythonBridge] messages — the Dart side of the
+/// Python `sp_bridge.codec` module that `serious_python:main package` bundles
+/// with every native app.
+///
+/// The wire format is MessagePack: `null`, `bool`, `int` (64-bit), `double`,
+/// `String`, `Uint8List` (msgpack `bin`, carried as-is — no base64), `List`
+/// and `Map`. Typed numeric lists travel as msgpack `ext` values whose payload
+/// is the raw little-endian element buffer:
+///
+/// | ext | Dart          | Python (`unpackb`) |
+/// |-----|---------------|--------------------|
+/// | 1   | `Int8List`    | `memoryview('b')`  |
+/// | 2   | `Int16List`   | `memoryview('h')`  |
+/// | 3   | `Uint16List`  | `memoryview('H')`  |
+/// | 4   | `Int32List`   | `memoryview('i')`  |
+/// | 5   | `Uint32List`  | `memoryview('I')`  |
+/// | 6   | `Int64List`   | `memoryview('q')`  |
+/// | 7   | `Uint64List`  | `memoryview('Q')`  |
+/// | 8   | `Float32List` | `memoryview('f')`  |
+/// | 9   | `Float64List` | `memoryview('d')`  |
+///
+/// Python `array.array`s and numpy arrays of those element types encode the
+/// same way. [decode] returns typed lists as views into the received frame
+/// when the element is suitably aligned (no copy), and copies otherwise.
+///
+/// ```dart
+/// bridge.sendMessage({'op': 'fft', 'samples': Float64List(4096)});
+/// bridge.decodedMessages.listen((msg) { /* Map / List / ... */ });
+/// ```
+class BridgeCodec {
+  BridgeCodec._();
+
+  static const extInt8 = 1;
+  static const extInt16 = 2;
+  static const extUint16 = 3;
+  static const extInt32 = 4;
+  static const extUint32 = 5;
+  static const extInt64 = 6;
+  static const extUint64 = 7;
+  static const extFloat32 = 8;
+  static const extFloat64 = 9;
+
+  /// Encode [value]. Throws [ArgumentError] for values the format can't carry.
+  static Uint8List encode(Object? value) {
+    final w = _Writer();
+    w.write(value);
+    return w.takeBytes();
+  }
+
+  /// Decode one value from [bytes]. Maps decode as `Map<Object?, Object?>`,
+  /// arrays as `List<Object?>`, `bin` as [Uint8List]. Throws
+  /// [FormatException] on malformed, truncated or trailing input.
+  static Object? decode(Uint8List bytes) {
+    final r = _Reader(bytes);
+    final value = r.read();
+    if (r.pos != bytes.length) {
+      throw FormatException(
+          '${bytes.length - r.pos} trailing bytes', bytes, r.pos);
+    }
+    return value;
+  }
+}
+
+final bool _hostLittle = Endian.host == Endian.little;
+
+class _Writer {
+  Uint8List _buf = Uint8List(256);
+  late ByteData _data = ByteData.sublistView(_buf);
+  int _len = 0;
+
+  Uint8List takeBytes() => Uint8List.sublistView(_buf, 0, _len);
+
+  void _ensure(int n) {
+    final need = _len + n;
+    if (need <= _buf.length) return;
+    var cap = _buf.length * 2;
+    while (cap < need) {
+      cap *= 2;
+    }
+    _buf = Uint8List(cap)..setRange(0, _len, _buf);
+    _data = ByteData.sublistView(_buf);
+  }
+
+  void _u8(int v) {
+    _ensure(1);
+    _buf[_len++] = v;
+  }
+
+  void _tag8(int tag, int v) {
+    _ensure(2);
+    _buf[_len++] = tag;
+    _buf[_len++] = v & 0xff;
+  }
+
+  void _tag16(int tag, int v) {
+    _ensure(3);
+    _buf[_len++] = tag;
+    _data.setUint16(_len, v);
+    _len += 2;
+  }
+
+  void _tag32(int tag, int v) {
+    _ensure(5);
+    _buf[_len++] = tag;
+    _data.setUint32(_len, v);
+    _len += 4;
+  }
+
+  void _bytes(List<int> b) {
+    _ensure(b.length);
+    _buf.setRange(_len, _len + b.length, b);
+    _len += b.length;
+  }
+
+  void write(Object? v) {
+    if (v == null) {
+      _u8(0xc0);
+    } else if (v is bool) {
+      _u8(v ? 0xc3 : 0xc2);
+    } else if (v is int) {
+      _writeInt(v);
+    } else if (v is double) {
+      _ensure(9);
+      _buf[_len++] = 0xcb;
+      _data.setFloat64(_len, v);
+      _len += 8;
+    } else if (v is String) {
+      final data = utf8.encode(v);
+      final n = data.length;
+      if (n < 32) {
+        _u8(0xa0 | n);
+      } else if (n < 0x100) {
+        _tag8(0xd9, n);
+      } else if (n < 0x10000) {
+        _tag16(0xda, n);
+      } else {
+        _tag32(0xdb, n);
+      }
+      _bytes(data);
+    } else if (v is Uint8List) {
+      _writeBinHeader(v.length);
+      _bytes(v);
+    } else if (v is TypedData) {
+      // Must precede the List case: typed lists are also List<int/double>.
+      _writeTyped(v);
+    } else if (v is List) {
+      final n = v.length;
+      if (n < 16) {
+        _u8(0x90 | n);
+      } else if (n < 0x10000) {
+        _tag16(0xdc, n);
+      } else {
+        _tag32(0xdd, n);
+      }
+      for (final item in v) {
+        write(item);
+      }
+    } else if (v is Map) {
+      final n = v.length;
+      if (n < 16) {
+        _u8(0x80 | n);
+      } else if (n < 0x10000) {
+        _tag16(0xde, n);
+      } else {
+        _tag32(0xdf, n);
+      }
+      v.forEach((key, value) {
+        write(key);
+        write(value);
+      });
+    } else {
+      throw ArgumentError.value(
+          v, 'value', 'cannot encode ${v.runtimeType} with BridgeCodec');
+    }
+  }
+
+  void _writeInt(int v) {
+    if (v >= 0) {
+      if (v < 0x80) {
+        _u8(v);
+      } else if (v < 0x100) {
+        _tag8(0xcc, v);
+      } else if (v < 0x10000) {
+        _tag16(0xcd, v);
+      } else if (v < 0x100000000) {
+        _tag32(0xce, v);
+      } else {
+        _ensure(9);
+        _buf[_len++] = 0xcf;
+        _data.setUint64(_len, v);
+        _len += 8;
+      }
+    } else if (v >= -32) {
+      _u8(v & 0xff);
+    } else if (v >= -0x80) {
+      _tag8(0xd0, v);
+    } else if (v >= -0x8000) {
+      _tag16(0xd1, v & 0xffff);
+    } else if (v >= -0x80000000) {
+      _tag32(0xd2, v & 0xffffffff);
+    } else {
+      _ensure(9);
+      _buf[_len++] = 0xd3;
+      _data.setInt64(_len, v);
+      _len += 8;
+    }
+  }
+
+  void _writeBinHeader(int n) {
+    if (n < 0x100) {
+      _tag8(0xc4, n);
+    } else if (n < 0x10000) {
+      _tag16(0xc5, n);
+    } else {
+      _tag32(0xc6, n);
+    }
+  }
+
+  void _writeTyped(TypedData v) {
+    final int ext;
+    if (v is Int8List) {
+      ext = BridgeCodec.extInt8;
+    } else if (v is Int16List) {
+      ext = BridgeCodec.extInt16;
+    } else if (v is Uint16List) {
+      ext = BridgeCodec.extUint16;
+    } else if (v is Int32List) {
+      ext = BridgeCodec.extInt32;
+    } else if (v is Uint32List) {
+      ext = BridgeCodec.extUint32;
+    } else if (v is Int64List) {
+      ext = BridgeCodec.extInt64;
+    } else if (v is Uint64List) {
+      ext = BridgeCodec.extUint64;
+    } else if (v is Float32List) {
+      ext = BridgeCodec.extFloat32;
+    } else if (v is Float64List) {
+      ext = BridgeCodec.extFloat64;
+    } else {
+      // ByteData, Uint8ClampedList, ...: plain bytes.
+      _writeBinHeader(v.lengthInBytes);
+      _bytes(Uint8List.sublistView(v));
+      return;
+    }
+    final n = v.lengthInBytes;
+    switch (n) {
+      case 1:
+        _u8(0xd4);
+      case 2:
+        _u8(0xd5);
+      case 4:
+        _u8(0xd6);
+      case 8:
+        _u8(0xd7);
+      case 16:
+        _u8(0xd8);
+      default:
+        if (n < 0x100) {
+          _tag8(0xc7, n);
+        } else if (n < 0x10000) {
+          _tag16(0xc8, n);
+        } else {
+          _tag32(0xc9, n);
+        }
+    }
+    _u8(ext);
+    final start = _len;
+    _bytes(Uint8List.sublistView(v));
+    if (!_hostLittle) {
+      _swap(_buf, start, n, v.elementSizeInBytes);
+    }
+  }
+}
+
+/// Reverse the byte order of each [size]-byte element in place.
+void _swap(Uint8List b, int start, int length, int size) {
+  for (var e = start; e < start + length; e += size) {
+    for (var i = 0, j = size - 1; i < j; i++, j--) {
+      final t = b[e + i];
+      b[e + i] = b[e + j];
+      b[e + j] = t;
+    }
+  }
+}
+
+class _Reader {
+  _Reader(this._bytes) : _data = ByteData.sublistView(_bytes);
+
+  final Uint8List _bytes;
+  final ByteData _data;
+  int pos = 0;
+
+  /// Reserve [n] bytes and return their offset.
+  int _take(int n) {
+    final p = pos;
+    if (p + n > _bytes.length) {
+      throw FormatException('truncated message', _bytes, p);
+    }
+    pos = p + n;
+    return p;
+  }
+
+  int _len8() => _bytes[_take(1)];
+  int _len16() => _data.getUint16(_take(2));
+  int _len32() => _data.getUint32(_take(4));
+
+  String _str(int n) {
+    final p = _take(n);
+    return utf8.decode(Uint8List.sublistView(_bytes, p, p + n));
+  }
+
+  Uint8List _bin(int n) {
+    final p = _take(n);
+    return Uint8List.fromList(Uint8List.sublistView(_bytes, p, p + n));
+  }
+
+  List<Object?> _array(int n) =>
+      List<Object?>.generate(n, (_) => read(), growable: false);
+
+  Map<Object?, Object?> _map(int n) {
+    final m = <Object?, Object?>{};
+    for (var i = 0; i < n; i++) {
+      final k = read();
+      m[k] = read();
+    }
+    return m;
+  }
+
+  Object? read() {
+    final b = _bytes[_take(1)];
+    if (b < 0x80) return b;
+    if (b >= 0xe0) return b - 0x100;
+    if (b >= 0xa0 && b <= 0xbf) return _str(b & 0x1f);
+    if (b >= 0x90 && b <= 0x9f) return _array(b & 0x0f);
+    if (b >= 0x80 && b <= 0x8f) return _map(b & 0x0f);
+    switch (b) {
+      case 0xc0:
+        return null;
+      case 0xc2:
+        return false;
+      case 0xc3:
+        return true;
+      case 0xca:
+        return _data.getFloat32(_take(4));
+      case 0xcb:
+        return _data.getFloat64(_take(8));
+      case 0xcc:
+        return _data.getUint8(_take(1));
+      case 0xcd:
+        return _data.getUint16(_take(2));
+      case 0xce:
+        return _data.getUint32(_take(4));
+      case 0xcf:
+        // Values >= 2^63 wrap: Dart ints are signed 64-bit.
+        return _data.getUint64(_take(8));
+      case 0xd0:
+        return _data.getInt8(_take(1));
+      case 0xd1:
+        return _data.getInt16(_take(2));
+      case 0xd2:
+        return _data.getInt32(_take(4));
+      case 0xd3:
+        return _data.getInt64(_take(8));
+      case 0xd9:
+        return _str(_len8());
+      case 0xda:
+        return _str(_len16());
+      case 0xdb:
+        return _str(_len32());
+      case 0xc4:
+        return _bin(_len8());
+      case 0xc5:
+        return _bin(_len16());
+      case 0xc6:
+        return _bin(_len32());
+      case 0xdc:
+        return _array(_len16());
+      case 0xdd:
+        return _array(_len32());
+      case 0xde:
+        return _map(_len16());
+      case 0xdf:
+        return _map(_len32());
+      case 0xd4:
+        return _ext(1);
+      case 0xd5:
+        return _ext(2);
+      case 0xd6:
+        return _ext(4);
+      case 0xd7:
+        return _ext(8);
+      case 0xd8:
+        return _ext(16);
+      case 0xc7:
+        return _ext(_len8());
+      case 0xc8:
+        return _ext(_len16());
+      case 0xc9:
+        return _ext(_len32());
+    }
+    throw FormatException(
+        'invalid type byte 0x${b.toRadixString(16)}', _bytes, pos - 1);
+  }
+
+  TypedData _ext(int n) {
+    final ext = _data.getInt8(_take(1));
+    final size = switch (ext) {
+      BridgeCodec.extInt8 => 1,
+      BridgeCodec.extInt16 || BridgeCodec.extUint16 => 2,
+      BridgeCodec.extInt32 ||
+      BridgeCodec.extUint32 ||
+      BridgeCodec.extFloat32 =>
+        4,
+      BridgeCodec.extInt64 ||
+      BridgeCodec.extUint64 ||
+      BridgeCodec.extFloat64 =>
+        8,
+      _ => throw FormatException('unknown ext type $ext', _bytes, pos - 1),
+    };
+    final p = _take(n);
+    if (n % size != 0) {
+      throw FormatException(
+          'ext $ext payload of $n bytes is not whole elements', _bytes, p);
+    }
+    var buffer = _bytes.buffer;
+    var offset = _bytes.offsetInBytes + p;
+    if (offset % size != 0 || !_hostLittle) {
+      // Typed views need element alignment: copy into fresh storage.
+      final copy = Uint8List.fromList(Uint8List.sublistView(_bytes, p, p + n));
+      if (!_hostLittle) _swap(copy, 0, n, size);
+      buffer = copy.buffer;
+      offset = 0;
+    }
+    final count = n ~/ size;
+    return switch (ext) {
+      BridgeCodec.extInt8 => buffer.asInt8List(offset, count),
+      BridgeCodec.extInt16 => buffer.asInt16List(offset, count),
+      BridgeCodec.extUint16 => buffer.asUint16List(offset, count),
+      BridgeCodec.extInt32 => buffer.asInt32List(offset, count),
+      BridgeCodec.extUint32 => buffer.asUint32List(offset, count),
+      BridgeCodec.extInt64 => buffer.asInt64List(offset, count),
+      BridgeCodec.extUint64 => buffer.asUint64List(offset, count),
+      BridgeCodec.extFloat32 => buffer.asFloat32List(offset, count),
+      _ => buffer.asFloat64List(offset, count),
+    };
+  }
+}
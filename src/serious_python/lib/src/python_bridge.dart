@@ -6,6 +6,8 @@ import 'dart:typed_data';
 import 'package:ffi/ffi.dart';
 import 'package:serious_python_platform_interface/serious_python_platform_interface.dart';
 
+import 'bridge_codec.dart';
+
 /// An in-process Dart ↔ Python byte channel, backed by the `dart_bridge`
 /// native library.
 ///
@@ -40,8 +42,14 @@ import 'package:serious_python_platform_interface/serious_python_platform_interf
 ///
 /// The Python side reads the chosen env-var names to discover its port
 /// numbers — no convention is baked in here.
+///
+/// For high-rate Python → Dart traffic, construct the bridge with
+/// `batched: true` and send from Python through `sp_bridge.batch.BatchSender`,
+/// which coalesces many frames into one native post. Each post is a run of
+/// sub-frames (4-byte little-endian length, then the bytes); the bridge splits
+/// it so [messages] still emits one event per frame, in order.
 class PythonBridge {
-  PythonBridge() {
+  PythonBridge({this.batched = false}) {
     _bridge = DartBridge.instance;
     _bridge.initDartApiDL();
     _rx.listen(_onMessage);
@@ -52,6 +60,10 @@ class PythonBridge {
       StreamController<Uint8List>.broadcast();
   late final DartBridge _bridge;
   bool _closed = false;
+  int _failedSends = 0;
+
+  /// Whether incoming posts are `sp_bridge.batch.BatchSender` batches.
+  final bool batched;
 
   /// Dart native port acting as this channel's key. Pass it to the Python
   /// program (typically via an environment variable) so Python knows where
@@ -61,6 +73,10 @@ class PythonBridge {
   /// Bytes pushed by Python via `dart_bridge.send_bytes(port, payload)`.
   Stream<Uint8List> get messages => _messages.stream;
 
+  /// Number of [send] calls that returned `false` — the Dart → Python half of
+  /// the dropped-frame count; `sp_bridge.metrics` reports the Python half.
+  int get failedSends => _failedSends;
+
   /// Send [bytes] to the Python handler registered for this bridge's [port].
   ///
   /// Returns `true` on successful delivery, `false` if delivery isn't yet
@@ -81,12 +97,23 @@ class PythonBridge {
       // rc: 0=delivered, -1=no handler yet, -2=Py_Initialize not finished.
       // Both negative cases are transient retry signals on app startup.
       final rc = _bridge.enqueueMessage(port, buf, len);
+      if (rc != 0) _failedSends++;
       return rc == 0;
     } finally {
       malloc.free(buf);
     }
   }
 
+  /// Encode [message] with [BridgeCodec] and [send] it — for channels whose
+  /// Python handler decodes with `sp_bridge.codec.unpackb`. Same return value
+  /// as [send].
+  bool sendMessage(Object? message) => send(BridgeCodec.encode(message));
+
+  /// [messages] decoded with [BridgeCodec] — for channels whose Python side
+  /// sends `sp_bridge.codec.packb(...)` frames. A frame that fails to decode
+  /// surfaces as a [FormatException] error event.
+  Stream<Object?> get decodedMessages => messages.map(BridgeCodec.decode);
+
   /// Release this bridge's ReceivePort. After closing, [send] throws and the
   /// [messages] stream emits done.
   void close() {
@@ -97,12 +124,33 @@ class PythonBridge {
   }
 
   void _onMessage(dynamic message) {
+    final Uint8List bytes;
     if (message is Uint8List) {
-      _messages.add(message);
+      bytes = message;
     } else if (message is List<int>) {
-      _messages.add(Uint8List.fromList(message));
+      bytes = Uint8List.fromList(message);
+    } else {
+      // Drop unexpected message shapes silently — the Python side only ever
+      // posts typed-data via Dart_PostCObject_DL.
+      return;
+    }
+    if (batched) {
+      _unbatch(bytes);
+    } else {
+      _messages.add(bytes);
+    }
+  }
+
+  /// Emit each length-prefixed sub-frame of a batch as a view into it.
+  void _unbatch(Uint8List batch) {
+    final data = ByteData.sublistView(batch);
+    var pos = 0;
+    while (pos + 4 <= batch.length) {
+      final len = data.getUint32(pos, Endian.little);
+      pos += 4;
+      if (pos + len > batch.length) break; // truncated: drop the remainder
+      _messages.add(Uint8List.sublistView(batch, pos, pos + len));
+      pos += len;
     }
-    // Drop unexpected message shapes silently — the Python side only ever
-    // posts typed-data via Dart_PostCObject_DL.
   }
 }
@@ -0,0 +1,80 @@
+import 'dart:async';
+
+import 'python_bridge.dart';
+
+/// Reads `sp_bridge.metrics` snapshots served on [bridge]'s port.
+///
+/// Pass [PythonBridge.port] to Python as `SERIOUS_PYTHON_BRIDGE_METRICS_PORT`
+/// and call `sp_bridge.metrics.install()` before Python registers its other
+/// handlers:
+///
+/// ```dart
+/// final metricsBridge = PythonBridge();
+/// final metrics = PythonBridgeMetrics(metricsBridge);
+/// await SeriousPython.run(environmentVariables: {
+///   'SERIOUS_PYTHON_BRIDGE_METRICS_PORT': '${metricsBridge.port}',
+///   ...
+/// });
+///
+/// final snap = await metrics.snapshot();
+/// final ui = (snap['ports'] as Map)[uiBridge.port] as Map;
+/// print('${ui['in_messages']} in, handler p95 '
+///     '${(ui['handler'] as Map)['p95_us']} µs');
+/// ```
+///
+/// The snapshot is a map with `enabled`, `uptime_s`, `threads` and `ports`,
+/// keyed by port number. Each port carries `in_messages`, `in_bytes`,
+/// `out_messages`, `out_bytes`, `handler_errors`, `dropped`, `inflight`,
+/// `max_inflight`, `handler` and `send` latency histograms (`count`,
+/// `mean_us`, `p50_us`, `p95_us`, `p99_us`, `max_us` and log2 `buckets`),
+/// `counters`, and any `gauges` Python registered for it. Ports that only have
+/// gauges carry just those.
+class PythonBridgeMetrics {
+  PythonBridgeMetrics(this.bridge) {
+    // A reply that doesn't decode can't be matched to a caller; that call
+    // times out.
+    _sub = bridge.decodedMessages.listen(_onSnapshot, onError: (_) {});
+  }
+
+  final PythonBridge bridge;
+
+  late final StreamSubscription<Object?> _sub;
+  // Callers by request id; Python echoes the id with the snapshot.
+  final Map<int, Completer<Map<Object?, Object?>>> _waiting = {};
+  int _nextId = 0;
+
+  /// Ask Python for its current metrics.
+  ///
+  /// Throws [TimeoutException] if no snapshot arrives within [timeout] — e.g.
+  /// Python never called `metrics.install()` with this port — and
+  /// [StateError] if the request can't be delivered yet.
+  Future<Map<Object?, Object?>> snapshot(
+      {Duration timeout = const Duration(seconds: 5)}) {
+    final id = _nextId++;
+    if (!bridge.sendMessage(id)) {
+      throw StateError('Python is not serving metrics on port ${bridge.port}');
+    }
+    final completer = Completer<Map<Object?, Object?>>();
+    _waiting[id] = completer;
+    return completer.future.timeout(timeout, onTimeout: () {
+      // A late snapshot for this id is dropped.
+      _waiting.remove(id);
+      throw TimeoutException('no metrics snapshot', timeout);
+    });
+  }
+
+  /// Stop listening. Pending [snapshot] calls fail with [StateError].
+  void close() {
+    _sub.cancel();
+    for (final c in _waiting.values) {
+      c.completeError(StateError('PythonBridgeMetrics closed'));
+    }
+    _waiting.clear();
+  }
+
+  // [id, snapshot]
+  void _onSnapshot(Object? reply) {
+    if (reply is! List || reply.length < 2 || reply[1] is! Map) return;
+    _waiting.remove(reply[0])?.complete(reply[1] as Map);
+  }
+}
@@ -0,0 +1,242 @@
+import 'dart:async';
+import 'dart:typed_data';
+
+import 'package:http/http.dart' as http;
+
+import 'bridge_codec.dart';
+import 'python_bridge.dart';
+
+const _frameRequest = 0;
+const _frameRequestBody = 1;
+const _frameCancel = 2;
+const _frameResponse = 3;
+const _frameResponseBody = 4;
+const _frameError = 5;
+
+/// An `http.Client` that hands requests to a WSGI or ASGI app (Flask,
+/// FastAPI, ...) served in-process by Python's `sp_bridge.web.HttpServer`,
+/// over a [PythonBridge] instead of a loopback socket:
+///
+/// ```dart
+/// final httpBridge = PythonBridge();
+/// final client = PythonHttpClient(httpBridge);
+/// await SeriousPython.run(environmentVariables: {
+///   'MY_APP_HTTP_PORT': '${httpBridge.port}',
+/// });
+///
+/// final response = await client.get(Uri.parse('http://app/items?page=2'));
+/// ```
+///
+/// Only the path and query of a request's URL reach the app; its host goes
+/// in the `host` header. Any number of requests can be in flight at once.
+/// Request and response bodies are streamed: a response completes as soon as
+/// its headers and first chunk arrive, and cancelling the subscription to
+/// its body tells Python the client is gone. Redirects to `GET` and `HEAD`
+/// requests are followed as [http.BaseRequest.followRedirects] and
+/// [http.BaseRequest.maxRedirects] ask.
+///
+/// Fails a request with an [http.ClientException] if the Python server hasn't
+/// registered its handler yet. The client owns the bridge's
+/// [PythonBridge.messages] stream for as long as it is open.
+class PythonHttpClient extends http.BaseClient {
+  PythonHttpClient(this.bridge) {
+    _sub = bridge.messages.listen(_onFrame);
+  }
+
+  final PythonBridge bridge;
+
+  final Map<int, _PendingRequest> _requests = {};
+  late final StreamSubscription<Uint8List> _sub;
+  int _nextId = 1;
+  bool _closed = false;
+
+  /// Requests sent whose response body hasn't ended yet.
+  int get pending => _requests.length;
+
+  @override
+  Future<http.StreamedResponse> send(http.BaseRequest request) async {
+    var current = request;
+    var response = await _send(current);
+    var redirects = 0;
+    while (request.followRedirects && response.isRedirect) {
+      final location = response.headers['location'];
+      final status = response.statusCode;
+      final method = status == 303 ||
+              ((status == 301 || status == 302) && current.method == 'POST')
+          ? 'GET'
+          : current.method;
+      // A streamed body can't be sent again.
+      if (location == null || (method != 'GET' && method != 'HEAD')) break;
+      if (++redirects > request.maxRedirects) {
+        await response.stream.drain<void>();
+        throw http.ClientException('Redirect limit exceeded', request.url);
+      }
+      await response.stream.drain<void>();
+      current = http.Request(method, current.url.resolve(location))
+        ..followRedirects = false
+        ..headers.addAll({
+          for (final e in request.headers.entries)
+            if (!_bodyHeaders.contains(e.key.toLowerCase())) e.key: e.value
+        });
+      response = await _send(current);
+    }
+    return response;
+  }
+
+  /// Fail every pending request and stop listening to the bridge. The bridge
+  /// itself stays open.
+  @override
+  void close() {
+    if (_closed) return;
+    _closed = true;
+    _sub.cancel();
+    for (final r in _requests.values) {
+      r.fail(http.ClientException('PythonHttpClient closed', r.request.url));
+    }
+    _requests.clear();
+  }
+
+  Future<http.StreamedResponse> _send(http.BaseRequest request) async {
+    if (_closed) {
+      throw http.ClientException('PythonHttpClient is closed', request.url);
+    }
+    final url = request.url;
+    final target = (url.path.isEmpty ? '/' : url.path) +
+        (url.hasQuery ? '?${url.query}' : '');
+    final names = request.headers.keys.map((k) => k.toLowerCase()).toSet();
+    final headers = [
+      if (!names.contains('host') && url.host.isNotEmpty)
+        ['host', url.authority],
+      if (!names.contains('content-length') && request.contentLength != null)
+        ['content-length', '${request.contentLength}'],
+      for (final e in request.headers.entries) [e.key, e.value],
+    ];
+
+    final id = _nextId++;
+    final pending = _PendingRequest(this, id, request);
+    final body = request.finalize();
+    // A plain [http.Request] goes in one frame; other bodies are streamed.
+    final bodyBytes = request is http.Request ? request.bodyBytes : null;
+    if (!bridge.sendMessage([
+      _frameRequest,
+      id,
+      request.method,
+      target,
+      headers,
+      bodyBytes ?? Uint8List(0),
+      bodyBytes == null,
+    ])) {
+      throw http.ClientException(
+          'no Python HTTP handler registered on port ${bridge.port}', url);
+    }
+    _requests[id] = pending;
+    if (bodyBytes == null) {
+      body.listen(
+          (chunk) => _sendBody(id, chunk, true),
+          onError: (Object e) => _abandon(id, e),
+          onDone: () => _sendBody(id, const [], false),
+          cancelOnError: true);
+    }
+    return pending.response.future;
+  }
+
+  void _sendBody(int id, List<int> chunk, bool more) {
+    if (!_requests.containsKey(id)) return;
+    bridge.sendMessage([
+      _frameRequestBody,
+      id,
+      chunk is Uint8List ? chunk : Uint8List.fromList(chunk),
+      more
+    ]);
+  }
+
+  // The caller stopped listening before the response ended, or the request
+  // body stream failed with [error].
+  void _abandon(int id, [Object? error]) {
+    final r = _requests.remove(id);
+    if (r == null) return;
+    bridge.sendMessage([_frameCancel, id]);
+    r.fail(error ?? http.ClientException('request abandoned', r.request.url));
+  }
+
+  void _onFrame(Uint8List bytes) {
+    final List frame;
+    try {
+      frame = BridgeCodec.decode(bytes) as List;
+      if (frame.length < 2) return;
+    } catch (_) {
+      return; // not an HTTP frame
+    }
+    final r = _requests[frame[1]];
+    if (r == null) return; // abandoned already
+    switch (frame[0]) {
+      case _frameResponse:
+        r.start(frame[2] as int, frame[3] as String?, frame[4] as List);
+        r.add(frame[5] as Uint8List, frame[6] as bool);
+      case _frameResponseBody:
+        r.add(frame[2] as Uint8List, frame[3] as bool);
+      case _frameError:
+        final err = frame[2] as Map;
+        _requests.remove(r.id);
+        r.fail(http.ClientException(
+            '${err['type']}: ${err['message']}', r.request.url));
+      default:
+        _requests.remove(r.id);
+        r.fail(http.ClientException(
+            'unknown frame kind ${frame[0]}', r.request.url));
+    }
+  }
+}
+
+const _bodyHeaders = {'content-length', 'content-type', 'transfer-encoding'};
+
+const _redirectStatuses = {301, 302, 303, 307, 308};
+
+class _PendingRequest {
+  _PendingRequest(this.client, this.id, this.request);
+
+  final PythonHttpClient client;
+  final int id;
+  final http.BaseRequest request;
+  final response = Completer<http.StreamedResponse>();
+  StreamController<List<int>>? _body;
+
+  void start(int status, String? reason, List headers) {
+    final map = <String, String>{};
+    for (final h in headers) {
+      final name = (h[0] as String).toLowerCase();
+      final value = h[1] as String;
+      map[name] = map.containsKey(name) ? '${map[name]},$value' : value;
+    }
+    final body = _body = StreamController<List<int>>(
+        onCancel: () => client._abandon(id));
+    response.complete(http.StreamedResponse(
+      http.ByteStream(body.stream),
+      status,
+      contentLength: int.tryParse(map['content-length'] ?? ''),
+      request: request,
+      headers: map,
+      isRedirect: _redirectStatuses.contains(status),
+      reasonPhrase: reason,
+    ));
+  }
+
+  void add(Uint8List chunk, bool more) {
+    final body = _body!;
+    if (chunk.isNotEmpty) body.add(chunk);
+    if (!more) {
+      client._requests.remove(id);
+      body.close();
+    }
+  }
+
+  void fail(Object error) {
+    final body = _body;
+    if (body == null) {
+      if (!response.isCompleted) response.completeError(error);
+    } else if (!body.isClosed) {
+      body.addError(error);
+      body.close();
+    }
+  }
+}
@@ -0,0 +1,111 @@
+import 'dart:async';
+import 'dart:typed_data';
+
+import 'bridge_codec.dart';
+import 'python_bridge.dart';
+
+const _frameSetLevel = 0;
+const _frameAck = 1;
+
+/// A `logging` record, or a line written to stdout or stderr, from Python.
+class PythonLogRecord {
+  PythonLogRecord(this.time, this.level, this.logger, this.message);
+
+  /// When Python logged it.
+  final DateTime time;
+
+  /// Python `logging` level: [PythonLogs.debug] .. [PythonLogs.critical].
+  final int level;
+
+  /// Logger name, or `stdout` / `stderr` for captured output.
+  final String logger;
+
+  /// The formatted message, with the traceback if one was logged.
+  final String message;
+
+  @override
+  String toString() => '$level $logger: $message';
+}
+
+/// Python log records and stdout/stderr lines, streamed by
+/// `sp_bridge.logs` over [bridge]'s port.
+///
+/// Pass [PythonBridge.port] to Python as `SERIOUS_PYTHON_LOG_PORT` and call
+/// `sp_bridge.logs.install()` first thing in `main.py`:
+///
+/// ```dart
+/// final logBridge = PythonBridge();
+/// final logs = PythonLogs(logBridge);
+/// logs.records.listen((r) => debugPrint('[py] ${r.logger}: ${r.message}'));
+/// await SeriousPython.run(environmentVariables: {
+///   'SERIOUS_PYTHON_LOG_PORT': '${logBridge.port}',
+///   ...
+/// });
+/// ```
+///
+/// Python posts batches, and holds back further ones until Dart has
+/// acknowledged the previous few — which this class does as it hands each
+/// batch to [records]. While the isolate is too busy to keep up, Python
+/// overwrites its oldest buffered entries instead of queueing them; [dropped]
+/// counts them.
+class PythonLogs {
+  PythonLogs(this.bridge) {
+    _sub = bridge.messages.listen(_onBatch);
+  }
+
+  static const debug = 10;
+  static const info = 20;
+  static const warning = 30;
+  static const error = 40;
+  static const critical = 50;
+
+  final PythonBridge bridge;
+
+  final StreamController<PythonLogRecord> _records =
+      StreamController<PythonLogRecord>.broadcast();
+  late final StreamSubscription<Uint8List> _sub;
+  int _dropped = 0;
+  int _received = 0;
+
+  /// Records and lines, in the order Python logged them.
+  Stream<PythonLogRecord> get records => _records.stream;
+
+  /// Entries Python dropped because Dart fell behind.
+  int get dropped => _dropped;
+
+  /// Entries received.
+  int get received => _received;
+
+  /// Have Python discard entries below [level] before buffering them (and
+  /// set its root logger to [level]). Returns `false` if Python hasn't
+  /// installed `sp_bridge.logs` yet.
+  bool setLevel(int level) => bridge.sendMessage([_frameSetLevel, level]);
+
+  /// Stop listening and close [records]. The bridge itself stays open.
+  void close() {
+    _sub.cancel();
+    _records.close();
+  }
+
+  void _onBatch(Uint8List bytes) {
+    final List batch;
+    try {
+      batch = BridgeCodec.decode(bytes) as List;
+    } catch (_) {
+      return; // not a log batch
+    }
+    final entries = batch[2] as List;
+    _dropped += batch[1] as int;
+    _received += entries.length;
+    for (final e in entries.cast<List>()) {
+      _records.add(PythonLogRecord(
+        DateTime.fromMicrosecondsSinceEpoch(
+            ((e[0] as num) * 1000000).round()),
+        e[1] as int,
+        e[2] as String,
+        e[3] as String,
+      ));
+    }
+    bridge.sendMessage([_frameAck, batch[0]]);
+  }
+}
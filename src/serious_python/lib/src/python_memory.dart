@@ -0,0 +1,141 @@
+import 'dart:async';
+
+import 'package:flutter/widgets.dart';
+import 'package:serious_python_platform_interface/serious_python_platform_interface.dart';
+
+import 'python_bridge.dart';
+
+/// Trims Python's memory — `sp_bridge.memory` on [bridge]'s port — when the
+/// OS signals memory pressure, or when asked with [trim].
+///
+/// Pass [PythonBridge.port] to Python as `SERIOUS_PYTHON_MEMORY_PORT` and call
+/// `sp_bridge.memory.install()` in `main.py`:
+///
+/// ```dart
+/// final memoryBridge = PythonBridge();
+/// final memory = PythonMemory(memoryBridge);
+/// memory.reports.listen((r) => debugPrint('freed ${r['freed']} bytes'));
+/// await SeriousPython.run(environmentVariables: {
+///   'SERIOUS_PYTHON_MEMORY_PORT': '${memoryBridge.port}',
+///   ...
+/// });
+/// ```
+///
+/// With [watch] (the default) a trim is sent on Flutter's
+/// `didHaveMemoryPressure` (as [runningCritical]) and, on Android, on every
+/// `onTrimMemory` at [minLevel] or above — including the background levels
+/// that arrive while no activity is attached. An automatic trim is skipped
+/// while another trim is still running (for up to 30 seconds: a report that
+/// takes longer is taken as lost). Needs the Flutter binding.
+///
+/// Python runs its registered callbacks, collects garbage, clears its
+/// `linecache`, import and regex caches and returns free heap pages to the
+/// OS, then reports a map with `level`, `rss_before`, `rss_after`, `freed`
+/// (bytes, null where the platform doesn't expose the resident size),
+/// `blocks_freed`, `gc_collected`, `callbacks`, `errors`, `heap_released`
+/// and `ms`.
+class PythonMemory with WidgetsBindingObserver {
+  PythonMemory(this.bridge, {this.watch = true, this.minLevel = runningLow}) {
+    // A reply that doesn't decode can't be matched to a trim; a [trim] call
+    // then times out.
+    _sub = bridge.decodedMessages.listen(_onReport, onError: (_) {});
+    if (watch) {
+      WidgetsBinding.instance.addObserver(this);
+      _pressure =
+          SeriousPythonPlatform.instance.memoryPressure.listen(_onPressure);
+    }
+  }
+
+  // android.content.ComponentCallbacks2.TRIM_MEMORY_*
+  static const runningModerate = 5;
+  static const runningLow = 10;
+  static const runningCritical = 15;
+  static const uiHidden = 20;
+  static const background = 40;
+  static const moderate = 60;
+  static const complete = 80;
+
+  final PythonBridge bridge;
+
+  /// Whether OS memory warnings trigger a trim.
+  final bool watch;
+
+  /// The lowest Android trim level that triggers one.
+  final int minLevel;
+
+  late final StreamSubscription<Object?> _sub;
+  StreamSubscription<int>? _pressure;
+  final StreamController<Map<Object?, Object?>> _reports =
+      StreamController<Map<Object?, Object?>>.broadcast();
+  // [trim] callers by request id; Python echoes the id with the report.
+  final Map<int, Completer<Map<Object?, Object?>>> _waiting = {};
+  int _nextId = 0;
+  // The automatic trim still running, if any, and when it was sent.
+  int? _autoId;
+  DateTime? _autoSentAt;
+
+  // How long an automatic trim may hold back the next one; past that its
+  // report is taken as lost.
+  static const _autoTimeout = Duration(seconds: 30);
+
+  /// Every trim's report, automatic ones included.
+  Stream<Map<Object?, Object?>> get reports => _reports.stream;
+
+  /// Have Python trim now, passing [level] to its callbacks.
+  ///
+  /// Throws [TimeoutException] if no report arrives within [timeout] and
+  /// [StateError] if Python isn't serving trims on this port yet.
+  Future<Map<Object?, Object?>> trim(
+      {int? level, Duration timeout = const Duration(seconds: 30)}) {
+    final id = _nextId++;
+    if (!bridge.sendMessage([id, level])) {
+      throw StateError('Python is not serving trims on port ${bridge.port}');
+    }
+    final completer = Completer<Map<Object?, Object?>>();
+    _waiting[id] = completer;
+    return completer.future.timeout(timeout, onTimeout: () {
+      // A late report still goes to [reports], not to a caller.
+      _waiting.remove(id);
+      throw TimeoutException('no memory trim report', timeout);
+    });
+  }
+
+  @override
+  void didHaveMemoryPressure() => _onPressure(runningCritical);
+
+  /// Stop watching and listening. Pending [trim] calls fail with
+  /// [StateError].
+  void close() {
+    if (watch) WidgetsBinding.instance.removeObserver(this);
+    _pressure?.cancel();
+    _sub.cancel();
+    for (final c in _waiting.values) {
+      c.completeError(StateError('PythonMemory closed'));
+    }
+    _waiting.clear();
+    _reports.close();
+  }
+
+  void _onPressure(int level) {
+    if (level < minLevel || _waiting.isNotEmpty) return;
+    if (_autoId != null &&
+        DateTime.now().difference(_autoSentAt!) < _autoTimeout) {
+      return;
+    }
+    final id = _nextId++;
+    if (bridge.sendMessage([id, level])) {
+      _autoId = id;
+      _autoSentAt = DateTime.now();
+    }
+  }
+
+  // [id, report]
+  void _onReport(Object? reply) {
+    if (reply is! List || reply.length < 2 || reply[1] is! Map) return;
+    final id = reply[0];
+    final report = reply[1] as Map<Object?, Object?>;
+    if (id == _autoId) _autoId = null;
+    _waiting.remove(id)?.complete(report);
+    _reports.add(report);
+  }
+}
@@ -0,0 +1,196 @@
+import 'dart:async';
+import 'dart:typed_data';
+
+import 'bridge_codec.dart';
+import 'python_bridge.dart';
+
+const _frameRequest = 0;
+const _frameResponse = 1;
+const _frameError = 2;
+const _frameCancel = 3;
+const _frameBusy = 4;
+const _frameNotify = 5;
+
+/// Error raised by a Python RPC method, or reported by the server.
+class PythonRpcException implements Exception {
+  PythonRpcException(this.type, this.message, [this.pythonTraceback]);
+
+  /// Python exception class name, e.g. `ValueError`.
+  final String type;
+  final String message;
+
+  /// Formatted Python traceback, when the method raised.
+  final String? pythonTraceback;
+
+  @override
+  String toString() => 'PythonRpcException($type: $message)';
+}
+
+/// The server had `pending` calls in flight and rejected this one. Back off
+/// and retry.
+class PythonRpcBusyException extends PythonRpcException {
+  PythonRpcBusyException(this.pending)
+      : super('Busy', 'server has $pending calls in flight');
+
+  final int pending;
+}
+
+/// The call was cancelled from Dart (explicitly or by its timeout).
+class PythonRpcCancelledException extends PythonRpcException {
+  PythonRpcCancelledException(String message) : super('Cancelled', message);
+}
+
+/// A notification pushed by `RpcServer.notify(topic, payload)`.
+class PythonRpcNotification {
+  PythonRpcNotification(this.topic, this.payload);
+
+  final String topic;
+  final Object? payload;
+}
+
+/// An in-flight call started with [PythonRpcClient.start].
+class PythonRpcCall {
+  PythonRpcCall._(this._client, this.id);
+
+  final PythonRpcClient _client;
+  final _completer = Completer<Object?>();
+
+  /// Correlation id of this call on the wire.
+  final int id;
+
+  /// Completes with the method's result, or a [PythonRpcException].
+  Future<Object?> get result => _completer.future;
+
+  bool get isCompleted => _completer.isCompleted;
+
+  /// Ask Python to cancel the call and complete [result] with a
+  /// [PythonRpcCancelledException] right away. No-op once completed.
+  void cancel() => _client._cancel(this, 'cancelled');
+}
+
+/// Request/response client for a Python `sp_bridge.rpc.RpcServer`.
+///
+/// Calls carry correlation ids, so any number can be in flight on one
+/// [PythonBridge] and complete in whatever order Python finishes them:
+///
+/// ```dart
+/// final rpcBridge = PythonBridge();
+/// final rpc = PythonRpcClient(rpcBridge);
+/// await SeriousPython.run(environmentVariables: {
+///   'MY_APP_RPC_PORT': '${rpcBridge.port}',
+/// });
+///
+/// final sum = await rpc.call('add', [1, 2]);
+/// final page =
+///     await rpc.call('fetch', {'url': url}, const Duration(seconds: 5));
+/// ```
+///
+/// Arguments and results are encoded with [BridgeCodec]. The client owns the
+/// bridge's [PythonBridge.messages] stream for as long as it is open.
+class PythonRpcClient {
+  PythonRpcClient(this.bridge, {this.defaultTimeout}) {
+    _sub = bridge.messages.listen(_onFrame);
+  }
+
+  final PythonBridge bridge;
+
+  /// Applied to [call]s made without an explicit timeout; `null` waits
+  /// forever.
+  final Duration? defaultTimeout;
+
+  final Map<int, PythonRpcCall> _calls = {};
+  final StreamController<PythonRpcNotification> _notifications =
+      StreamController<PythonRpcNotification>.broadcast();
+  late final StreamSubscription<Uint8List> _sub;
+  int _nextId = 1;
+  bool _closed = false;
+
+  /// Notifications pushed by the Python server.
+  Stream<PythonRpcNotification> get notifications => _notifications.stream;
+
+  /// Calls sent and not yet completed.
+  int get pending => _calls.length;
+
+  /// Call [method] with [params] (a `List` of positional or a `Map` of keyword
+  /// arguments) and wait for the result. On [timeout] the call is cancelled
+  /// and the future fails with [PythonRpcCancelledException].
+  Future<Object?> call(String method, [Object? params, Duration? timeout]) {
+    final c = start(method, params);
+    final t = timeout ?? defaultTimeout;
+    if (t != null) {
+      final timer = Timer(t, () => _cancel(c, 'timed out after $t'));
+      c.result.whenComplete(timer.cancel).ignore();
+    }
+    return c.result;
+  }
+
+  /// Start a call and return its handle, for callers that need to
+  /// [PythonRpcCall.cancel] it. Fails the call's [PythonRpcCall.result] with
+  /// a [StateError] if the Python server hasn't registered its handler yet.
+  PythonRpcCall start(String method, [Object? params]) {
+    if (_closed) {
+      throw StateError('PythonRpcClient is closed');
+    }
+    final c = PythonRpcCall._(this, _nextId++);
+    if (bridge.sendMessage([_frameRequest, c.id, method, params])) {
+      _calls[c.id] = c;
+    } else {
+      c._completer.completeError(StateError(
+          'no Python RPC handler registered on port ${bridge.port}'));
+    }
+    return c;
+  }
+
+  /// Fail every pending call and stop listening to the bridge. The bridge
+  /// itself stays open.
+  void close() {
+    if (_closed) return;
+    _closed = true;
+    _sub.cancel();
+    for (final c in _calls.values) {
+      c._completer.completeError(StateError('PythonRpcClient closed'));
+    }
+    _calls.clear();
+    _notifications.close();
+  }
+
+  void _cancel(PythonRpcCall c, String reason) {
+    if (_calls.remove(c.id) == null) return;
+    bridge.sendMessage([_frameCancel, c.id]);
+    c._completer.completeError(PythonRpcCancelledException(reason));
+  }
+
+  void _onFrame(Uint8List bytes) {
+    final List frame;
+    try {
+      frame = BridgeCodec.decode(bytes) as List;
+      // Every frame Python sends is [kind, id or topic, value].
+      if (frame.length < 3) return;
+    } catch (_) {
+      return; // not an RPC frame
+    }
+    final kind = frame[0];
+    if (kind == _frameNotify) {
+      final topic = frame[1];
+      if (topic is String) {
+        _notifications.add(PythonRpcNotification(topic, frame[2]));
+      }
+      return;
+    }
+    final c = _calls.remove(frame[1]);
+    if (c == null) return; // cancelled or timed out already
+    switch (kind) {
+      case _frameResponse:
+        c._completer.complete(frame[2]);
+      case _frameError:
+        final err = frame[2] as Map;
+        c._completer.completeError(PythonRpcException(err['type'] as String,
+            err['message'] as String, err['traceback'] as String?));
+      case _frameBusy:
+        c._completer.completeError(PythonRpcBusyException(frame[2] as int));
+      default:
+        c._completer.completeError(
+            PythonRpcException('ProtocolError', 'unknown frame kind $kind'));
+    }
+  }
+}
@@ -0,0 +1,104 @@
+import 'dart:async';
+import 'dart:ffi';
+import 'dart:typed_data';
+
+import 'python_bridge.dart';
+
+/// A payload Python wrote into a `sp_bridge.shm.BufferPool` slot, viewed in
+/// place — no copy was made on either side.
+///
+/// [bytes] aliases Python-owned memory: call [release] as soon as you are done
+/// so Python can reuse the slot, and don't touch [bytes] (or views derived
+/// from it) afterwards — Python may already be overwriting it. Copy what you
+/// need to keep.
+class PythonSharedBuffer {
+  PythonSharedBuffer._(this._owner, this.slot, this.bytes, this.meta);
+
+  final PythonSharedBuffers _owner;
+
+  /// Pool slot index.
+  final int slot;
+
+  /// The payload, a view over the shared slot.
+  final Uint8List bytes;
+
+  /// The `meta` value Python passed to `BufferPool.send`.
+  final Object? meta;
+
+  bool _released = false;
+
+  bool get isReleased => _released;
+
+  /// Return the slot to Python's pool. Idempotent.
+  void release() {
+    if (_released) return;
+    _released = true;
+    _owner._release(slot);
+  }
+}
+
+/// Receives `sp_bridge.shm.BufferPool` handles on [bridge] and exposes them as
+/// [PythonSharedBuffer]s.
+///
+/// ```dart
+/// final framesBridge = PythonBridge();
+/// final frames = PythonSharedBuffers(framesBridge);
+/// // pass framesBridge.port to Python as the pool's port
+///
+/// frames.buffers.listen((buf) {
+///   decodeImage(buf.bytes, buf.meta);
+///   buf.release();
+/// });
+/// ```
+///
+/// Python and Dart share the process, so the handle's address is mapped with
+/// `Pointer.fromAddress` — this only works on native platforms, and only while
+/// the Python pool is alive.
+class PythonSharedBuffers {
+  PythonSharedBuffers(this.bridge) {
+    _sub = bridge.decodedMessages.listen(_onHandle, onError: (_) {});
+  }
+
+  final PythonBridge bridge;
+
+  final StreamController<PythonSharedBuffer> _buffers =
+      StreamController<PythonSharedBuffer>.broadcast();
+  late final StreamSubscription<Object?> _sub;
+
+  /// Buffers as Python sends them. Buffers that arrive while nothing listens
+  /// are released right away.
+  Stream<PythonSharedBuffer> get buffers => _buffers.stream;
+
+  /// Stop listening. Buffers already delivered can still be released.
+  void close() {
+    _sub.cancel();
+    _buffers.close();
+  }
+
+  void _onHandle(Object? frame) {
+    if (frame is! List || frame.length < 4) return;
+    final slot = frame[0] as int;
+    if (_buffers.isClosed || !_buffers.hasListener) {
+      // Nobody would release it: hand it straight back, or Python's pool
+      // runs dry.
+      _release(slot);
+      return;
+    }
+    final address = frame[1] as int;
+    final length = frame[2] as int;
+    final bytes = length == 0
+        ? Uint8List(0)
+        : Pointer<Uint8>.fromAddress(address).asTypedList(length);
+    _buffers.add(PythonSharedBuffer._(this, slot, bytes, frame[3]));
+  }
+
+  void _release(int slot) {
+    // The bridge may be closed if the app is shutting down; Python's pool
+    // goes with it then.
+    try {
+      bridge.sendMessage([slot]);
+    } on StateError {
+      // ignore
+    }
+  }
+}
@@ -0,0 +1,218 @@
+import 'dart:async';
+
+import 'package:serious_python_platform_interface/serious_python_platform_interface.dart';
+
+import '../serious_python.dart';
+import 'python_bridge.dart';
+import 'python_rpc.dart';
+
+/// A resident Python interpreter that runs jobs instead of whole programs.
+///
+/// The app's entry point imports what it needs once and calls
+/// `sp_bridge.worker.serve()`; jobs submitted here then run in that warm
+/// interpreter, with everything already in `sys.modules` still imported:
+///
+/// ```python
+/// # main.py
+/// import numpy, pandas
+/// from sp_bridge import worker
+/// worker.serve()
+/// ```
+///
+/// ```dart
+/// final worker = await PythonWorker.start();
+/// final stats = await worker.call('analysis:summarize', args: [path]);
+/// final n = await worker.runSource(
+///     'import numpy as np\nresult = int(np.arange(10).sum())');
+/// ```
+///
+/// [start] only runs the program if the embedded interpreter isn't up yet.
+/// After a Dart VM restart in the same process — a Flutter hot restart, or
+/// Android keeping the process alive — it instead hands the new bridge port
+/// to the running worker with [DartBridge.signalDartSession], so the restart
+/// costs no imports. [reused] tells which happened. Session reuse needs
+/// libdart_bridge 1.3.0 or later; older binaries fall back to a fresh run.
+///
+/// Jobs run by [call] share the interpreter's GIL. Started with
+/// `interpreters: n` (Python 3.14+), the worker also keeps `n` subinterpreters
+/// with the same preloaded modules, and [callParallel] spreads CPU-bound jobs
+/// over them so they run on all cores:
+///
+/// ```dart
+/// final worker = await PythonWorker.start(
+///     interpreters: Platform.numberOfProcessors, preload: ['tiles']);
+/// final images = await Future.wait(
+///     [for (final t in grid) worker.callParallel('tiles:render', args: t)]);
+/// ```
+class PythonWorker {
+  PythonWorker._(this.bridge, this.rpc, this.reused, this.interpreterBridges);
+
+  /// `DartBridge.signalDartSession` label the Python worker listens for
+  /// (`sp_bridge.worker.SESSION_LABEL`).
+  static const sessionLabel = 'sp_worker';
+
+  static const _portEnv = 'SERIOUS_PYTHON_WORKER_PORT';
+  static const _preloadEnv = 'SERIOUS_PYTHON_WORKER_PRELOAD';
+  static const _interpretersEnv = 'SERIOUS_PYTHON_WORKER_INTERPRETERS';
+  static const _poolPortsEnv = 'SERIOUS_PYTHON_WORKER_POOL_PORTS';
+
+  /// Bridge the worker's `RpcServer` listens on, and the client over it.
+  final PythonBridge bridge;
+  final PythonRpcClient rpc;
+
+  /// Whether [start] attached to an interpreter left running by a previous
+  /// Dart session rather than starting the program.
+  final bool reused;
+
+  /// One bridge per subinterpreter of the pool; a job running there sends to
+  /// it with `dart_bridge.send_bytes(sp_bridge.pool.port(), ...)`. Empty
+  /// without `interpreters`.
+  final List<PythonBridge> interpreterBridges;
+
+  /// Start the worker program (see [SeriousPython.run] for [appFileName],
+  /// [modulePaths] and [environmentVariables]) or re-attach to the running
+  /// one, and wait up to [readyTimeout] for it to answer.
+  ///
+  /// [preload] modules are imported before the first job — at startup on a
+  /// fresh run, or on attach (a no-op for modules already imported).
+  /// [defaultTimeout] applies to jobs run without an explicit timeout.
+  /// [interpreters] starts that many subinterpreters for [callParallel]; a
+  /// re-attached worker keeps the pool it was started with.
+  static Future<PythonWorker> start(
+      {String? appFileName,
+      List<String>? modulePaths,
+      Map<String, String>? environmentVariables,
+      List<String> preload = const [],
+      int interpreters = 0,
+      Duration readyTimeout = const Duration(seconds: 60),
+      Duration? defaultTimeout}) async {
+    final bridge = PythonBridge();
+    final rpc = PythonRpcClient(bridge, defaultTimeout: defaultTimeout);
+    final interpreterBridges = [
+      for (var i = 0; i < interpreters; i++) PythonBridge()
+    ];
+    final dartBridge = DartBridge.instance;
+    final reused = dartBridge.isPythonInitialized;
+    if (reused) {
+      dartBridge.signalDartSession({
+        sessionLabel: bridge.port,
+        for (var i = 0; i < interpreters; i++)
+          '${sessionLabel}_pool_$i': interpreterBridges[i].port,
+      });
+    } else {
+      // Python blocks in worker.serve(), so this never completes.
+      unawaited(SeriousPython.run(
+          appFileName: appFileName,
+          modulePaths: modulePaths,
+          environmentVariables: {
+            ...?environmentVariables,
+            _portEnv: '${bridge.port}',
+            if (preload.isNotEmpty) _preloadEnv: preload.join(','),
+            if (interpreters > 0) ...{
+              _interpretersEnv: '$interpreters',
+              _poolPortsEnv:
+                  interpreterBridges.map((b) => b.port).join(','),
+            },
+          }));
+    }
+    final worker = PythonWorker._(bridge, rpc, reused, interpreterBridges);
+    try {
+      await worker._awaitReady(readyTimeout);
+      if (reused && preload.isNotEmpty) {
+        await worker.preload(preload);
+      }
+    } catch (_) {
+      worker.close();
+      rethrow;
+    }
+    return worker;
+  }
+
+  /// Call `target` — `"package.module:function"` — with [args] / [kwargs]
+  /// and return its result. A coroutine function is awaited on the worker's
+  /// asyncio loop.
+  Future<Object?> call(String target,
+          {List<Object?>? args,
+          Map<String, Object?>? kwargs,
+          Duration? timeout}) =>
+      rpc.call('call', _callParams(target, args, kwargs), timeout);
+
+  /// Like [call], but returns the call handle so it can be cancelled; the
+  /// Python function sees `sp_bridge.rpc.cancelled()` become true.
+  PythonRpcCall submit(String target,
+          {List<Object?>? args, Map<String, Object?>? kwargs}) =>
+      rpc.start('call', _callParams(target, args, kwargs));
+
+  /// Like [call], but run on the least busy subinterpreter of the pool, in
+  /// parallel with other [callParallel] jobs. [args], [kwargs] and the result
+  /// are pickled between interpreters; a job that raises fails with a
+  /// [PythonRpcException] of type `JobError`. Needs `interpreters` in [start].
+  Future<Object?> callParallel(String target,
+          {List<Object?>? args,
+          Map<String, Object?>? kwargs,
+          Duration? timeout}) =>
+      rpc.call('pool_call', _callParams(target, args, kwargs), timeout);
+
+  /// Exec [source] and return the value it assigns to `result`. Jobs with the
+  /// same [namespace] share globals (see [dropNamespace]); without one each
+  /// job starts with empty globals.
+  Future<Object?> runSource(String source,
+          {String? namespace, Duration? timeout}) =>
+      rpc.call('run_source', {'source': source, 'namespace': namespace},
+          timeout);
+
+  /// Run the script at [path] as `__main__` with [args] as `sys.argv[1:]` and
+  /// return the value it assigns to `result`.
+  Future<Object?> runScript(String path,
+          {List<String> args = const [], Duration? timeout}) =>
+      rpc.call('run_script', {'path': path, 'args': args}, timeout);
+
+  /// Import [modules] now. Returns seconds spent per module — near zero for
+  /// modules the worker had already imported.
+  Future<Map<String, double>> preload(List<String> modules) async {
+    final times = await rpc.call('preload', [modules]) as Map;
+    return times.map((k, v) => MapEntry(k as String, (v as num).toDouble()));
+  }
+
+  /// Forget the globals of a [runSource] namespace.
+  Future<bool> dropNamespace(String namespace) async =>
+      await rpc.call('drop_namespace', [namespace]) as bool;
+
+  /// Process id, uptime, job count, pending jobs, loaded module count, live
+  /// namespaces, and the id, port and queued/completed jobs of each
+  /// subinterpreter.
+  Future<Map<Object?, Object?>> status() async =>
+      await rpc.call('status') as Map<Object?, Object?>;
+
+  /// Detach from the worker. Python keeps running, so a later [start] in this
+  /// process re-attaches without re-importing anything.
+  void close() {
+    rpc.close();
+    bridge.close();
+    for (final b in interpreterBridges) {
+      b.close();
+    }
+  }
+
+  Map<String, Object?> _callParams(
+          String target, List<Object?>? args, Map<String, Object?>? kwargs) =>
+      {'target': target, 'args': args, 'kwargs': kwargs};
+
+  Future<void> _awaitReady(Duration timeout) async {
+    const interval = Duration(milliseconds: 50);
+    final start = DateTime.now();
+    while (true) {
+      try {
+        await rpc.call('status');
+        return;
+      } on StateError {
+        // Worker handler not registered yet.
+      }
+      if (DateTime.now().difference(start) > timeout) {
+        throw TimeoutException(
+            'Python worker did not answer on port ${bridge.port}', timeout);
+      }
+      await Future<void>.delayed(interval);
+    }
+  }
+}
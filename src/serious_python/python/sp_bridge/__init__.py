@@ -0,0 +1,28 @@
+"""Python-side helpers for `dart_bridge` channels.
+
+`dart_bridge` (the built-in module registered by the native library) only moves
+bytes: `send_bytes(port, payload)` one way, the handler registered with
+`set_enqueue_handler_func(port, handler)` the other. This package holds the
+pure-Python layers serious_python ships on top of it, matching the Dart classes
+exported from `package:serious_python/bridge.dart`:
+
+- `sp_bridge.codec` — compact binary message codec (`BridgeCodec` in Dart).
+- `sp_bridge.rpc` — request/response dispatcher (`PythonRpcClient`).
+- `sp_bridge.batch` — coalescing sender (`PythonBridge(batched: true)`).
+- `sp_bridge.shm` — shared-memory buffer pool (`PythonSharedBuffers`).
+- `sp_bridge.metrics` — per-port counters and latency histograms
+  (`PythonBridgeMetrics`).
+- `sp_bridge.worker` — resident job server (`PythonWorker`).
+- `sp_bridge.pool` — pre-warmed subinterpreters for parallel CPU-bound jobs
+  (`PythonWorker.callParallel`).
+- `sp_bridge.web` — serves a WSGI or ASGI app in-process
+  (`PythonHttpClient`).
+- `sp_bridge.logs` — batched `logging` and stdout/stderr streaming
+  (`PythonLogs`).
+- `sp_bridge.memory` — frees caches and heap on memory pressure
+  (`PythonMemory`).
+
+`serious_python:main package` copies this package into every native app bundle
+next to the app's own modules, so `import sp_bridge` works without listing it
+in requirements. An app that ships its own `sp_bridge` package keeps it.
+"""
@@ -0,0 +1,118 @@
+"""Coalescing sender for high-rate `dart_bridge` traffic.
+
+Every `dart_bridge.send_bytes` is one native port post, and for thousands of
+small frames per second the per-post overhead dominates. `BatchSender` packs
+frames into one buffer and posts it when the oldest queued frame is
+`max_delay` seconds old or the buffer reaches `max_bytes`, whichever comes
+first — or right away on `flush()`.
+
+Each post is a sequence of sub-frames, each a 4-byte little-endian length
+followed by that many bytes. The Dart side must read the port with
+`PythonBridge(batched: true)`, which splits posts back into one `messages`
+event per frame, in order. Every Python send to that port must therefore go
+through the same `BatchSender`.
+
+::
+
+    from sp_bridge.batch import BatchSender
+
+    telemetry = BatchSender(int(os.environ["MY_APP_TELEMETRY_PORT"]))
+    telemetry.send(codec.packb({"t": time.time(), "v": value}))
+    ...
+    telemetry.flush()  # e.g. before a latency-sensitive reply
+"""
+
+import struct
+import threading
+import time
+
+import dart_bridge
+
+from . import metrics
+
+__all__ = ["BatchSender"]
+
+_LEN = struct.Struct("<I")
+
+
+class BatchSender:
+    """Thread-safe batching sender for one port.
+
+    :param port: Dart native port of a `PythonBridge(batched: true)`.
+    :param max_delay: seconds a frame may wait for company before the batch
+        is posted.
+    :param max_bytes: batch size that triggers an immediate post. A frame
+        larger than this is posted in a batch of its own.
+    """
+
+    def __init__(self, port, max_delay=0.002, max_bytes=64 * 1024):
+        self.port = port
+        self.max_delay = max_delay
+        self.max_bytes = max_bytes
+        self.frames_sent = 0
+        self.batches_sent = 0
+        self._buf = bytearray()
+        self._count = 0
+        self._deadline = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        metrics.gauge(port, "batch_queued", lambda s: s._count, self)
+        metrics.gauge(port, "batch_frames_sent", lambda s: s.frames_sent, self)
+        self._thread = threading.Thread(
+            target=self._run, name="sp_bridge_batch", daemon=True
+        )
+        self._thread.start()
+
+    def send(self, payload):
+        """Queue `payload` (bytes-like) for the next batch."""
+        with self._cond:
+            if self._closed:
+                raise ValueError("BatchSender is closed")
+            if self._count and _LEN.size + len(payload) >= self.max_bytes:
+                # Post what is queued first: the big one goes on its own.
+                self._flush_locked()
+            buf = self._buf
+            buf += _LEN.pack(len(payload))
+            buf += payload
+            self._count += 1
+            if len(buf) >= self.max_bytes:
+                self._flush_locked()
+            elif self._count == 1:
+                self._deadline = time.monotonic() + self.max_delay
+                self._cond.notify()
+
+    def flush(self):
+        """Post everything queued so far now."""
+        with self._cond:
+            self._flush_locked()
+
+    def close(self):
+        """Flush and stop the timer thread. Further sends raise."""
+        with self._cond:
+            self._flush_locked()
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _flush_locked(self):
+        if not self._count:
+            return
+        data = bytes(self._buf)
+        self.frames_sent += self._count
+        self.batches_sent += 1
+        self._buf.clear()
+        self._count = 0
+        # Posted under the lock so batches from competing flushes keep order.
+        dart_bridge.send_bytes(self.port, data)
+
+    def _run(self):
+        with self._cond:
+            while not self._closed:
+                if not self._count:
+                    self._cond.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                self._flush_locked()
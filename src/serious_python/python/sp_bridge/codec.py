@@ -0,0 +1,426 @@
+"""Compact binary codec for `dart_bridge` messages.
+
+The wire format is MessagePack (https://msgpack.org/) — `nil`, `bool`, `int`
+(up to 64 bits), `float64`, `str`, `bin`, `array` and `map` — so any msgpack
+implementation can read it. On top of that, typed numeric arrays travel as
+msgpack `ext` values whose payload is the raw little-endian element buffer:
+
+=======  ==================  ==================  ===================
+ext      Python (decoded)    Dart                element
+=======  ==================  ==================  ===================
+1        memoryview('b')     Int8List            int8
+2        memoryview('h')     Int16List           int16
+3        memoryview('H')     Uint16List          uint16
+4        memoryview('i')     Int32List           int32
+5        memoryview('I')     Uint32List          uint32
+6        memoryview('q')     Int64List           int64
+7        memoryview('Q')     Uint64List          uint64
+8        memoryview('f')     Float32List         float32
+9        memoryview('d')     Float64List         float64
+=======  ==================  ==================  ===================
+
+Anything exposing the buffer protocol with one of those element types —
+`array.array`, a cast `memoryview`, a C-contiguous numpy array — encodes as the
+matching ext; byte buffers (`bytes`, `bytearray`, uint8 arrays) encode as
+`bin`, and `bin` decodes to `bytes`. Multi-dimensional buffers are flattened:
+send the shape alongside if you need it.
+
+Decoded typed arrays are `memoryview`s over the input buffer (no copy, keeps it
+alive); pass `copy=True` to `unpackb` to get independent `array.array`s
+instead, e.g. when the input buffer is about to be reused.
+
+Counterpart of `BridgeCodec` in `package:serious_python/bridge.dart`::
+
+    import dart_bridge
+    from sp_bridge import codec
+
+    def on_message(payload):
+        msg = codec.unpackb(payload)
+        dart_bridge.send_bytes(port, codec.packb({"ok": True, "echo": msg}))
+"""
+
+import struct
+import sys
+from array import array
+
+__all__ = ["DecodeError", "packb", "unpackb"]
+
+EXT_INT8 = 1
+EXT_INT16 = 2
+EXT_UINT16 = 3
+EXT_INT32 = 4
+EXT_UINT32 = 5
+EXT_INT64 = 6
+EXT_UINT64 = 7
+EXT_FLOAT32 = 8
+EXT_FLOAT64 = 9
+
+# ext code -> memoryview/array format of the decoded elements.
+_EXT_FORMATS = {
+    EXT_INT8: "b",
+    EXT_INT16: "h",
+    EXT_UINT16: "H",
+    EXT_INT32: "i",
+    EXT_UINT32: "I",
+    EXT_INT64: "q",
+    EXT_UINT64: "Q",
+    EXT_FLOAT32: "f",
+    EXT_FLOAT64: "d",
+}
+
+# (kind, itemsize) -> ext code, where kind is "i"/"u"/"f". Keyed by size rather
+# than format char because `l`/`L` are 4 or 8 bytes depending on the platform.
+_EXT_BY_KIND = {
+    ("i", 1): EXT_INT8,
+    ("i", 2): EXT_INT16,
+    ("u", 2): EXT_UINT16,
+    ("i", 4): EXT_INT32,
+    ("u", 4): EXT_UINT32,
+    ("i", 8): EXT_INT64,
+    ("u", 8): EXT_UINT64,
+    ("f", 4): EXT_FLOAT32,
+    ("f", 8): EXT_FLOAT64,
+}
+_KIND = {
+    "b": "i",
+    "h": "i",
+    "i": "i",
+    "l": "i",
+    "q": "i",
+    "n": "i",
+    "B": "u",
+    "H": "u",
+    "I": "u",
+    "L": "u",
+    "Q": "u",
+    "N": "u",
+    "f": "f",
+    "d": "f",
+}
+
+_LITTLE = sys.byteorder == "little"
+
+_B = struct.Struct(">B")
+_H = struct.Struct(">H")
+_I = struct.Struct(">I")
+_Q = struct.Struct(">Q")
+_b = struct.Struct(">b")
+_h = struct.Struct(">h")
+_i = struct.Struct(">i")
+_q = struct.Struct(">q")
+_f = struct.Struct(">f")
+_d = struct.Struct(">d")
+
+
+class DecodeError(ValueError):
+    """Raised by `unpackb` for malformed or truncated input."""
+
+
+# ---------------------------------------------------------------- encoding
+
+
+def packb(obj):
+    """Encode `obj` to `bytes`.
+
+    Raises `TypeError` for values the format cannot carry and `OverflowError`
+    for integers outside the 64-bit range.
+    """
+    out = []
+    _pack(obj, out.append)
+    return b"".join(out)
+
+
+def _pack(obj, w):
+    t = type(obj)
+    if obj is None:
+        w(b"\xc0")
+    elif obj is True:
+        w(b"\xc3")
+    elif obj is False:
+        w(b"\xc2")
+    elif t is int:
+        _pack_int(obj, w)
+    elif t is float:
+        w(b"\xcb" + _d.pack(obj))
+    elif t is str:
+        data = obj.encode("utf-8")
+        n = len(data)
+        if n < 32:
+            w(bytes((0xA0 | n,)))
+        elif n < 0x100:
+            w(b"\xd9" + _B.pack(n))
+        elif n < 0x10000:
+            w(b"\xda" + _H.pack(n))
+        else:
+            w(b"\xdb" + _I.pack(n))
+        w(data)
+    elif t is bytes or t is bytearray:
+        _pack_bin_header(len(obj), w)
+        w(obj)
+    elif t is list or t is tuple:
+        n = len(obj)
+        if n < 16:
+            w(bytes((0x90 | n,)))
+        elif n < 0x10000:
+            w(b"\xdc" + _H.pack(n))
+        else:
+            w(b"\xdd" + _I.pack(n))
+        for item in obj:
+            _pack(item, w)
+    elif t is dict:
+        n = len(obj)
+        if n < 16:
+            w(bytes((0x80 | n,)))
+        elif n < 0x10000:
+            w(b"\xde" + _H.pack(n))
+        else:
+            w(b"\xdf" + _I.pack(n))
+        for k, v in obj.items():
+            _pack(k, w)
+            _pack(v, w)
+    elif t is memoryview or t is array:
+        _pack_buffer(memoryview(obj), w)
+    # Subclasses (IntEnum, OrderedDict, ...) and foreign buffers (numpy).
+    elif isinstance(obj, bool):
+        _pack(bool(obj), w)
+    elif isinstance(obj, int):
+        _pack_int(int(obj), w)
+    elif isinstance(obj, float):
+        _pack(float(obj), w)
+    elif isinstance(obj, str):
+        _pack(str(obj), w)
+    elif isinstance(obj, (list, tuple)):
+        _pack(list(obj), w)
+    elif isinstance(obj, dict):
+        _pack(dict(obj), w)
+    else:
+        try:
+            mv = memoryview(obj)
+        except TypeError:
+            raise TypeError(
+                "cannot encode object of type %s" % type(obj).__name__
+            ) from None
+        _pack_buffer(mv, w)
+
+
+def _pack_int(v, w):
+    if v >= 0:
+        if v < 0x80:
+            w(bytes((v,)))
+        elif v < 0x100:
+            w(b"\xcc" + _B.pack(v))
+        elif v < 0x10000:
+            w(b"\xcd" + _H.pack(v))
+        elif v < 0x100000000:
+            w(b"\xce" + _I.pack(v))
+        elif v < 0x10000000000000000:
+            w(b"\xcf" + _Q.pack(v))
+        else:
+            raise OverflowError("int too large to encode: %d" % v)
+    elif v >= -32:
+        w(bytes((v & 0xFF,)))
+    elif v >= -0x80:
+        w(b"\xd0" + _b.pack(v))
+    elif v >= -0x8000:
+        w(b"\xd1" + _h.pack(v))
+    elif v >= -0x80000000:
+        w(b"\xd2" + _i.pack(v))
+    elif v >= -0x8000000000000000:
+        w(b"\xd3" + _q.pack(v))
+    else:
+        raise OverflowError("int too small to encode: %d" % v)
+
+
+def _pack_bin_header(n, w):
+    if n < 0x100:
+        w(b"\xc4" + _B.pack(n))
+    elif n < 0x10000:
+        w(b"\xc5" + _H.pack(n))
+    else:
+        w(b"\xc6" + _I.pack(n))
+
+
+def _pack_buffer(mv, w):
+    fmt = mv.format
+    order = fmt[0] if fmt[:1] in ("@", "=", "<", ">", "!") else "@"
+    code = fmt.lstrip("@=<>!")
+    if not mv.c_contiguous:
+        mv = memoryview(mv.tobytes()).cast(code)
+    if code in ("B", "c"):
+        data = mv.cast("B")
+        _pack_bin_header(data.nbytes, w)
+        w(data)
+        return
+    kind = _KIND.get(code)
+    ext = _EXT_BY_KIND.get((kind, mv.itemsize)) if kind else None
+    if ext is None:
+        raise TypeError("cannot encode buffer of format %r" % fmt)
+    if order in (">", "!") or (order in ("@", "=") and not _LITTLE):
+        # Wire order is little-endian regardless of host or source order.
+        swapped = array(_EXT_FORMATS[ext])
+        swapped.frombytes(mv.tobytes())
+        swapped.byteswap()
+        data = memoryview(swapped).cast("B")
+    else:
+        data = mv.cast("B")
+    n = data.nbytes
+    if n == 1:
+        w(b"\xd4")
+    elif n == 2:
+        w(b"\xd5")
+    elif n == 4:
+        w(b"\xd6")
+    elif n == 8:
+        w(b"\xd7")
+    elif n == 16:
+        w(b"\xd8")
+    elif n < 0x100:
+        w(b"\xc7" + _B.pack(n))
+    elif n < 0x10000:
+        w(b"\xc8" + _H.pack(n))
+    else:
+        w(b"\xc9" + _I.pack(n))
+    w(_b.pack(ext))
+    w(data)
+
+
+# ---------------------------------------------------------------- decoding
+
+
+def unpackb(data, copy=False):
+    """Decode one value from `data` (any bytes-like object).
+
+    Typed arrays decode to `memoryview`s over `data` unless `copy` is true, in
+    which case they are `array.array` copies. Raises `DecodeError` on
+    malformed, truncated or trailing input.
+    """
+    buf = memoryview(data)
+    if buf.format != "B" or buf.ndim != 1:
+        buf = buf.cast("B")
+    try:
+        obj, pos = _unpack(buf, 0, copy)
+    except (IndexError, struct.error) as e:
+        raise DecodeError("truncated message") from e
+    except TypeError as e:  # unhashable map key
+        raise DecodeError(str(e)) from e
+    except UnicodeDecodeError as e:  # a str that isn't UTF-8
+        raise DecodeError("invalid UTF-8 in str: %s" % e.reason) from e
+    if pos != len(buf):
+        raise DecodeError("%d trailing bytes" % (len(buf) - pos))
+    return obj
+
+
+def _take(buf, pos, n):
+    end = pos + n
+    if end > len(buf):
+        raise DecodeError("truncated message")
+    return buf[pos:end], end
+
+
+def _unpack(buf, pos, copy):
+    b = buf[pos]
+    pos += 1
+    if b < 0x80:
+        return b, pos
+    if b >= 0xE0:
+        return b - 0x100, pos
+    if 0xA0 <= b <= 0xBF:
+        s, pos = _take(buf, pos, b & 0x1F)
+        return str(s, "utf-8"), pos
+    if 0x90 <= b <= 0x9F:
+        return _unpack_array(buf, pos, b & 0x0F, copy)
+    if 0x80 <= b <= 0x8F:
+        return _unpack_map(buf, pos, b & 0x0F, copy)
+    if b == 0xC0:
+        return None, pos
+    if b == 0xC2:
+        return False, pos
+    if b == 0xC3:
+        return True, pos
+    if b == 0xCB:
+        return _d.unpack_from(buf, pos)[0], pos + 8
+    if b == 0xCA:
+        return _f.unpack_from(buf, pos)[0], pos + 4
+    if b == 0xCC:
+        return buf[pos], pos + 1
+    if b == 0xCD:
+        return _H.unpack_from(buf, pos)[0], pos + 2
+    if b == 0xCE:
+        return _I.unpack_from(buf, pos)[0], pos + 4
+    if b == 0xCF:
+        return _Q.unpack_from(buf, pos)[0], pos + 8
+    if b == 0xD0:
+        return _b.unpack_from(buf, pos)[0], pos + 1
+    if b == 0xD1:
+        return _h.unpack_from(buf, pos)[0], pos + 2
+    if b == 0xD2:
+        return _i.unpack_from(buf, pos)[0], pos + 4
+    if b == 0xD3:
+        return _q.unpack_from(buf, pos)[0], pos + 8
+    if b in (0xD9, 0xDA, 0xDB):
+        n, pos = _length(buf, pos, b - 0xD9)
+        s, pos = _take(buf, pos, n)
+        return str(s, "utf-8"), pos
+    if b in (0xC4, 0xC5, 0xC6):
+        n, pos = _length(buf, pos, b - 0xC4)
+        s, pos = _take(buf, pos, n)
+        return s.tobytes(), pos
+    if b == 0xDC or b == 0xDD:
+        n, pos = _length(buf, pos, b - 0xDC + 1)
+        return _unpack_array(buf, pos, n, copy)
+    if b == 0xDE or b == 0xDF:
+        n, pos = _length(buf, pos, b - 0xDE + 1)
+        return _unpack_map(buf, pos, n, copy)
+    if 0xD4 <= b <= 0xD8:
+        return _unpack_ext(buf, pos, 1 << (b - 0xD4), copy)
+    if b in (0xC7, 0xC8, 0xC9):
+        n, pos = _length(buf, pos, b - 0xC7)
+        return _unpack_ext(buf, pos, n, copy)
+    raise DecodeError("invalid type byte 0x%02x at offset %d" % (b, pos - 1))
+
+
+def _length(buf, pos, width):
+    # width: 0 -> 8-bit, 1 -> 16-bit, 2 -> 32-bit big-endian length
+    if width == 0:
+        return buf[pos], pos + 1
+    if width == 1:
+        return _H.unpack_from(buf, pos)[0], pos + 2
+    return _I.unpack_from(buf, pos)[0], pos + 4
+
+
+def _unpack_array(buf, pos, n, copy):
+    items = []
+    append = items.append
+    for _ in range(n):
+        item, pos = _unpack(buf, pos, copy)
+        append(item)
+    return items, pos
+
+
+def _unpack_map(buf, pos, n, copy):
+    d = {}
+    for _ in range(n):
+        k, pos = _unpack(buf, pos, copy)
+        v, pos = _unpack(buf, pos, copy)
+        d[k] = v
+    return d, pos
+
+
+def _unpack_ext(buf, pos, n, copy):
+    ext = _b.unpack_from(buf, pos)[0]
+    data, pos = _take(buf, pos + 1, n)
+    fmt = _EXT_FORMATS.get(ext)
+    if fmt is None:
+        raise DecodeError("unknown ext type %d" % ext)
+    itemsize = struct.calcsize(fmt)
+    if n % itemsize:
+        raise DecodeError(
+            "ext %d payload of %d bytes is not whole elements" % (ext, n)
+        )
+    if copy or not _LITTLE:
+        arr = array(fmt)
+        arr.frombytes(data)
+        if not _LITTLE:
+            arr.byteswap()
+        return (arr if copy else memoryview(arr)), pos
+    return data.cast(fmt), pos
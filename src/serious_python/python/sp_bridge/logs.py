@@ -0,0 +1,374 @@
+"""Stream `logging` records and stdout/stderr to Dart in batches.
+
+Call `install()` first thing in `main.py`::
+
+    from sp_bridge import logs
+    logs.install()      # port from SERIOUS_PYTHON_LOG_PORT
+
+It replaces `sys.stdout` and `sys.stderr` with writers that cut what is
+written into lines, and adds a handler to the root logger. Lines and records
+go into a bounded in-memory ring buffer; a background thread posts what has
+accumulated to Dart every `interval` seconds as one frame, which
+`PythonLogs.records` in Dart turns back into one event per line or record.
+A `print` costs an append under a lock instead of an unbuffered write.
+
+Dart acknowledges each batch once it has handed it to its listeners, and at
+most `max_in_flight` batches are sent unacknowledged. When the Dart isolate
+falls behind (or Python logs faster than it can be sent) the ring buffer
+fills up and its oldest entries are overwritten, so logging never blocks the
+app or grows without bound; how many were lost is reported with the next
+batch, and in `stats()`. So are batches Dart wasn't there to receive; after
+a Dart VM restart, `rebind()` moves the stream to the new isolate's port.
+
+Entries below the level threshold (`level`, settable from Dart with
+`PythonLogs.setLevel`) are discarded before they are buffered. stdout lines
+are `logging.INFO`, stderr lines `logging.WARNING`.
+
+=============================  ==========  ====================================
+frame                          direction   meaning
+=============================  ==========  ====================================
+``[seq, dropped, entries]``    Py → Dart   batch `seq`; each entry is
+                                           ``[time, level, logger, message]``,
+                                           `time` in seconds since the epoch,
+                                           `logger` `stdout` / `stderr` for
+                                           lines; `dropped` entries were lost
+                                           since the previous batch
+``[0, level]``                 Dart → Py   set the level threshold
+``[1, seq]``                   Dart → Py   batches up to `seq` consumed
+=============================  ==========  ====================================
+"""
+
+import atexit
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import dart_bridge
+
+from . import codec, metrics
+
+__all__ = ["flush", "install", "rebind", "set_level", "stats", "uninstall"]
+
+_PORT_ENV = "SERIOUS_PYTHON_LOG_PORT"
+
+SET_LEVEL = 0
+ACK = 1
+
+STDOUT_LEVEL = logging.INFO
+STDERR_LEVEL = logging.WARNING
+
+_sink = None
+
+_GAUGES = {
+    "logs_buffered": lambda s: s.buffered,
+    "logs_dropped": lambda s: s.dropped,
+    "logs_in_flight": lambda s: s.in_flight,
+}
+
+
+class _Sink:
+    """The ring buffer and the thread that posts it."""
+
+    def __init__(
+        self, port, level, capacity, interval, max_batch, max_in_flight
+    ):
+        self.port = port
+        self.level = level
+        self.capacity = capacity
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_in_flight = max_in_flight
+        self.dropped = 0
+        self.sent = 0
+        self._entries = deque()
+        self._dropped = 0  # since the last batch
+        self._seq = 0
+        self._acked = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="sp_bridge_logs", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, level, logger, message):
+        if level < self.level:
+            return
+        entry = (time.time(), level, logger, message)
+        with self._cond:
+            if len(self._entries) >= self.capacity:
+                self._entries.popleft()
+                self._dropped += 1
+                self.dropped += 1
+            self._entries.append(entry)
+            if len(self._entries) == self.max_batch:
+                self._cond.notify()
+
+    def on_control(self, payload):
+        try:
+            frame = codec.unpackb(payload)
+            kind = frame[0]
+        except (codec.DecodeError, IndexError, TypeError, KeyError) as e:
+            sys.stderr.write("sp_bridge.logs: dropping bad frame: %r\n" % (e,))
+            return
+        if kind == SET_LEVEL:
+            set_level(frame[1])
+        elif kind == ACK:
+            with self._cond:
+                self._acked = max(self._acked, frame[1])
+                self._cond.notify()
+
+    def flush(self):
+        """Post everything buffered, regardless of acknowledgements."""
+        while self._post(force=True):
+            pass
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+
+    def rebind(self, port):
+        with self._send_lock:
+            with self._cond:
+                self.port = port
+                # Batches in flight went to the old port; none will be acked.
+                self._acked = self._seq
+                self._cond.notify()
+
+    @property
+    def buffered(self):
+        return len(self._entries)
+
+    @property
+    def in_flight(self):
+        return self._seq - self._acked
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                self._cond.wait(self.interval)
+            while self._post(force=False):
+                pass
+
+    def _post(self, force):
+        # One batch, if there is anything to send and room in flight. Taken
+        # and posted under one lock so batches arrive in `seq` order.
+        with self._send_lock:
+            with self._cond:
+                if not self._entries and not self._dropped:
+                    return False
+                if not force and self._seq - self._acked >= self.max_in_flight:
+                    return False
+                n = min(len(self._entries), self.max_batch)
+                batch = [self._entries.popleft() for _ in range(n)]
+                dropped, self._dropped = self._dropped, 0
+                self._seq += 1
+                seq = self._seq
+            frame = codec.packb([seq, dropped, batch])
+            if dart_bridge.send_bytes(self.port, frame) is False:
+                # Not delivered — nothing listens on the port (yet, or any
+                # more): the entries are lost, not in flight.
+                with self._cond:
+                    self._seq -= 1
+                    self._dropped += dropped + n
+                    self.dropped += n
+                return False
+            self.sent += n
+            return True
+
+
+class _Handler(logging.Handler):
+    def __init__(self, sink):
+        super().__init__()
+        self._sink = sink
+
+    def emit(self, record):
+        try:
+            self._sink.put(record.levelno, record.name, self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+class _LineWriter(io.TextIOBase):
+    """Stands in for `sys.stdout` / `sys.stderr`: buffers text until a
+    newline and logs each complete line."""
+
+    def __init__(self, sink, name, level, original, echo):
+        self._sink = sink
+        self._name = name
+        self._level = level
+        self._original = original
+        self._echo = original if echo else None
+        self._partial = ""
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    @property
+    def errors(self):
+        return "strict"
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return False
+
+    def fileno(self):
+        if self._original is None:
+            raise io.UnsupportedOperation("fileno")
+        return self._original.fileno()
+
+    def write(self, s):
+        if not isinstance(s, str):
+            raise TypeError(
+                "write() argument must be str, not %s" % type(s).__name__
+            )
+        if self._echo is not None:
+            self._echo.write(s)
+        if "\n" not in s:
+            with self._lock:
+                self._partial += s
+            return len(s)
+        with self._lock:
+            lines = (self._partial + s).split("\n")
+            self._partial = lines.pop()
+        for line in lines:
+            self._sink.put(self._level, self._name, line)
+        return len(s)
+
+    def flush(self):
+        if self._echo is not None:
+            self._echo.flush()
+
+    def drain(self):
+        with self._lock:
+            partial, self._partial = self._partial, ""
+        if partial:
+            self._sink.put(self._level, self._name, partial)
+
+
+_handler = None
+_streams = None  # (stdout writer, stderr writer, original stdout, original stderr)
+
+
+def install(
+    port=None,
+    *,
+    level=logging.INFO,
+    capture_stdio=True,
+    echo=False,
+    capacity=10000,
+    interval=0.05,
+    max_batch=1000,
+    max_in_flight=4,
+):
+    """Start streaming to `port` (default: `SERIOUS_PYTHON_LOG_PORT`).
+    Idempotent.
+
+    :param level: threshold; also set on the root logger.
+    :param capture_stdio: replace `sys.stdout` and `sys.stderr`.
+    :param echo: also write captured output to the original streams.
+    :param capacity: entries the ring buffer holds before dropping the oldest.
+    :param interval: seconds between batches.
+    :param max_batch: entries per batch; a full batch is posted right away.
+    :param max_in_flight: batches sent and not yet acknowledged by Dart.
+    """
+    global _sink, _handler, _streams
+    if _sink is not None:
+        return
+    if port is None:
+        port = int(os.environ[_PORT_ENV])
+    _sink = sink = _Sink(
+        port, level, capacity, interval, max_batch, max_in_flight
+    )
+    _serve(sink)
+
+    _handler = _Handler(sink)
+    logging.root.addHandler(_handler)
+    logging.root.setLevel(level)
+    if capture_stdio:
+        out = _LineWriter(sink, "stdout", STDOUT_LEVEL, sys.stdout, echo)
+        err = _LineWriter(sink, "stderr", STDERR_LEVEL, sys.stderr, echo)
+        _streams = (out, err, sys.stdout, sys.stderr)
+        sys.stdout, sys.stderr = out, err
+    atexit.register(flush)
+
+
+def rebind(port):
+    """Stream to a new Dart port — e.g. after a Dart VM restart, when the old
+    `PythonLogs` is gone. Batches still unacknowledged on the old port are
+    written off; what is buffered goes to the new one."""
+    if _sink is None:
+        return
+    old = _sink.port
+    _sink.rebind(port)
+    for name in _GAUGES:
+        metrics.remove_gauge(old, name)
+    _serve(_sink)
+
+
+def _serve(sink):
+    for name, fn in _GAUGES.items():
+        metrics.gauge(sink.port, name, fn, sink)
+    dart_bridge.set_enqueue_handler_func(sink.port, sink.on_control)
+
+
+def set_level(level):
+    """Change the threshold (also on the root logger)."""
+    if _sink is None:
+        return
+    _sink.level = level
+    logging.root.setLevel(level)
+
+
+def flush():
+    """Post everything buffered now — e.g. before the app exits."""
+    if _sink is None:
+        return
+    if _streams is not None:
+        _streams[0].drain()
+        _streams[1].drain()
+    _sink.flush()
+
+
+def stats():
+    """Entries buffered, dropped and sent, and batches in flight."""
+    if _sink is None:
+        return None
+    return {
+        "buffered": _sink.buffered,
+        "dropped": _sink.dropped,
+        "sent": _sink.sent,
+        "in_flight": _sink.in_flight,
+        "level": _sink.level,
+    }
+
+
+def uninstall():
+    """Restore stdout/stderr, remove the handler, and post what is left."""
+    global _sink, _handler, _streams
+    if _sink is None:
+        return
+    if _streams is not None:
+        out, err, sys.stdout, sys.stderr = _streams
+        out.drain()
+        err.drain()
+        _streams = None
+    logging.root.removeHandler(_handler)
+    _handler = None
+    atexit.unregister(flush)
+    _sink.close()
+    _sink = None
@@ -0,0 +1,222 @@
+"""Give memory back when the host OS runs low.
+
+Android sends `onTrimMemory` to a running app, iOS a memory warning; a
+process that ignores them is the first to be killed. `install()` serves a
+port that `PythonMemory` in Dart calls when one arrives::
+
+    from sp_bridge import memory
+    memory.install()    # port from SERIOUS_PYTHON_MEMORY_PORT
+
+    @memory.register
+    def drop_thumbnails(level):
+        thumbnails.clear()
+
+`trim()` — which an app can also call itself — runs the registered callbacks,
+then `gc.collect()`, and clears what the interpreter caches on its own:
+`linecache`, the import system's finder caches (including the native-module
+lookups of the Android bootstrap's `.soref` finder), compiled regexes and the
+method cache. With `release_heap` it finally asks the C allocator to hand its
+free pages back to the OS (`malloc_trim` with glibc, `M_PURGE` with Android's
+allocator, `malloc_zone_pressure_relief` on Apple platforms, `_heapmin` on
+Windows), where it can.
+
+`level` is an Android `ComponentCallbacks2.TRIM_MEMORY_*` value (the
+constants below); iOS memory warnings and Flutter's `didHaveMemoryPressure`
+arrive as `RUNNING_CRITICAL`. Callbacks get it, to decide how much to drop.
+
+=======================  ==========  =========================================
+frame                    direction   meaning
+=======================  ==========  =========================================
+``[id, level]``          Dart → Py   trim; `level` an int, or None
+``[id, report]``         Py → Dart   `trim()`'s report for request `id`
+=======================  ==========  =========================================
+"""
+
+import gc
+import importlib
+import linecache
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
+import dart_bridge
+
+from . import codec, metrics
+
+__all__ = ["install", "register", "rss", "trim", "unregister"]
+
+_PORT_ENV = "SERIOUS_PYTHON_MEMORY_PORT"
+
+# android.content.ComponentCallbacks2
+RUNNING_MODERATE = 5
+RUNNING_LOW = 10
+RUNNING_CRITICAL = 15
+UI_HIDDEN = 20
+BACKGROUND = 40
+MODERATE = 60
+COMPLETE = 80
+
+_lock = threading.Lock()
+_callbacks = []
+_trims = 0
+_freed = 0
+_release = None
+
+
+def register(callback):
+    """Call `callback(level)` on every trim, before the collector runs.
+    Returns `callback`, so it can be used as a decorator."""
+    with _lock:
+        if callback not in _callbacks:
+            _callbacks.append(callback)
+    return callback
+
+
+def unregister(callback):
+    with _lock:
+        if callback in _callbacks:
+            _callbacks.remove(callback)
+
+
+def rss():
+    """Resident set size of the process in bytes, or None where unknown."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def trim(level=None, *, release_heap=True):
+    """Free what can be freed; returns a report of what it did.
+
+    The report holds `level`, `rss_before`, `rss_after` and `freed` (bytes,
+    None where `rss()` is), `blocks_freed` (Python allocator blocks),
+    `gc_collected`, `callbacks` run, callback `errors` (as strings),
+    `heap_released` (whether the C allocator was asked to) and `ms`.
+    """
+    global _trims, _freed
+    start = time.perf_counter()
+    rss_before = rss()
+    blocks_before = sys.getallocatedblocks()
+
+    with _lock:
+        callbacks = list(_callbacks)
+    errors = []
+    for callback in callbacks:
+        try:
+            callback(level)
+        except Exception as e:
+            errors.append("%s: %s" % (type(e).__name__, e))
+
+    linecache.clearcache()
+    importlib.invalidate_caches()
+    re.purge()
+    collected = gc.collect()
+    getattr(sys, "_clear_internal_caches", sys._clear_type_cache)()
+
+    released = False
+    if release_heap:
+        release = _heap_release()
+        if release is not None:
+            try:
+                release()
+                released = True
+            except Exception as e:
+                errors.append("heap release: %s: %s" % (type(e).__name__, e))
+
+    rss_after = rss()
+    freed = None
+    if rss_before is not None and rss_after is not None:
+        freed = max(rss_before - rss_after, 0)
+    with _lock:
+        _trims += 1
+        _freed += freed or 0
+    return {
+        "level": level,
+        "rss_before": rss_before,
+        "rss_after": rss_after,
+        "freed": freed,
+        "blocks_freed": blocks_before - sys.getallocatedblocks(),
+        "gc_collected": collected,
+        "callbacks": len(callbacks),
+        "errors": errors,
+        "heap_released": released,
+        "ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def _heap_release():
+    # The C allocator's "give free pages back" call, or None; looked up once.
+    global _release
+    if _release is None:
+        _release = _find_heap_release() or False
+    return _release or None
+
+
+def _find_heap_release():
+    try:
+        import ctypes
+        import ctypes.util
+
+        if hasattr(sys, "getandroidapilevel"):
+            # bionic: mallopt(M_PURGE) (API 28+); returns 0 where unsupported.
+            libc = ctypes.CDLL("libc.so")
+            mallopt = libc.mallopt
+            mallopt.argtypes = [ctypes.c_int, ctypes.c_int]
+            return lambda: mallopt(-101, 0)
+        if sys.platform == "darwin":
+            libc = ctypes.CDLL(ctypes.util.find_library("c"))
+            relief = libc.malloc_zone_pressure_relief
+            relief.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+            relief.restype = ctypes.c_size_t
+            return lambda: relief(None, 0)
+        if sys.platform == "win32":
+            return ctypes.cdll.ucrtbase._heapmin
+        libc = ctypes.CDLL(None)
+        malloc_trim = libc.malloc_trim  # glibc only; AttributeError elsewhere
+        malloc_trim.argtypes = [ctypes.c_size_t]
+        return lambda: malloc_trim(0)
+    except (ImportError, OSError, AttributeError, TypeError):
+        return None
+
+
+def install(port=None):
+    """Serve trims on `port` (default: `SERIOUS_PYTHON_MEMORY_PORT`).
+
+    Each message is a trim request ``[id, level]``. Trims run one at a time on
+    a thread of their own — one can take a while — and each report is sent
+    back codec-encoded with the request's `id`.
+    """
+    if port is None:
+        port = int(os.environ[_PORT_ENV])
+    requests = queue.SimpleQueue()
+
+    def run():
+        # One trim at a time, answered in the order they were asked for.
+        while True:
+            request_id, level = requests.get()
+            try:
+                report = trim(level)
+            except Exception as e:
+                report = {
+                    "level": level,
+                    "errors": ["%s: %s" % (type(e).__name__, e)],
+                }
+            dart_bridge.send_bytes(port, codec.packb([request_id, report]))
+
+    def on_request(payload):
+        try:
+            request_id, level = codec.unpackb(payload)
+        except (codec.DecodeError, TypeError, ValueError) as e:
+            sys.stderr.write("sp_bridge.memory: dropping bad request: %r\n" % (e,))
+            return
+        requests.put((request_id, level))
+
+    threading.Thread(target=run, name="sp_bridge_memory", daemon=True).start()
+    metrics.gauge(port, "memory_trims", lambda: _trims)
+    metrics.gauge(port, "memory_freed", lambda: _freed)
+    dart_bridge.set_enqueue_handler_func(port, on_request)
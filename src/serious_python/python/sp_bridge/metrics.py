@@ -0,0 +1,330 @@
+"""Per-port `dart_bridge` metrics.
+
+`install()` wraps `dart_bridge.send_bytes` and `set_enqueue_handler_func` so
+that, per port, it counts messages and bytes in each direction, times every
+handler call and every send into log2 histograms, tracks handler concurrency
+(the inbound queue depth) and counts handler errors and dropped sends. Until
+`install()` is called nothing is wrapped, so a disabled build pays nothing.
+
+Install it before any handler is registered — first thing in `main.py`::
+
+    from sp_bridge import metrics
+    metrics.install()
+
+If `SERIOUS_PYTHON_BRIDGE_METRICS_PORT` is set (or `port` is passed), the
+snapshot is also served on that port: a request `id` sent to it is answered
+with `sp_bridge.codec.packb([id, snapshot()])`, which
+`PythonBridgeMetrics.snapshot()` matches to its caller on the Dart side. The
+metrics port itself is not measured.
+
+Other `sp_bridge` components report their own state here: `RpcServer`
+pending calls and busy replies, `BatchSender` queued frames, `BufferPool`
+slots held by Dart. Apps can add `gauge()`s and `incr()` counters too.
+
+Handler time is the time the registered callable takes; if it hands work to
+another thread (like `RpcServer` does), that work is not included.
+"""
+
+import os
+import sys
+import threading
+import time
+import weakref
+
+import dart_bridge
+
+__all__ = [
+    "gauge",
+    "incr",
+    "install",
+    "remove_gauge",
+    "reset",
+    "serve",
+    "snapshot",
+    "uninstall",
+]
+
+_PORT_ENV = "SERIOUS_PYTHON_BRIDGE_METRICS_PORT"
+_BUCKETS = 32
+
+enabled = False
+_lock = threading.Lock()
+_ports = {}
+_gauges = {}
+_serve_port = None
+_started = time.monotonic()
+_orig_send = None
+_orig_set_handler = None
+
+
+class _Histogram:
+    """Counts by power-of-two microsecond bucket: bucket `i` holds durations
+    in `[2**(i-1), 2**i)` us (bucket 0: under 1 us)."""
+
+    __slots__ = ("buckets", "count", "total_us", "max_us")
+
+    def __init__(self):
+        self.buckets = [0] * _BUCKETS
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def add(self, ns):
+        us = ns // 1000
+        self.buckets[min(us.bit_length(), _BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def _quantile(self, q):
+        # Upper bound of the bucket holding the q-th sample.
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min(1 << i, self.max_us)
+        return self.max_us
+
+    def snapshot(self):
+        if not self.count:
+            return {"count": 0}
+        last = max(i for i, n in enumerate(self.buckets) if n)
+        return {
+            "count": self.count,
+            "mean_us": self.total_us / self.count,
+            "p50_us": self._quantile(0.5),
+            "p95_us": self._quantile(0.95),
+            "p99_us": self._quantile(0.99),
+            "max_us": self.max_us,
+            "buckets": self.buckets[: last + 1],
+        }
+
+
+class _PortStats:
+    __slots__ = (
+        "in_messages",
+        "in_bytes",
+        "out_messages",
+        "out_bytes",
+        "handler_errors",
+        "dropped",
+        "inflight",
+        "max_inflight",
+        "handler",
+        "send",
+        "counters",
+    )
+
+    def __init__(self):
+        self.in_messages = self.in_bytes = 0
+        self.out_messages = self.out_bytes = 0
+        self.handler_errors = self.dropped = 0
+        self.inflight = self.max_inflight = 0
+        self.handler = _Histogram()
+        self.send = _Histogram()
+        self.counters = {}
+
+    def reset(self):
+        # In place: wrapped handlers hold on to this object. Calls still in
+        # flight finish after the reset, so `inflight` stays.
+        inflight = self.inflight
+        self.__init__()
+        self.inflight = self.max_inflight = inflight
+
+
+def _stats(port):
+    st = _ports.get(port)
+    if st is None:
+        with _lock:
+            st = _ports.setdefault(port, _PortStats())
+    return st
+
+
+def _send_bytes(port, data):
+    if port == _serve_port:
+        return _orig_send(port, data)
+    st = _stats(port)
+    t0 = time.perf_counter_ns()
+    try:
+        result = _orig_send(port, data)
+    except Exception:
+        with _lock:
+            st.dropped += 1
+        raise
+    dt = time.perf_counter_ns() - t0
+    with _lock:
+        st.out_messages += 1
+        st.out_bytes += len(data)
+        st.send.add(dt)
+        if result is False:
+            st.dropped += 1
+    return result
+
+
+def _wrap_handler(port, handler):
+    st = _stats(port)
+
+    def handle(payload):
+        with _lock:
+            st.in_messages += 1
+            st.in_bytes += len(payload)
+            st.inflight += 1
+            if st.inflight > st.max_inflight:
+                st.max_inflight = st.inflight
+        t0 = time.perf_counter_ns()
+        try:
+            return handler(payload)
+        except BaseException:
+            with _lock:
+                st.handler_errors += 1
+            raise
+        finally:
+            dt = time.perf_counter_ns() - t0
+            with _lock:
+                st.inflight -= 1
+                st.handler.add(dt)
+
+    handle.__wrapped__ = handler
+    return handle
+
+
+def _set_handler(port, handler):
+    if handler is not None and port != _serve_port:
+        handler = _wrap_handler(port, handler)
+    return _orig_set_handler(port, handler)
+
+
+def install(port=None):
+    """Start measuring (idempotent) and, with `port` or
+    `SERIOUS_PYTHON_BRIDGE_METRICS_PORT`, serve snapshots on it."""
+    global enabled, _orig_send, _orig_set_handler
+    with _lock:
+        if not enabled:
+            _orig_send = dart_bridge.send_bytes
+            _orig_set_handler = dart_bridge.set_enqueue_handler_func
+            dart_bridge.send_bytes = _send_bytes
+            dart_bridge.set_enqueue_handler_func = _set_handler
+            enabled = True
+    if port is None and os.environ.get(_PORT_ENV):
+        port = int(os.environ[_PORT_ENV])
+    if port is not None:
+        serve(port)
+
+
+def uninstall():
+    """Stop measuring new sends and registrations. Handlers registered while
+    installed stay wrapped until re-registered."""
+    global enabled
+    with _lock:
+        if enabled:
+            dart_bridge.send_bytes = _orig_send
+            dart_bridge.set_enqueue_handler_func = _orig_set_handler
+            enabled = False
+
+
+def serve(port):
+    """Answer every request `id` on `port` with a codec-encoded
+    ``[id, snapshot()]``."""
+    global _serve_port
+    from . import codec
+
+    _serve_port = port
+    send = _orig_send or dart_bridge.send_bytes
+    set_handler = _orig_set_handler or dart_bridge.set_enqueue_handler_func
+
+    def on_request(payload):
+        try:
+            request_id = codec.unpackb(payload)
+        except codec.DecodeError:
+            request_id = None
+        send(port, codec.packb([request_id, snapshot()]))
+
+    set_handler(port, on_request)
+
+
+def incr(port, name, n=1):
+    """Add `n` to the named counter of `port` (no-op unless installed)."""
+    if not enabled:
+        return
+    st = _stats(port)
+    with _lock:
+        st.counters[name] = st.counters.get(name, 0) + n
+
+
+def gauge(port, name, fn, owner=None):
+    """Report `fn()` as `name` under `port` in every snapshot (no-op unless
+    installed).
+
+    With `owner`, `fn(owner)` is reported instead and only a weak reference
+    to `owner` is kept: the gauge goes away with it. Components pass
+    themselves, so a gauge doesn't keep them alive.
+    """
+    if not enabled:
+        return
+    ref = weakref.ref(owner) if owner is not None else None
+    with _lock:
+        _gauges.setdefault(port, {})[name] = (fn, ref)
+
+
+def remove_gauge(port, name):
+    """Stop reporting `name` under `port`, e.g. when a component moves to
+    another port."""
+    with _lock:
+        g = _gauges.get(port)
+        if g is not None:
+            g.pop(name, None)
+            if not g:
+                del _gauges[port]
+
+
+def reset():
+    """Zero all counters and histograms (gauges stay registered)."""
+    global _started
+    with _lock:
+        for st in _ports.values():
+            st.reset()
+        _started = time.monotonic()
+
+
+def snapshot():
+    """Current metrics as a codec/JSON-encodable dict keyed by port."""
+    with _lock:
+        ports = {}
+        for port, st in _ports.items():
+            ports[port] = {
+                "in_messages": st.in_messages,
+                "in_bytes": st.in_bytes,
+                "out_messages": st.out_messages,
+                "out_bytes": st.out_bytes,
+                "handler_errors": st.handler_errors,
+                "dropped": st.dropped,
+                "inflight": st.inflight,
+                "max_inflight": st.max_inflight,
+                "handler": st.handler.snapshot(),
+                "send": st.send.snapshot(),
+                "counters": dict(st.counters),
+            }
+        gauges = {p: dict(g) for p, g in _gauges.items()}
+    for port, g in gauges.items():
+        values = ports.setdefault(port, {}).setdefault("gauges", {})
+        for name, (fn, ref) in g.items():
+            try:
+                if ref is None:
+                    values[name] = fn()
+                    continue
+                owner = ref()
+                if owner is None:
+                    remove_gauge(port, name)
+                    continue
+                values[name] = fn(owner)
+            except Exception as e:
+                values[name] = None
+                sys.stderr.write("sp_bridge.metrics: gauge %s failed: %r\n" % (name, e))
+    return {
+        "enabled": enabled,
+        "uptime_s": time.monotonic() - _started,
+        "threads": threading.active_count(),
+        "ports": ports,
+    }
@@ -0,0 +1,265 @@
+"""Pre-warmed subinterpreters that run CPU-bound jobs on every core.
+
+Threads of one interpreter share its GIL, so the `RpcServer` thread pool and
+`worker` jobs run CPU-bound Python one at a time. A PEP 734 subinterpreter
+(Python 3.14+, `concurrent.interpreters`) has a GIL of its own.
+`InterpreterPool` creates `size` of them up front, imports `preload` modules
+in each, and runs ``module:function`` jobs on the interpreter with the fewest
+jobs queued::
+
+    from sp_bridge.pool import InterpreterPool
+
+    pool = InterpreterPool(4, preload=["numpy", "myapp.tiles"])
+    tile = pool.call("myapp.tiles:render", 3, 7)
+    futures = [pool.submit("myapp.tiles:render", x, y) for x, y in grid]
+
+Arguments and results cross interpreters by pickle, so both must be
+picklable, and each interpreter has its own copy of every module. Each
+interpreter can also get a Dart port of its own (`ports`), which its jobs
+read with `port()` to stream output to Dart with `dart_bridge.send_bytes`,
+if the native `dart_bridge` module can be imported in subinterpreters.
+
+On Android `_sp_bootstrap` installs its native-module finder in every new
+interpreter, so relocated extension modules import there too.
+`sp_bridge.worker.serve(interpreters=N)` runs a pool behind the worker's
+RPC server (`PythonWorker.callParallel` in Dart).
+
+This module is imported inside the subinterpreters as well, so it only
+imports the standard library.
+"""
+
+import importlib
+import os
+import queue
+import sys
+import threading
+import traceback
+from concurrent.futures import Future
+
+__all__ = ["InterpreterPool", "JobError", "available", "port"]
+
+# Dart port of the interpreter this module is imported in; set by the pool.
+_port = None
+
+
+def available():
+    """True if this Python can create subinterpreters (3.14+)."""
+    try:
+        from concurrent import interpreters  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def port():
+    """Dart port given to the interpreter running the current job, or None."""
+    return _port
+
+
+class JobError(Exception):
+    """A job raised in its subinterpreter. The exception itself stays there;
+    `type_name`, `message` and `traceback` describe it."""
+
+    def __init__(self, type_name, message, tb):
+        super().__init__("%s: %s" % (type_name, message))
+        self.type_name = type_name
+        self.message = message
+        self.traceback = tb
+
+
+def _resolve(target):
+    module_name, sep, attr = target.partition(":")
+    if not sep or not attr:
+        raise ValueError("target must be 'module:function', got %r" % (target,))
+    obj = importlib.import_module(module_name)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+# -- run inside the subinterpreters
+
+
+def _init(dart_port, modules):
+    global _port
+    _port = dart_port
+    for name in modules:
+        importlib.import_module(name)
+
+
+def _set_port(dart_port):
+    global _port
+    _port = dart_port
+
+
+def _run(target, args, kwargs):
+    try:
+        return True, _resolve(target)(*args, **kwargs)
+    except Exception as e:
+        tb = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+        return False, (type(e).__name__, str(e), tb)
+
+
+# -- main interpreter
+
+
+class _Slot:
+    __slots__ = ("interp", "port", "jobs", "queued", "inbox", "thread")
+
+    def __init__(self, interp, dart_port):
+        self.interp = interp
+        self.port = dart_port
+        self.jobs = 0
+        self.queued = 0
+        self.inbox = queue.SimpleQueue()
+        self.thread = None
+
+
+class InterpreterPool:
+    """Subinterpreters, each served by a thread of the creating interpreter.
+
+    :param size: number of interpreters (default: CPU count).
+    :param preload: modules imported in every interpreter before its first job.
+    :param ports: one Dart port per interpreter, returned by `port()` there.
+    """
+
+    def __init__(self, size=None, *, preload=(), ports=None):
+        try:
+            from concurrent import interpreters
+        except ImportError:
+            raise RuntimeError(
+                "subinterpreters need Python 3.14+, this is %d.%d"
+                % sys.version_info[:2]
+            ) from None
+        size = size or os.cpu_count() or 1
+        if ports is not None and len(ports) != size:
+            raise ValueError("need %d ports, got %d" % (size, len(ports)))
+        self._lock = threading.Lock()
+        self._closed = False
+        self._preload = list(preload)
+        self._slots = []
+        for i in range(size):
+            # Resolved at call time so `_sp_bootstrap`'s patched create()
+            # applies (see its `_patch_subinterpreters`).
+            interp = interpreters.create()
+            self._slots.append(_Slot(interp, ports[i] if ports else None))
+
+        # Interpreters import their preload modules in parallel.
+        ready = [Future() for _ in self._slots]
+        for slot, started in zip(self._slots, ready):
+            slot.thread = threading.Thread(
+                target=self._serve,
+                args=(slot, started),
+                name="sp_bridge_pool_%d" % slot.interp.id,
+                daemon=True,
+            )
+            slot.thread.start()
+        try:
+            for started in ready:
+                started.result()
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def size(self):
+        return len(self._slots)
+
+    def submit(self, target, /, *args, **kwargs):
+        """Queue a call to `target` ("pkg.module:function") on the least
+        loaded interpreter and return a `concurrent.futures.Future`. A failed
+        job raises `JobError` from the future."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("InterpreterPool is closed")
+            slot = min(self._slots, key=lambda s: s.queued)
+            slot.queued += 1
+        return self._enqueue(slot, target, args, kwargs)
+
+    def call(self, target, /, *args, **kwargs):
+        """Run `target` on the least loaded interpreter and return its result."""
+        return self.submit(target, *args, **kwargs).result()
+
+    def map(self, target, iterable):
+        """`target(item)` for every item, spread over the pool; results in order."""
+        return [f.result() for f in [self.submit(target, item) for item in iterable]]
+
+    def set_ports(self, ports):
+        """Give every interpreter a new Dart port — e.g. after a Dart VM
+        restart. Applied after the jobs already queued on each."""
+        if len(ports) != len(self._slots):
+            raise ValueError("need %d ports, got %d" % (len(self._slots), len(ports)))
+        for slot, dart_port in zip(self._slots, ports):
+            slot.port = dart_port
+            with self._lock:
+                slot.queued += 1
+            self._enqueue(slot, "sp_bridge.pool:_set_port", (dart_port,), {})
+
+    def status(self):
+        """Interpreter id, Dart port, queued and completed jobs per interpreter."""
+        with self._lock:
+            return [
+                {"id": s.interp.id, "port": s.port, "queued": s.queued, "jobs": s.jobs}
+                for s in self._slots
+            ]
+
+    def close(self):
+        """Finish queued jobs, then destroy the interpreters."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for slot in self._slots:
+            slot.inbox.put(None)
+        for slot in self._slots:
+            if slot.thread is not None and slot.thread is not threading.current_thread():
+                slot.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _enqueue(self, slot, target, args, kwargs):
+        future = Future()
+        slot.inbox.put((future, target, args, kwargs))
+        return future
+
+    def _serve(self, slot, started):
+        interp = slot.interp
+        try:
+            # Same import path as this interpreter — the app and site-packages
+            # entries are added at runtime and not part of the interpreter
+            # config new interpreters start from.
+            interp.exec("import sys\nsys.path[:] = %r\n" % (sys.path,))
+            interp.call(_init, slot.port, self._preload)
+        except BaseException as e:
+            started.set_exception(e)
+            interp.close()
+            return
+        started.set_result(None)
+        try:
+            while True:
+                job = slot.inbox.get()
+                if job is None:
+                    break
+                future, target, args, kwargs = job
+                try:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        ok, value = interp.call(_run, target, args, kwargs)
+                    except Exception as e:  # unpicklable arguments or result
+                        future.set_exception(e)
+                    else:
+                        if ok:
+                            future.set_result(value)
+                        else:
+                            future.set_exception(JobError(*value))
+                finally:
+                    with self._lock:
+                        slot.queued -= 1
+                        slot.jobs += 1
+        finally:
+            interp.close()
@@ -0,0 +1,326 @@
+"""Request/response RPC over a `dart_bridge` port.
+
+Counterpart of `PythonRpcClient` in `package:serious_python/bridge.dart`. Every
+frame is a `sp_bridge.codec` array whose first element is the frame kind:
+
+=============================  ==========  ====================================
+frame                          direction   meaning
+=============================  ==========  ====================================
+``[0, id, method, params]``    Dart → Py   call; params is a list (positional)
+                                           or a map (keyword arguments)
+``[1, id, result]``            Py → Dart   call returned `result`
+``[2, id, error]``             Py → Dart   call raised; error is a map with
+                                           `type`, `message`, `traceback`
+``[3, id]``                    Dart → Py   cancel call `id`
+``[4, id, pending]``           Py → Dart   rejected: `pending` calls already
+                                           in flight (back off and retry)
+``[5, topic, payload]``        Py → Dart   notification (`RpcServer.notify`)
+=============================  ==========  ====================================
+
+The `dart_bridge` handler only decodes the frame and schedules the call, so a
+slow method never holds up the others on the port. Coroutine functions run on
+the server's asyncio loop thread; plain functions run on its thread pool, or —
+for `inline=True` methods — directly on the delivering thread. At most
+`max_pending` calls are in flight per server; beyond that calls are answered
+with a busy frame instead of queueing without bound.
+
+Cancelling an async call cancels its task. A sync call that has not started is
+dropped; one that is running can poll `rpc.cancelled()` and stop early.
+Cancelled calls get no reply — the Dart side has already completed them.
+
+::
+
+    import dart_bridge
+    from sp_bridge import rpc
+
+    server = rpc.RpcServer(int(os.environ["MY_APP_RPC_PORT"]))
+
+    @server.method
+    def add(a, b):
+        return a + b
+
+    @server.method("fetch")
+    async def fetch_url(url, timeout=10):
+        ...
+
+    server.start()
+"""
+
+import asyncio
+import contextvars
+import inspect
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import dart_bridge
+
+from . import codec, metrics
+
+__all__ = ["RpcServer", "cancelled"]
+
+REQUEST = 0
+RESPONSE = 1
+ERROR = 2
+CANCEL = 3
+BUSY = 4
+NOTIFY = 5
+
+# Fewest elements a frame of each kind Python receives can have.
+_MIN_LENGTH = {REQUEST: 3, CANCEL: 2}
+
+_current_call = contextvars.ContextVar("sp_bridge_rpc_call", default=None)
+
+
+def cancelled():
+    """True if Dart cancelled the call the current thread/task is serving."""
+    call = _current_call.get()
+    return call is not None and call.cancel_event.is_set()
+
+
+class _Call:
+    __slots__ = ("id", "future", "cancel_event")
+
+    def __init__(self, call_id):
+        self.id = call_id
+        self.future = None
+        self.cancel_event = threading.Event()
+
+
+class _Method:
+    __slots__ = ("func", "is_async", "inline")
+
+    def __init__(self, func, inline):
+        self.func = func
+        self.is_async = inspect.iscoroutinefunction(func)
+        self.inline = inline and not self.is_async
+
+
+class RpcServer:
+    """Dispatches RPC frames arriving on `port` to registered methods.
+
+    :param port: Dart native port of the `PythonBridge` the client uses.
+    :param max_pending: calls in flight before new ones get a busy frame.
+    :param max_workers: thread pool size for sync methods.
+    """
+
+    def __init__(self, port, max_pending=64, max_workers=4):
+        self.port = port
+        self.max_pending = max_pending
+        self._methods = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="sp_bridge_rpc"
+        )
+        self._loop = None
+        self._loop_thread = None
+        self._started = False
+
+    # -- registration
+
+    def method(self, name=None, *, inline=False):
+        """Register a method. Usable bare (`@server.method`) or with a name
+        and options (`@server.method("name", inline=True)`). `inline` runs a
+        cheap sync method on the delivering thread, skipping the pool hop."""
+        if callable(name):
+            self.add_method(name)
+            return name
+
+        def decorator(func):
+            self.add_method(func, name, inline=inline)
+            return func
+
+        return decorator
+
+    def add_method(self, func, name=None, *, inline=False):
+        self._methods[name or func.__name__] = _Method(func, inline)
+
+    # -- lifecycle
+
+    def start(self):
+        """Register the `dart_bridge` handler for this server's port."""
+        if self._started:
+            return
+        self._started = True
+        metrics.gauge(self.port, "rpc_pending", lambda s: s.pending, self)
+        dart_bridge.set_enqueue_handler_func(self.port, self._on_frame)
+
+    def rebind(self, port):
+        """Serve a new Dart port — e.g. after a Dart VM restart, when the old
+        client is gone. Calls still in flight for the old port are cancelled
+        and get no reply."""
+        with self._lock:
+            calls = list(self._calls.values())
+            self._calls.clear()
+            old, self.port = self.port, port
+        for call in calls:
+            call.cancel_event.set()
+            if call.future is not None:
+                call.future.cancel()
+        if self._started:
+            metrics.remove_gauge(old, "rpc_pending")
+            metrics.gauge(port, "rpc_pending", lambda s: s.pending, self)
+            dart_bridge.set_enqueue_handler_func(port, self._on_frame)
+
+    @property
+    def loop(self):
+        """The asyncio loop async methods run on (started on first use)."""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    t = threading.Thread(
+                        target=loop.run_forever,
+                        name="sp_bridge_rpc_loop",
+                        daemon=True,
+                    )
+                    t.start()
+                    self._loop_thread = t
+                    self._loop = loop
+        return self._loop
+
+    @property
+    def pending(self):
+        """Number of calls in flight."""
+        return len(self._calls)
+
+    def notify(self, topic, payload=None):
+        """Push a notification to the Dart client's `notifications` stream."""
+        self._send([NOTIFY, topic, payload])
+
+    # -- dispatch
+
+    def _send(self, frame):
+        dart_bridge.send_bytes(self.port, codec.packb(frame))
+
+    def _on_frame(self, payload):
+        try:
+            frame = codec.unpackb(payload, copy=True)
+            kind = frame[0]
+            if len(frame) < _MIN_LENGTH.get(kind, 1):
+                raise IndexError("frame %r too short" % (frame,))
+            if kind == REQUEST:
+                self._on_request(frame)
+            elif kind == CANCEL:
+                self._on_cancel(frame[1])
+        except (codec.DecodeError, IndexError, TypeError, KeyError) as e:
+            sys.stderr.write("sp_bridge.rpc: dropping bad frame: %r\n" % (e,))
+            metrics.incr(self.port, "rpc_bad_frames")
+
+    def _on_request(self, frame):
+        call_id, name = frame[1], frame[2]
+        params = frame[3] if len(frame) > 3 else None
+        method = self._methods.get(name)
+        if method is None:
+            self._send_error(call_id, "NameError", "unknown method %r" % (name,))
+            return
+        if isinstance(params, dict):
+            args, kwargs = (), params
+        elif params is None or isinstance(params, list):
+            args, kwargs = tuple(params or ()), {}
+        else:
+            self._send_error(
+                call_id,
+                "TypeError",
+                "params must be a list or a map, not %s" % type(params).__name__,
+            )
+            return
+
+        if method.inline:
+            call = _Call(call_id)
+            token = _current_call.set(call)
+            try:
+                self._reply(call, method.func(*args, **kwargs))
+            except (Exception, SystemExit) as e:
+                self._reply_exc(call, e)
+            finally:
+                _current_call.reset(token)
+            return
+
+        with self._lock:
+            if len(self._calls) >= self.max_pending:
+                busy = len(self._calls)
+            else:
+                busy = None
+                call = self._calls[call_id] = _Call(call_id)
+        if busy is not None:
+            metrics.incr(self.port, "rpc_busy")
+            self._send([BUSY, call_id, busy])
+            return
+
+        if method.is_async:
+            call.future = asyncio.run_coroutine_threadsafe(
+                self._run_async(call, method.func, args, kwargs), self.loop
+            )
+        else:
+            ctx = contextvars.copy_context()
+            call.future = self._executor.submit(
+                ctx.run, self._run_sync, call, method.func, args, kwargs
+            )
+        call.future.add_done_callback(lambda _f, c=call: self._finish(c))
+
+    def _run_sync(self, call, func, args, kwargs):
+        _current_call.set(call)
+        if call.cancel_event.is_set():
+            return
+        try:
+            result = func(*args, **kwargs)
+        except (Exception, SystemExit) as e:
+            # A method calling sys.exit() still gets an answer.
+            self._reply_exc(call, e)
+        else:
+            self._reply(call, result)
+
+    async def _run_async(self, call, func, args, kwargs):
+        _current_call.set(call)
+        if call.cancel_event.is_set():
+            return
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except (Exception, SystemExit) as e:
+            self._reply_exc(call, e)
+        else:
+            self._reply(call, result)
+
+    def _reply(self, call, result):
+        if call.cancel_event.is_set():
+            return
+        try:
+            frame = codec.packb([RESPONSE, call.id, result])
+        except (TypeError, OverflowError) as e:
+            self._reply_exc(call, e)
+            return
+        dart_bridge.send_bytes(self.port, frame)
+
+    def _reply_exc(self, call, e):
+        if call.cancel_event.is_set():
+            return
+        self._send_error(
+            call.id,
+            type(e).__name__,
+            str(e),
+            "".join(traceback.format_exception(type(e), e, e.__traceback__)),
+        )
+
+    def _send_error(self, call_id, type_name, message, tb=None):
+        error = {"type": type_name, "message": message, "traceback": tb}
+        self._send([ERROR, call_id, error])
+
+    def _on_cancel(self, call_id):
+        with self._lock:
+            call = self._calls.get(call_id)
+        if call is None:
+            return
+        call.cancel_event.set()
+        if call.future is not None:
+            call.future.cancel()
+
+    def _finish(self, call):
+        with self._lock:
+            # After a rebind the id may already belong to a new call.
+            if self._calls.get(call.id) is call:
+                del self._calls[call.id]
@@ -0,0 +1,159 @@
+"""Zero-copy transfer of large Python → Dart payloads.
+
+`dart_bridge.send_bytes` copies the payload into a Dart-owned buffer. For
+multi-megabyte images or arrays, `BufferPool` avoids that: it owns one
+anonymous `mmap` split into fixed-size slots, Python writes a payload straight
+into a slot's `view`, and `send` posts only a small handle frame. Dart and
+Python share the process, so `PythonSharedBuffers` on the Dart side wraps the
+same memory in a `Uint8List` view and hands the slot back with `release()`.
+
+Slots have an explicit lifetime: `acquire()` takes a free one (blocking while
+all are out), `send()` transfers it to Dart, and it returns to the pool only
+when Dart releases it — or `discard()` if it was never sent (a `send()` that
+fails puts it back itself). A hot loop
+therefore cycles through the same memory without allocating. Dart must not
+touch a view after releasing it, and the pool must outlive every view.
+
+Handle frames are `sp_bridge.codec` arrays ``[slot, address, length, meta]``;
+release frames, Dart → Python on the same port, are ``[slot, ...]``.
+
+::
+
+    from sp_bridge.shm import BufferPool
+
+    frames = BufferPool(int(os.environ["MY_APP_FRAMES_PORT"]),
+                        slot_size=8 * 1024 * 1024, slots=3)
+
+    buf = frames.acquire()
+    n = camera.read_into(buf.view)      # fill in place
+    frames.send(buf, n, meta={"w": 1920, "h": 1080})
+"""
+
+import ctypes
+import mmap
+import sys
+import threading
+
+import dart_bridge
+
+from . import codec, metrics
+
+__all__ = ["BufferPool", "SharedBuffer"]
+
+
+class SharedBuffer:
+    """One slot of a `BufferPool`. Write the payload into `view`."""
+
+    __slots__ = ("index", "address", "view")
+
+    def __init__(self, index, address, view):
+        self.index = index
+        self.address = address
+        self.view = view
+
+    def __len__(self):
+        return len(self.view)
+
+
+class BufferPool:
+    """Fixed pool of `slots` shared buffers of `slot_size` bytes, handed to the
+    Dart `PythonSharedBuffers` listening on `port`."""
+
+    def __init__(self, port, slot_size, slots=4):
+        self.port = port
+        self.slot_size = slot_size
+        self._mm = mmap.mmap(-1, slot_size * slots)
+        base = ctypes.addressof(ctypes.c_char.from_buffer(self._mm))
+        mv = memoryview(self._mm)
+        self._buffers = [
+            SharedBuffer(
+                i, base + i * slot_size, mv[i * slot_size : (i + 1) * slot_size]
+            )
+            for i in range(slots)
+        ]
+        self._free = list(reversed(self._buffers))
+        self._sent = set()
+        self._cond = threading.Condition()
+        metrics.gauge(port, "shm_in_use", lambda s: len(s._sent), self)
+        dart_bridge.set_enqueue_handler_func(port, self._on_release)
+
+    @property
+    def available(self):
+        """Slots free to `acquire` right now."""
+        return len(self._free)
+
+    def acquire(self, timeout=None):
+        """Take a free slot, waiting up to `timeout` seconds (forever if None)
+        for Dart to release one. Raises `TimeoutError` if none frees up."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._free, timeout):
+                raise TimeoutError(
+                    "no free shared buffer after %ss (%d in use by Dart)"
+                    % (timeout, len(self._sent))
+                )
+            return self._free.pop()
+
+    def send(self, buf, length=None, meta=None):
+        """Hand the first `length` bytes of `buf` (default: all of it) to Dart,
+        with optional codec-encodable `meta`. `buf` belongs to Dart until it is
+        released there.
+
+        If the handle can't be posted — `meta` doesn't encode, or nothing is
+        listening on the port — `buf` goes back to the pool: the encoding
+        error is raised, a failed post returns False.
+        """
+        if length is None:
+            length = len(buf.view)
+        elif not 0 <= length <= len(buf.view):
+            raise ValueError(
+                "length %d outside slot of %d" % (length, len(buf.view))
+            )
+        try:
+            frame = codec.packb([buf.index, buf.address, length, meta])
+        except Exception:
+            self._put_back(buf)
+            raise
+        # Marked sent before posting: Dart may release it right away.
+        with self._cond:
+            self._sent.add(buf.index)
+        posted = False
+        try:
+            posted = dart_bridge.send_bytes(self.port, frame) is not False
+        finally:
+            if not posted:
+                with self._cond:
+                    self._sent.discard(buf.index)
+                self._put_back(buf)
+        return posted
+
+    def discard(self, buf):
+        """Return an acquired slot that was never sent."""
+        with self._cond:
+            if buf.index in self._sent:
+                raise ValueError("slot %d was sent to Dart" % buf.index)
+        self._put_back(buf)
+
+    def _put_back(self, buf):
+        with self._cond:
+            if any(b is buf for b in self._free):
+                raise ValueError("slot %d is already free" % buf.index)
+            self._free.append(buf)
+            self._cond.notify()
+
+    def _on_release(self, payload):
+        try:
+            indexes = codec.unpackb(payload)
+            if not isinstance(indexes, list) or not all(
+                isinstance(i, int) for i in indexes
+            ):
+                raise codec.DecodeError("expected a list of slots: %r" % (indexes,))
+        except codec.DecodeError as e:
+            sys.stderr.write("sp_bridge.shm: bad release frame: %r\n" % (e,))
+            metrics.incr(self.port, "shm_bad_frames")
+            return
+        with self._cond:
+            for i in indexes:
+                if i in self._sent:
+                    self._sent.discard(i)
+                    self._free.append(self._buffers[i])
+            self._cond.notify_all()
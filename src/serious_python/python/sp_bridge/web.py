@@ -0,0 +1,587 @@
+"""Serve a WSGI or ASGI app over a `dart_bridge` port.
+
+Counterpart of `PythonHttpClient` in `package:serious_python/bridge.dart`, an
+`http.Client` whose requests go to the app in-process, with no socket, HTTP
+parsing or port to collide with::
+
+    import os, threading
+    from flask import Flask
+    from sp_bridge import web
+
+    app = Flask(__name__)
+    ...
+    web.HttpServer(int(os.environ["MY_APP_HTTP_PORT"]), app).start()
+    threading.Event().wait()
+
+Flask and other WSGI apps run on the server's thread pool; FastAPI, Starlette
+and other ASGI apps run on its asyncio loop thread, after their lifespan
+startup. Which one an app is is told from its `__call__` (override with
+`interface=`). Every frame is a `sp_bridge.codec` array whose first element is
+the frame kind:
+
+===========================================  ==========  =====================
+frame                                        direction   meaning
+===========================================  ==========  =====================
+``[0, id, method, target, headers, body,     Dart → Py   request; `target` is
+more]``                                                  path and query,
+                                                         `headers` a list of
+                                                         ``[name, value]``
+``[1, id, body, more]``                      Dart → Py   more request body
+``[2, id]``                                  Dart → Py   client gone: cancel
+``[3, id, status, reason, headers, body,     Py → Dart   response, with the
+more]``                                                  first body chunk
+``[4, id, body, more]``                      Py → Dart   more response body
+``[5, id, error]``                           Py → Dart   app failed after
+                                                         responding; error is
+                                                         a map with `type`,
+                                                         `message`, `traceback`
+===========================================  ==========  =====================
+
+`more` is true while more body frames follow, so a request or response with
+its whole body in one frame — most of them — is a single frame each way, and
+a streamed response (a generator, `StreamingResponse`) reaches Dart chunk by
+chunk. A WSGI response that sets ``Content-Length`` ends with the chunk that
+completes it. An app that raises before responding gets a 500 response and
+its traceback on stderr, as under a development server.
+
+At most `max_pending` requests are in flight; beyond that requests are
+answered with 503.
+"""
+
+import asyncio
+import inspect
+import io
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+import dart_bridge
+
+from . import codec, metrics
+
+__all__ = ["HttpServer"]
+
+REQUEST = 0
+REQUEST_BODY = 1
+CANCEL = 2
+RESPONSE = 3
+RESPONSE_BODY = 4
+ERROR = 5
+
+_REASONS = {500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def _is_asgi(app):
+    return inspect.iscoroutinefunction(app) or inspect.iscoroutinefunction(
+        getattr(app, "__call__", None)
+    )
+
+
+class _Request:
+    __slots__ = (
+        "id",
+        "method",
+        "target",
+        "headers",
+        "body",
+        "more",
+        "cancel_event",
+        "future",
+        "input",
+        "inbox",
+    )
+
+    def __init__(self, frame):
+        self.id = frame[1]
+        self.method = frame[2]
+        self.target = frame[3]
+        self.headers = frame[4] or []
+        self.body = frame[5] or b""
+        self.more = frame[6]
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.input = None  # WSGI: the wsgi.input stream
+        self.inbox = None  # ASGI: queue `receive()` reads
+
+    def split_target(self):
+        path, _, query = self.target.partition("?")
+        return path, query
+
+
+class _StreamedInput(io.RawIOBase):
+    """`wsgi.input` for a request whose body arrives in several frames."""
+
+    def __init__(self, request):
+        self._chunks = [request.body] if request.body else []
+        self._done = not request.more
+        self._cond = threading.Condition()
+
+    def feed(self, chunk, more):
+        with self._cond:
+            if chunk:
+                self._chunks.append(chunk)
+            self._done = not more
+            self._cond.notify_all()
+
+    def close_input(self):
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        with self._cond:
+            while not self._chunks and not self._done:
+                self._cond.wait()
+            if not self._chunks:
+                return 0
+            chunk = self._chunks[0]
+            n = min(len(b), len(chunk))
+            b[:n] = chunk[:n]
+            if n < len(chunk):
+                self._chunks[0] = chunk[n:]
+            else:
+                self._chunks.pop(0)
+            return n
+
+
+class _Responder:
+    """Turns a response into frames: the first chunk rides on the response
+    frame, the chunk that ends the body carries ``more=False``."""
+
+    __slots__ = (
+        "server",
+        "request",
+        "status",
+        "reason",
+        "headers",
+        "length",
+        "sent",
+        "started",
+        "ended",
+    )
+
+    def __init__(self, server, request):
+        self.server = server
+        self.request = request
+        self.status = None
+        self.reason = None
+        self.headers = []
+        self.length = None
+        self.sent = 0
+        self.started = False
+        self.ended = False
+
+    def start(self, status, reason, headers):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.length = None
+        for name, value in headers:
+            if name.lower() == "content-length":
+                try:
+                    self.length = int(value)
+                except ValueError:
+                    pass
+
+    def body(self, chunk, more):
+        if self.ended or self.request.cancel_event.is_set():
+            return
+        chunk = bytes(chunk)
+        self.sent += len(chunk)
+        if self.length is not None and self.sent >= self.length:
+            more = False
+        if self.started:
+            frame = [RESPONSE_BODY, self.request.id, chunk, more]
+        else:
+            self.started = True
+            frame = [
+                RESPONSE,
+                self.request.id,
+                self.status,
+                self.reason,
+                [[n, v] for n, v in self.headers],
+                chunk,
+                more,
+            ]
+        self.ended = not more
+        self.server._send(frame)
+
+    def finish(self):
+        if not self.ended:
+            self.body(b"", False)
+
+    def fail(self, e):
+        metrics.incr(self.server.port, "http_errors")
+        tb = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+        if self.ended or self.request.cancel_event.is_set():
+            sys.stderr.write(tb)
+        elif self.started:
+            self.ended = True
+            error = {"type": type(e).__name__, "message": str(e), "traceback": tb}
+            self.server._send([ERROR, self.request.id, error])
+        else:
+            sys.stderr.write(tb)
+            self.server._send_status(self.request.id, 500)
+            self.ended = True
+
+
+class HttpServer:
+    """Serves `app` to the `PythonHttpClient` on `port`.
+
+    :param port: Dart native port of the `PythonBridge` the client uses.
+    :param app: a WSGI or ASGI application.
+    :param interface: ``"wsgi"`` or ``"asgi"``; detected from `app` if None.
+    :param root_path: mount point of the app (`SCRIPT_NAME` / `root_path`).
+    :param max_pending: requests in flight before new ones get a 503.
+    :param max_workers: thread pool size for a WSGI app.
+    """
+
+    def __init__(
+        self,
+        port,
+        app,
+        *,
+        interface=None,
+        root_path="",
+        max_pending=64,
+        max_workers=8,
+    ):
+        if interface is None:
+            interface = "asgi" if _is_asgi(app) else "wsgi"
+        if interface not in ("wsgi", "asgi"):
+            raise ValueError(
+                "interface must be 'wsgi' or 'asgi', got %r" % (interface,)
+            )
+        self.port = port
+        self.app = app
+        self.interface = interface
+        self.root_path = root_path
+        self.max_pending = max_pending
+        self._requests = {}
+        self._lock = threading.Lock()
+        self._executor = (
+            ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="sp_bridge_web"
+            )
+            if interface == "wsgi"
+            else None
+        )
+        self._loop = None
+        self._started = False
+        # (inbox, state, task) of the running ASGI lifespan, and the future
+        # its shutdown completes.
+        self._lifespan = None
+        self._lifespan_done = None
+
+    # -- lifecycle
+
+    def start(self):
+        """Run the ASGI lifespan startup, if any, then register the
+        `dart_bridge` handler for this server's port."""
+        if self._started:
+            return
+        self._started = True
+        if self.interface == "asgi":
+            asyncio.run_coroutine_threadsafe(
+                self._start_lifespan(), self.loop
+            ).result()
+        metrics.gauge(self.port, "http_pending", lambda s: s.pending, self)
+        dart_bridge.set_enqueue_handler_func(self.port, self._on_frame)
+
+    def rebind(self, port):
+        """Serve a new Dart port — e.g. after a Dart VM restart. Requests in
+        flight for the old port are cancelled."""
+        with self._lock:
+            requests = list(self._requests.values())
+            self._requests.clear()
+            old, self.port = self.port, port
+        for request in requests:
+            self._cancel(request)
+        if self._started:
+            metrics.remove_gauge(old, "http_pending")
+            metrics.gauge(port, "http_pending", lambda s: s.pending, self)
+            dart_bridge.set_enqueue_handler_func(port, self._on_frame)
+
+    def close(self, timeout=10):
+        """Run the ASGI lifespan shutdown, if any. The port stays bound."""
+        if self._lifespan is not None:
+            asyncio.run_coroutine_threadsafe(
+                self._stop_lifespan(), self.loop
+            ).result(timeout)
+
+    @property
+    def loop(self):
+        """The asyncio loop an ASGI app runs on (started on first use)."""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(
+                        target=loop.run_forever,
+                        name="sp_bridge_web_loop",
+                        daemon=True,
+                    ).start()
+                    self._loop = loop
+        return self._loop
+
+    @property
+    def pending(self):
+        """Number of requests in flight."""
+        return len(self._requests)
+
+    # -- dispatch
+
+    def _send(self, frame):
+        dart_bridge.send_bytes(self.port, codec.packb(frame))
+
+    def _send_status(self, request_id, status):
+        reason = _REASONS[status]
+        headers = [["content-type", "text/plain; charset=utf-8"]]
+        self._send(
+            [RESPONSE, request_id, status, reason, headers, reason.encode(), False]
+        )
+
+    def _on_frame(self, payload):
+        try:
+            frame = codec.unpackb(payload, copy=True)
+            kind = frame[0]
+            if kind == REQUEST:
+                self._on_request(_Request(frame))
+            elif kind == REQUEST_BODY:
+                self._on_body(frame[1], frame[2] or b"", frame[3])
+            elif kind == CANCEL:
+                with self._lock:
+                    request = self._requests.pop(frame[1], None)
+                if request is not None:
+                    self._cancel(request)
+        except (codec.DecodeError, IndexError, TypeError, KeyError) as e:
+            sys.stderr.write("sp_bridge.web: dropping bad frame: %r\n" % (e,))
+            metrics.incr(self.port, "http_bad_frames")
+
+    def _on_request(self, request):
+        with self._lock:
+            busy = len(self._requests) >= self.max_pending
+            if not busy:
+                self._requests[request.id] = request
+        if busy:
+            metrics.incr(self.port, "http_busy")
+            self._send_status(request.id, 503)
+            return
+        metrics.incr(self.port, "http_requests")
+        if self.interface == "wsgi":
+            request.input = (
+                io.BufferedReader(_StreamedInput(request))
+                if request.more
+                else io.BytesIO(request.body)
+            )
+            request.future = self._executor.submit(self._run_wsgi, request)
+        else:
+            request.inbox = asyncio.Queue()
+            message = {
+                "type": "http.request",
+                "body": request.body,
+                "more_body": request.more,
+            }
+            self._deliver(request, message)
+            request.future = asyncio.run_coroutine_threadsafe(
+                self._run_asgi(request), self.loop
+            )
+        request.future.add_done_callback(lambda _f, r=request: self._finish(r))
+
+    def _on_body(self, request_id, chunk, more):
+        with self._lock:
+            request = self._requests.get(request_id)
+        if request is None:
+            return
+        if request.inbox is not None:
+            self._deliver(
+                request, {"type": "http.request", "body": chunk, "more_body": more}
+            )
+        elif isinstance(request.input, io.BufferedReader):
+            request.input.raw.feed(chunk, more)
+
+    def _deliver(self, request, message):
+        self.loop.call_soon_threadsafe(request.inbox.put_nowait, message)
+
+    def _cancel(self, request):
+        request.cancel_event.set()
+        if request.inbox is not None:
+            self._deliver(request, {"type": "http.disconnect"})
+        elif isinstance(request.input, io.BufferedReader):
+            request.input.raw.close_input()
+        if request.future is not None:
+            request.future.cancel()
+
+    def _finish(self, request):
+        with self._lock:
+            # After a rebind the id may already belong to a new request.
+            if self._requests.get(request.id) is request:
+                del self._requests[request.id]
+
+    # -- WSGI
+
+    def _environ(self, request):
+        path, query = request.split_target()
+        environ = {
+            "REQUEST_METHOD": request.method,
+            "SCRIPT_NAME": self.root_path,
+            "PATH_INFO": unquote(path, "latin-1"),
+            "QUERY_STRING": query,
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "REMOTE_ADDR": "127.0.0.1",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": request.input,
+            # `_StreamedInput` ends with EOF, so a body without a
+            # Content-Length (a streamed request) can be read to the end.
+            "wsgi.input_terminated": True,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in request.headers:
+            key = name.upper().replace("-", "_")
+            if key == "HOST":
+                environ["SERVER_NAME"] = value.rpartition(":")[0] or value
+            if key in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                environ[key] = value
+                continue
+            key = "HTTP_" + key
+            environ[key] = environ[key] + "," + value if key in environ else value
+        return environ
+
+    def _run_wsgi(self, request):
+        responder = _Responder(self, request)
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None:
+                try:
+                    if responder.started:
+                        raise exc_info[1].with_traceback(exc_info[2])
+                finally:
+                    exc_info = None
+            code, _, reason = status.partition(" ")
+            responder.start(int(code), reason or None, headers)
+            return lambda data: responder.body(data, True)
+
+        try:
+            result = self.app(self._environ(request), start_response)
+            try:
+                for chunk in result:
+                    if request.cancel_event.is_set():
+                        break
+                    if chunk:
+                        responder.body(chunk, True)
+                responder.finish()
+            finally:
+                close = getattr(result, "close", None)
+                if close is not None:
+                    close()
+        except Exception as e:
+            responder.fail(e)
+
+    # -- ASGI
+
+    def _scope(self, request):
+        path, query = request.split_target()
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": "1.1",
+            "method": request.method,
+            "scheme": "http",
+            "path": unquote(path),
+            "raw_path": path.encode("latin-1"),
+            "query_string": query.encode("latin-1"),
+            "root_path": self.root_path,
+            "headers": [
+                (n.lower().encode("latin-1"), v.encode("latin-1"))
+                for n, v in request.headers
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("localhost", 80),
+            "state": dict(self._lifespan[1]) if self._lifespan else {},
+        }
+
+    async def _run_asgi(self, request):
+        responder = _Responder(self, request)
+
+        async def send(message):
+            kind = message["type"]
+            if kind == "http.response.start":
+                responder.start(
+                    message["status"],
+                    None,
+                    [
+                        (n.decode("latin-1"), v.decode("latin-1"))
+                        for n, v in message.get("headers", ())
+                    ],
+                )
+            elif kind == "http.response.body":
+                more = message.get("more_body", False)
+                responder.body(message.get("body", b""), more)
+                if not more:
+                    # Response done: what `receive()` reports from now on.
+                    request.inbox.put_nowait({"type": "http.disconnect"})
+
+        try:
+            await self.app(self._scope(request), request.inbox.get, send)
+            if responder.status is not None:
+                responder.finish()
+            elif not request.cancel_event.is_set():
+                raise RuntimeError("ASGI app returned without a response")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            responder.fail(e)
+
+    async def _start_lifespan(self):
+        inbox = asyncio.Queue()
+        state = {}
+        started = asyncio.get_running_loop().create_future()
+
+        async def send(message):
+            kind = message["type"]
+            if kind == "lifespan.startup.complete" and not started.done():
+                started.set_result(True)
+            elif kind == "lifespan.startup.failed" and not started.done():
+                started.set_exception(RuntimeError(message.get("message", "")))
+            elif kind.startswith("lifespan.shutdown.") and self._lifespan_done:
+                if not self._lifespan_done.done():
+                    self._lifespan_done.set_result(None)
+
+        async def run():
+            try:
+                await self.app(
+                    {"type": "lifespan", "asgi": {"version": "3.0"}, "state": state},
+                    inbox.get,
+                    send,
+                )
+            except BaseException:
+                if not started.done():
+                    # No lifespan support: serve without it.
+                    started.set_result(False)
+                    return
+                raise
+
+        task = asyncio.ensure_future(run())
+        inbox.put_nowait({"type": "lifespan.startup"})
+        if await started:
+            self._lifespan = (inbox, state, task)
+
+    async def _stop_lifespan(self):
+        inbox, _state, task = self._lifespan
+        self._lifespan = None
+        self._lifespan_done = asyncio.get_running_loop().create_future()
+        inbox.put_nowait({"type": "lifespan.shutdown"})
+        await asyncio.wait(
+            [self._lifespan_done, task], return_when=asyncio.FIRST_COMPLETED
+        )
@@ -0,0 +1,230 @@
+"""Resident job server: keep one warm interpreter and run jobs in it.
+
+A normal serious_python app re-runs `main.py` to do anything. A worker app's
+`main.py` instead imports what it needs once and hands control to
+`serve()`, which answers `PythonWorker` jobs from Dart — calls to
+``module:function`` targets, source snippets, script files — inside the
+same interpreter, so every module already in `sys.modules` stays imported
+between jobs::
+
+    import numpy, pandas            # paid once per process
+    from sp_bridge import worker
+
+    worker.serve()                  # blocks; jobs arrive from Dart
+
+The Dart side passes its port in `SERIOUS_PYTHON_WORKER_PORT`. After a Dart
+VM restart (hot restart, or Android reusing the process) the interpreter is
+still up, so `PythonWorker.start` does not run the program again: it calls
+`DartBridge.signalDartSession({"sp_worker": port})` and the session-restart
+handler registered here moves the server to the new port. Jobs still running
+for the old session are cancelled.
+
+Jobs run on the `sp_bridge.rpc.RpcServer` thread pool; coroutine functions
+and coroutines returned by a target run on its asyncio loop. A job can poll
+`sp_bridge.rpc.cancelled()` to stop early.
+
+Those jobs share one GIL. With `interpreters=N` (Dart passes it in
+`SERIOUS_PYTHON_WORKER_INTERPRETERS`) the worker also starts an
+`sp_bridge.pool.InterpreterPool` of N subinterpreters, which import the same
+preload modules and run `PythonWorker.callParallel` jobs in parallel, each
+with its own Dart port from `SERIOUS_PYTHON_WORKER_POOL_PORTS`.
+"""
+
+import asyncio
+import importlib
+import inspect
+import os
+import runpy
+import sys
+import threading
+import time
+
+import dart_bridge
+
+from . import rpc
+from .pool import InterpreterPool
+
+__all__ = ["SESSION_LABEL", "pool", "serve", "server"]
+
+SESSION_LABEL = "sp_worker"
+_PORT_ENV = "SERIOUS_PYTHON_WORKER_PORT"
+_PRELOAD_ENV = "SERIOUS_PYTHON_WORKER_PRELOAD"
+_INTERPRETERS_ENV = "SERIOUS_PYTHON_WORKER_INTERPRETERS"
+_POOL_PORTS_ENV = "SERIOUS_PYTHON_WORKER_POOL_PORTS"
+
+server = None
+pool = None
+_started = time.monotonic()
+_jobs = 0
+_jobs_lock = threading.Lock()
+_namespaces = {}
+# `sys.argv` is process-wide: scripts run one at a time.
+_script_lock = threading.Lock()
+
+
+def _resolve(target):
+    module_name, sep, attr = target.partition(":")
+    if not sep or not attr:
+        raise ValueError("target must be 'module:function', got %r" % (target,))
+    obj = importlib.import_module(module_name)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _await(result):
+    if inspect.isawaitable(result):
+        if not inspect.iscoroutine(result):
+            # Futures and other awaitables: run_coroutine_threadsafe only
+            # takes coroutines.
+            result = _wrap(result)
+        return asyncio.run_coroutine_threadsafe(result, server.loop).result()
+    return result
+
+
+async def _wrap(awaitable):
+    return await awaitable
+
+
+def _count():
+    global _jobs
+    with _jobs_lock:
+        _jobs += 1
+
+
+def _namespace(name, filename):
+    if name is None:
+        return {"__name__": "__sp_job__", "__file__": filename}
+    ns = _namespaces.get(name)
+    if ns is None:
+        ns = _namespaces[name] = {"__name__": "__sp_job__", "__file__": filename}
+    return ns
+
+
+def call(target, args=None, kwargs=None):
+    """Import `target` ("pkg.module:function") and call it."""
+    _count()
+    return _await(_resolve(target)(*(args or ()), **(kwargs or {})))
+
+
+def run_source(source, namespace=None, filename="<job>"):
+    """Exec `source` and return its `result` variable. Jobs with the same
+    `namespace` name share globals; without one each job starts clean."""
+    _count()
+    ns = _namespace(namespace, filename)
+    exec(compile(source, filename, "exec"), ns)
+    return _await(ns.get("result"))
+
+
+def run_script(path, args=None):
+    """Run a script file as `__main__` with `sys.argv` = [path, *args] and
+    return its `result` variable. Script jobs wait for each other; other
+    jobs keep running alongside."""
+    _count()
+    with _script_lock:
+        argv = sys.argv
+        sys.argv = [path, *(args or ())]
+        try:
+            ns = runpy.run_path(path, run_name="__main__")
+        finally:
+            sys.argv = argv
+    return _await(ns.get("result"))
+
+
+async def pool_call(target, args=None, kwargs=None):
+    """Run `target` on the least loaded interpreter of the pool."""
+    if pool is None:
+        raise RuntimeError("worker was started without interpreters")
+    _count()
+    future = pool.submit(target, *(args or ()), **(kwargs or {}))
+    return await asyncio.wrap_future(future)
+
+
+def preload(modules):
+    """Import `modules` now; returns seconds spent per module."""
+    times = {}
+    for name in modules:
+        t0 = time.perf_counter()
+        importlib.import_module(name)
+        times[name] = time.perf_counter() - t0
+    return times
+
+
+def drop_namespace(name):
+    """Forget a namespace created by `run_source`."""
+    return _namespaces.pop(name, None) is not None
+
+
+def status():
+    return {
+        "pid": os.getpid(),
+        "uptime_s": time.monotonic() - _started,
+        "jobs": _jobs,
+        "pending": server.pending,
+        "modules": len(sys.modules),
+        "namespaces": sorted(_namespaces),
+        "interpreters": pool.status() if pool is not None else [],
+    }
+
+
+def _pool_label(i):
+    return "%s_pool_%d" % (SESSION_LABEL, i)
+
+
+def _on_session_restart(ports):
+    port = ports.get(SESSION_LABEL)
+    if port is not None and server is not None:
+        server.rebind(port)
+    if pool is not None:
+        pool_ports = [ports.get(_pool_label(i)) for i in range(pool.size)]
+        if None not in pool_ports:
+            pool.set_ports(pool_ports)
+
+
+def serve(
+    port=None, *, preload_modules=(), max_workers=4, interpreters=None, block=True
+):
+    """Start the job server on `port` (default: `SERIOUS_PYTHON_WORKER_PORT`)
+    after importing `preload_modules` and any modules listed, comma-separated,
+    in `SERIOUS_PYTHON_WORKER_PRELOAD`. `interpreters` (default:
+    `SERIOUS_PYTHON_WORKER_INTERPRETERS`, else none) starts a subinterpreter
+    pool that imports the same modules. With `block` (the default) this never
+    returns, keeping the interpreter resident."""
+    global server, pool
+    if port is None:
+        port = int(os.environ[_PORT_ENV])
+    names = list(preload_modules)
+    names += [m.strip() for m in os.environ.get(_PRELOAD_ENV, "").split(",")]
+    names = [m for m in names if m]
+    preload(names)
+    if interpreters is None:
+        interpreters = int(os.environ.get(_INTERPRETERS_ENV) or 0)
+    if interpreters and pool is None:
+        pool_ports = os.environ.get(_POOL_PORTS_ENV)
+        pool = InterpreterPool(
+            interpreters,
+            preload=names,
+            ports=[int(p) for p in pool_ports.split(",")] if pool_ports else None,
+        )
+
+    if server is None:
+        server = rpc.RpcServer(port, max_workers=max_workers)
+        server.add_method(call)
+        server.add_method(pool_call)
+        server.add_method(run_source)
+        server.add_method(run_script)
+        server.add_method(preload)
+        server.add_method(drop_namespace, inline=True)
+        server.add_method(status, inline=True)
+        # dart_bridge < 1.3.0 has no session hooks; a Dart restart then
+        # re-runs the program as before.
+        add_handler = getattr(dart_bridge, "add_session_restart_handler", None)
+        if add_handler is not None:
+            add_handler(_on_session_restart)
+        server.start()
+    elif server.port != port:
+        server.rebind(port)
+
+    if block:
+        threading.Event().wait()
+    return server
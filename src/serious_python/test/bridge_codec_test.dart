@@ -0,0 +1,78 @@
+import 'dart:typed_data';
+
+import 'package:flutter_test/flutter_test.dart';
+import 'package:serious_python/bridge.dart';
+
+Uint8List _hex(String s) => Uint8List.fromList([
+      for (var i = 0; i < s.length; i += 2)
+        int.parse(s.substring(i, i + 2), radix: 16)
+    ]);
+
+void main() {
+  // Fixtures produced by Python's `sp_bridge.codec.packb`.
+  test("decode Python frames", () {
+    final msg = BridgeCodec.decode(_hex(
+        "83a26f70a178a16e9701ffcd012cd1fed4cb3ff8000000000000c0c3a162c4020102"));
+    expect(msg, {
+      "op": "x",
+      "n": [1, -1, 300, -300, 1.5, null, true],
+      "b": Uint8List.fromList([1, 2]),
+    });
+    expect(BridgeCodec.decode(_hex("d70401000000feffffff")),
+        isA<Int32List>().having((l) => l.toList(), "values", [1, -2]));
+    expect(BridgeCodec.decode(_hex("d709000000000000e03f")),
+        isA<Float64List>().having((l) => l.toList(), "values", [0.5]));
+  });
+
+  test("encode matches Python", () {
+    expect(BridgeCodec.encode(Int32List.fromList([1, -2])),
+        _hex("d70401000000feffffff"));
+    expect(BridgeCodec.encode(Float64List.fromList([0.5])),
+        _hex("d709000000000000e03f"));
+  });
+
+  test("round trip", () {
+    final values = <Object?>[
+      null,
+      false,
+      0,
+      127,
+      128,
+      -32,
+      -33,
+      65536,
+      1 << 40,
+      -(1 << 40),
+      3.25,
+      "",
+      "é" * 40,
+      "x" * 70000,
+      Uint8List(300),
+      List<int>.generate(20, (i) => i),
+      {"nested": {"list": [1, "a", null]}},
+    ];
+    for (final v in values) {
+      expect(BridgeCodec.decode(BridgeCodec.encode(v)), v);
+    }
+    final f32 = Float32List.fromList([1.5, -2.5, 3.0]);
+    expect(BridgeCodec.decode(BridgeCodec.encode(f32)), f32);
+    final u64 = Uint64List.fromList([1, 2, 3]);
+    final decoded = BridgeCodec.decode(BridgeCodec.encode({"a": u64})) as Map;
+    expect(decoded["a"], u64);
+  });
+
+  test("unaligned typed payload is copied", () {
+    // "a" str prefix shifts the ext payload to an odd offset.
+    final frame = BridgeCodec.encode(["a", Float64List.fromList([1.0, 2.0])]);
+    final list = BridgeCodec.decode(frame) as List;
+    expect(list[1], isA<Float64List>());
+    expect((list[1] as Float64List).toList(), [1.0, 2.0]);
+  });
+
+  test("malformed input", () {
+    expect(() => BridgeCodec.decode(_hex("c1")), throwsFormatException);
+    expect(() => BridgeCodec.decode(_hex("9201")), throwsFormatException);
+    expect(() => BridgeCodec.decode(_hex("0102")), throwsFormatException);
+    expect(() => BridgeCodec.encode(Object()), throwsArgumentError);
+  });
+}
@@ -0,0 +1,52 @@
+import 'dart:io';
+
+import 'package:flutter_test/flutter_test.dart';
+import 'package:path/path.dart' as path;
+
+import '../bin/treeshake.dart';
+
+// Runs the shaker with the host Python; skipped where there is none.
+String? _python() {
+  for (final exe in ["python3", "python"]) {
+    try {
+      final r = Process.runSync(exe, ["--version"]);
+      if (r.exitCode == 0) return exe;
+    } on ProcessException {
+      // not on PATH
+    }
+  }
+  return null;
+}
+
+void main() {
+  final python = _python();
+
+  test("keep modules C code imports at runtime", () async {
+    final dir = await Directory.systemTemp.createTemp("sp_treeshake_test");
+    try {
+      final app = await Directory(path.join(dir.path, "app")).create();
+      await File(path.join(app.path, "main.py")).writeAsString(
+          "import socket\nsocket.getaddrinfo('example.com', 80)\n");
+      final script = File(path.join(dir.path, "treeshake.py"));
+      await script.writeAsString(treeShakePy);
+      final out = path.join(dir.path, "drop.txt");
+
+      final result = await Process.run(
+          python!, [script.path, "--app", app.path, "--out", out]);
+      expect(result.exitCode, 0, reason: "${result.stderr}");
+
+      final drop = (await File(out).readAsLines()).skip(1).toSet();
+      expect(drop, isNot(contains("socket")));
+      // `socket.getaddrinfo` encodes hostnames with `encodings.idna`.
+      expect(drop, isNot(contains("encodings")));
+      expect(drop, isNot(contains("stringprep")));
+      expect(drop, isNot(contains("unicodedata")));
+      // `time.strptime` imports it from C.
+      expect(drop, isNot(contains("_strptime")));
+      // Something is still shaken.
+      expect(drop, contains("doctest"));
+    } finally {
+      await dir.delete(recursive: true);
+    }
+  }, skip: python == null ? "no host Python" : false);
+}
@@ -2,6 +2,7 @@ import com.android.build.gradle.LibraryExtension
 import de.undercouch.gradle.tasks.download.Download
 import org.gradle.api.InvalidUserDataException
 import java.io.File
+import java.security.MessageDigest
 import java.util.Properties
 import java.util.zip.CRC32
 import java.util.zip.ZipEntry
@@ -90,7 +91,8 @@ configure<LibraryExtension> {
     // fake-.so-zip scheme.)
 
     // Keep the stdlib/sitepackages/extract zips stored (uncompressed) in the APK so
-    // zipimport can read members without zlib.
+    // zipimport can read members without zlib, and `_sp_bootstrap` can read
+    // stdlib.zip / sitepackages.zip in place from the APK.
     androidResources {
         noCompress.add("zip")
     }
@@ -150,6 +152,8 @@ val primaryAbi = abis.firstOrNull { siteSrcDir != null && File(siteSrcDir, it).i
     }
 val assetsDir = file("src/main/assets")
 val bootstrapPy = file("../python/_sp_bootstrap.py")
+val importTracePy = file("../python/_sp_importtrace.py")   // opt-in, see _sp_bootstrap.install
+val lazyImportPy = file("../python/_sp_lazyimport.py")     // opt-in, see _sp_bootstrap.install
 
 val extTag = Regex("""\.(cpython-[^/]+|abi3)\.so$""")   // tagged extension module
 fun isExtModule(name: String) = extTag.containsMatchIn(name)
@@ -164,10 +168,30 @@ fun isAllowlisted(rel: String): Boolean =
     extractPlain.any { rel == it || rel.startsWith("$it/") } ||
     (extractGlobs.isNotEmpty() && extractGlobs.any { it.matches(rel.substringBefore('/')) })
 
+// Opt-in tree shaking (`serious_python:main package --tree-shake`): the package
+// command lists the top-level modules the app can't import in `.sp_treeshake`
+// at the root of SERIOUS_PYTHON_SITE_PACKAGES. Their files are left out of the
+// zips, and their extension modules out of jniLibs (so no .so/.soref pair is
+// written for them). Keep the name and header in sync with `treeShakeFile` in
+// serious_python's bin/package_command.dart.
+val treeShakeFile: File? = siteSrcDir?.let { File(it, ".sp_treeshake") }?.takeIf { it.isFile }
+val treeShakeDrop: Set<String> = treeShakeFile?.readLines()?.let { lines ->
+    if (lines.firstOrNull() != "sp-treeshake/1")
+        throw GradleException("serious_python: unsupported tree-shake list $treeShakeFile")
+    lines.drop(1).map { it.trim() }.filter { it.isNotEmpty() }.toSet()
+} ?: emptySet()
+fun topLevelModule(rel: String): String =
+    if ('/' in rel) rel.substringBefore('/')
+    else rel.replace(extTag, "").removeSuffix(".pyc").removeSuffix(".py")
+fun isShaken(rel: String): Boolean =
+    treeShakeDrop.isNotEmpty() && topLevelModule(rel) in treeShakeDrop
+
 // Minimal STORED (uncompressed) zip so members stay readable via zipimport.get_data
 // with no zlib at runtime.
 class StoredZip(val out: ZipOutputStream) {
     private val names = mutableSetOf<String>()
+    private val sorefs = sortedMapOf<String, String>()   // marker path -> lib name
+    private val digests = sortedMapOf<String, String>()  // member -> sha256 hex
     fun add(name: String, data: ByteArray) {
         val e = ZipEntry(name).apply {
             method = ZipEntry.STORED
@@ -177,6 +201,28 @@ class StoredZip(val out: ZipOutputStream) {
         }
         out.putNextEntry(e); out.write(data); out.closeEntry()
         names.add(name)
+        if (name.endsWith(".soref")) sorefs[name] = String(data, Charsets.UTF_8)
+        digests[name] = MessageDigest.getInstance("SHA-256").digest(data)
+            .joinToString("") { "%02x".format(it) }
+    }
+    // Per-archive index of every `.soref` marker, read once by `_sp_bootstrap` at
+    // install() so the finder answers with a dict lookup instead of probing each
+    // sys.path entry per import. A header line `<magic>\t<count>`, then one
+    // `<dotted>\t<lib>\t<is_package>` line per marker (`apsw/__init__.soref`
+    // indexes as the package `apsw`, flag 1). The count lets the finder spot an
+    // index that no longer matches the archive and fall back to probing. Keep the
+    // member name and magic in sync with `_INDEX_MEMBER` / `_INDEX_MAGIC` in
+    // python/_sp_bootstrap.py. Call before close(), after every marker is added.
+    fun writeSorefIndex() {
+        val sb = StringBuilder("sp-soref-index/1\t${sorefs.size}\n")
+        for ((marker, lib) in sorefs) {
+            val isPkg = marker.endsWith("/__init__.soref")
+            val dotted = (if (isPkg) marker.removeSuffix("/__init__.soref")
+                          else marker.removeSuffix(".soref")).replace('/', '.')
+            sb.append(dotted).append('\t').append(lib).append('\t')
+                .append(if (isPkg) '1' else '0').append('\n')
+        }
+        add(".soref_index", sb.toString().toByteArray(Charsets.UTF_8))
     }
     // zipimport cannot import PEP 420 namespace packages — package directories
     // with no __init__.py (e.g. flask's `flask/sansio/`). On a real filesystem
@@ -202,6 +248,17 @@ class StoredZip(val out: ZipOutputStream) {
             add("$d/__init__.py", ByteArray(0))
         }
     }
+    // Content manifest of an archive the plugin unpacks to disk (app.zip,
+    // extract.zip): a `sp-manifest/1` header, then one `<sha256>\t<member>` line
+    // per member. On an app update AndroidPlugin.syncAsset diffs it against the
+    // copy kept next to the unpacked files and rewrites only added/changed
+    // members, deleting removed ones. Keep the member name and magic in sync with
+    // MANIFEST / MANIFEST_MAGIC in AndroidPlugin.java. Call last, before close().
+    fun writeContentManifest() {
+        val sb = StringBuilder("sp-manifest/1\n")
+        for ((member, digest) in digests) sb.append(digest).append('\t').append(member).append('\n')
+        add(".sp_manifest", sb.toString().toByteArray(Charsets.UTF_8))
+    }
     fun close() = out.close()
 }
 fun storedZip(f: File): StoredZip {
@@ -287,6 +344,12 @@ for (abi in abis) {
         doLast {
             if (!bundleFile.exists()) throw GradleException("libpythonbundle.so missing in jniLibs/$abi")
             val zip = if (isPrimary) storedZip(File(assetsDir, "stdlib.zip")) else null
+            // stdlib.zip and sitepackages.zip are imported in place from the APK
+            // once `_sp_bootstrap` is installed; what the interpreter imports
+            // before that (`encodings`, the bootstrap itself) also ships in
+            // boot.zip, the one zip still copied to disk.
+            val boot = if (isPrimary) storedZip(File(assetsDir, "boot.zip")) else null
+            var shaken = 0
             ZipFile(bundleFile).use { zf ->
                 val en = zf.entries()
                 while (en.hasMoreElements()) {
@@ -294,6 +357,10 @@ for (abi in abis) {
                     if (e.isDirectory) continue
                     val data = zf.getInputStream(e).readBytes()
                     val name = e.name
+                    if (isShaken(name.removePrefix("modules/").removePrefix("stdlib/"))) {
+                        shaken++
+                        continue
+                    }
                     when {
                         name.startsWith("modules/") -> {
                             val rel = name.removePrefix("modules/")     // top-level module file
@@ -307,7 +374,11 @@ for (abi in abis) {
                                 else -> zip?.add(rel, data)
                             }
                         }
-                        name.startsWith("stdlib/") -> zip?.add(name.removePrefix("stdlib/"), data)
+                        name.startsWith("stdlib/") -> {
+                            val rel = name.removePrefix("stdlib/")
+                            zip?.add(rel, data)
+                            if (rel.startsWith("encodings/")) boot?.add(rel, data)
+                        }
                         else -> zip?.add(name, data)
                     }
                 }
@@ -346,11 +417,19 @@ for (abi in abis) {
                 }
             }
             zip?.add("_sp_bootstrap.py", bootstrapPy.readBytes())   // finder at zip root
+            zip?.add("_sp_importtrace.py", importTracePy.readBytes())
+            zip?.add("_sp_lazyimport.py", lazyImportPy.readBytes())
+            boot?.add("_sp_bootstrap.py", bootstrapPy.readBytes())
+            boot?.add("_sp_importtrace.py", importTracePy.readBytes())
+            boot?.add("_sp_lazyimport.py", lazyImportPy.readBytes())
+            boot?.close()
+            zip?.writeSorefIndex()
             // The dart-bridge Android shim (F) installs the finder before `site`. A
             // sitecustomize fallback can be re-enabled for bridges without that shim:
             //   zip?.add("sitecustomize.py", "import _sp_bootstrap\n_sp_bootstrap.install()\n".toByteArray())
             zip?.synthesizePackageInits()
             zip?.close()
+            if (shaken > 0) logger.lifecycle("serious_python: tree shaking left out $shaken stdlib file(s) for $abi")
             bundleFile.delete()                                     // fake-zip must not ship
         }
     }
@@ -367,9 +446,14 @@ for (abi in abis) {
             jniDir.mkdirs()
             val siteZip = if (isPrimary) storedZip(File(assetsDir, "sitepackages.zip")) else null
             val extractZip = if (isPrimary) storedZip(File(assetsDir, "extract.zip")) else null
+            var shaken = 0
             abiSiteDir.walkTopDown().filter { it.isFile }.forEach { f ->
                 val rel = f.relativeTo(abiSiteDir).path.replace(File.separatorChar, '/')
                 if (rel == "opt" || rel.startsWith("opt/")) return@forEach        // dep libs -> copyOpt
+                if (isShaken(rel)) {
+                    shaken++
+                    return@forEach
+                }
                 val zip = if (isAllowlisted(rel)) extractZip else siteZip
                 when {
                     isExtModule(rel) -> {
@@ -382,8 +466,12 @@ for (abi in abis) {
                 }
             }
             siteZip?.synthesizePackageInits()
+            siteZip?.writeSorefIndex()
             siteZip?.close()
+            extractZip?.writeSorefIndex()
+            extractZip?.writeContentManifest()
             extractZip?.close()
+            if (shaken > 0) logger.lifecycle("serious_python: tree shaking left out $shaken site-packages file(s) for $abi")
         }
     }
 
@@ -437,6 +525,7 @@ tasks.register("packageApp") {
             val rel = f.relativeTo(appDir).path.replace(File.separatorChar, '/')
             zip.add(rel, f.readBytes())
         }
+        zip.writeContentManifest()
         zip.close()
     }
 }
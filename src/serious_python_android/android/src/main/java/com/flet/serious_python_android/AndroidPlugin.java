@@ -1,7 +1,9 @@
 package com.flet.serious_python_android;
 import java.lang.*;
+import android.content.ComponentCallbacks2;
 import android.content.Context;
 import android.content.ContextWrapper;
+import android.content.res.Configuration;
 import androidx.annotation.NonNull;
 import android.system.Os;
 import android.content.Intent;
@@ -25,7 +27,9 @@ import com.flet.serious_python_android.PythonActivity;
  * Thin Flutter plugin: surfaces nativeLibraryDir and app version to Dart and
  * exposes a few process-wide env vars Python code may read. All Python
  * lifecycle now lives in libdart_bridge.so (downloaded from
- * flet-dev/dart-bridge), invoked from Dart via FFI.
+ * flet-dev/dart-bridge), invoked from Dart via FFI. Memory pressure the app
+ * is told about (onTrimMemory / onLowMemory) is passed on to Dart as
+ * "onTrimMemory" calls, for PythonMemory to trim the interpreter.
  */
 public class AndroidPlugin implements FlutterPlugin, MethodCallHandler, ActivityAware {
 
@@ -44,6 +48,24 @@ public class AndroidPlugin implements FlutterPlugin, MethodCallHandler, Activity
   private final ExecutorService ioExecutor = Executors.newSingleThreadExecutor();
   private final Handler mainHandler = new Handler(Looper.getMainLooper());
 
+  // Registered on the application context, so trims arrive whether or not an
+  // activity is attached (TRIM_MEMORY_BACKGROUND and up come while none is).
+  // Android calls these on the main thread, where the channel must be used.
+  private final ComponentCallbacks2 memoryCallbacks = new ComponentCallbacks2() {
+    @Override
+    public void onTrimMemory(int level) {
+      if (channel != null) channel.invokeMethod("onTrimMemory", level);
+    }
+
+    @Override
+    public void onLowMemory() {
+      onTrimMemory(ComponentCallbacks2.TRIM_MEMORY_COMPLETE);
+    }
+
+    @Override
+    public void onConfigurationChanged(@NonNull Configuration newConfig) {}
+  };
+
   private void runAsync(@NonNull Result result, String errorCode, Callable<Object> work) {
     ioExecutor.execute(() -> {
       try {
@@ -61,6 +83,7 @@ public class AndroidPlugin implements FlutterPlugin, MethodCallHandler, Activity
         "android_plugin");
     channel.setMethodCallHandler(this);
     this.context = flutterPluginBinding.getApplicationContext();
+    this.context.registerComponentCallbacks(memoryCallbacks);
     try {
       android.content.pm.ApplicationInfo ai =
           new ContextWrapper(this.context).getApplicationInfo();
@@ -168,6 +191,16 @@ public class AndroidPlugin implements FlutterPlugin, MethodCallHandler, Activity
         }
         return null;
       });
+    } else if (call.method.equals("storedAssetApk")) {
+      // Path of the APK holding `asset` if it is stored uncompressed there, so
+      // Python can read it in place (see _sp_bootstrap._ApkZipImporter); null
+      // if it is compressed (AssetManager.openFd only opens stored assets).
+      final String asset = call.argument("asset");
+      try (android.content.res.AssetFileDescriptor fd = context.getAssets().openFd(asset)) {
+        result.success(context.getApplicationInfo().sourceDir);
+      } catch (Exception e) {
+        result.success(null);
+      }
     } else if (call.method.equals("extractAsset")) {
       // Stream an APK asset to disk as one whole file (e.g. stdlib.zip).
       final String asset = call.argument("asset");
@@ -183,29 +216,14 @@ public class AndroidPlugin implements FlutterPlugin, MethodCallHandler, Activity
         }
         return dest;
       });
-    } else if (call.method.equals("unzipAsset")) {
-      // Unpack an APK asset zip (e.g. extract.zip) into a directory tree.
+    } else if (call.method.equals("syncAsset")) {
+      // Bring a directory tree up to date with an APK asset zip (app.zip,
+      // extract.zip): only members whose content hash changed since the last
+      // sync are written, in parallel, and removed ones deleted (see AssetSync).
       final String asset = call.argument("asset");
       final String destDir = call.argument("dest");
-      runAsync(result, "unzipAsset", () -> {
-        java.io.File root = new java.io.File(destDir);
-        byte[] buf = new byte[1 << 16];
-        try (java.io.InputStream in = context.getAssets().open(asset);
-             java.util.zip.ZipInputStream zis = new java.util.zip.ZipInputStream(in)) {
-          java.util.zip.ZipEntry e;
-          while ((e = zis.getNextEntry()) != null) {
-            java.io.File f = new java.io.File(root, e.getName());
-            if (e.isDirectory()) {
-              f.mkdirs();
-            } else {
-              if (f.getParentFile() != null) f.getParentFile().mkdirs();
-              try (java.io.OutputStream out = new java.io.FileOutputStream(f)) {
-                int n;
-                while ((n = zis.read(buf)) > 0) out.write(buf, 0, n);
-              }
-            }
-          }
-        }
+      runAsync(result, "syncAsset", () -> {
+        AssetSync.sync(context.getAssets(), asset, new java.io.File(destDir));
         return destDir;
       });
     } else {
@@ -216,6 +234,8 @@ public class AndroidPlugin implements FlutterPlugin, MethodCallHandler, Activity
   @Override
   public void onDetachedFromEngine(@NonNull FlutterPluginBinding binding) {
     channel.setMethodCallHandler(null);
+    context.unregisterComponentCallbacks(memoryCallbacks);
+    channel = null;
     ioExecutor.shutdown();
   }
 
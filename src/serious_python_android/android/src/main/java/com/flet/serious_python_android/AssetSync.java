@@ -0,0 +1,328 @@
+package com.flet.serious_python_android;
+
+import android.content.res.AssetFileDescriptor;
+import android.content.res.AssetManager;
+
+import java.io.File;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.nio.channels.FileChannel;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
+import java.util.zip.ZipEntry;
+import java.util.zip.ZipInputStream;
+
+/**
+ * Unpacks an APK asset zip (app.zip, extract.zip) into a directory, rewriting
+ * only what changed since the previous unpack.
+ *
+ * <p>The build embeds a content manifest in the zip (StoredZip.writeContentManifest
+ * in build.gradle.kts); a copy of it is kept in the destination directory.
+ * {@link #sync} diffs the two, deletes files that are gone, and writes added and
+ * changed members in parallel, reading them in place from the stored asset.
+ * A destination without a manifest (first install, interrupted sync) is
+ * wiped and fully unpacked; so is any asset without a manifest or one AAPT
+ * compressed.
+ */
+final class AssetSync {
+
+  // Keep in sync with StoredZip.writeContentManifest in build.gradle.kts.
+  static final String MANIFEST = ".sp_manifest";
+  static final String MANIFEST_MAGIC = "sp-manifest/1";
+
+  private AssetSync() {}
+
+  /** Bring `dest` up to date with the zip `asset`. */
+  static void sync(AssetManager assets, String asset, File dest) throws Exception {
+    StoredAsset zip;
+    try {
+      zip = new StoredAsset(assets.openFd(asset));
+    } catch (IOException e) {
+      unzipAll(assets, asset, dest); // compressed in the APK: no random access
+      return;
+    }
+    try {
+      Map<String, String> next = zip.has(MANIFEST) ? parseManifest(zip.read(MANIFEST)) : null;
+      if (next == null) {
+        zip.close();
+        zip = null;
+        unzipAll(assets, asset, dest);
+        return;
+      }
+      File manifestFile = new File(dest, MANIFEST);
+      Map<String, String> prev = manifestFile.isFile()
+          ? parseManifest(readFile(manifestFile)) : null;
+      if (prev == null) {
+        deleteTree(dest);
+        prev = new HashMap<>();
+      }
+      // Invalidate before touching the tree, so an interrupted sync is redone
+      // in full rather than trusted.
+      manifestFile.delete();
+
+      for (String name : prev.keySet()) {
+        if (next.containsKey(name) || name.equals(MANIFEST)) continue;
+        File f = new File(dest, name);
+        f.delete();
+        pruneEmptyParents(f.getParentFile(), dest);
+      }
+
+      List<String> changed = new ArrayList<>();
+      for (Map.Entry<String, String> e : next.entrySet()) {
+        String name = e.getKey();
+        if (name.equals(MANIFEST)) continue;
+        if (!e.getValue().equals(prev.get(name)) || !new File(dest, name).isFile()) {
+          changed.add(name);
+        }
+      }
+      writeParallel(zip, changed, dest);
+
+      writeFile(manifestFile, zip.read(MANIFEST));
+    } finally {
+      if (zip != null) zip.close();
+    }
+  }
+
+  private static void writeParallel(StoredAsset zip, List<String> names, File dest)
+      throws Exception {
+    if (names.isEmpty()) return;
+    int workers = Math.min(names.size(),
+        Math.max(2, Runtime.getRuntime().availableProcessors()));
+    ExecutorService pool = Executors.newFixedThreadPool(workers);
+    try {
+      List<Future<?>> pending = new ArrayList<>();
+      for (String name : names) {
+        pending.add(pool.submit(() -> {
+          File f = new File(dest, name);
+          if (f.isDirectory()) deleteTree(f); // was a package dir, now a file
+          zip.copyTo(name, f);
+          return null;
+        }));
+      }
+      for (Future<?> p : pending) p.get();
+    } finally {
+      pool.shutdownNow();
+    }
+  }
+
+  // Full unpack by streaming the asset — the pre-manifest behavior.
+  private static void unzipAll(AssetManager assets, String asset, File dest)
+      throws IOException {
+    deleteTree(dest);
+    byte[] buf = new byte[1 << 16];
+    try (InputStream in = assets.open(asset);
+         ZipInputStream zis = new ZipInputStream(in)) {
+      ZipEntry e;
+      while ((e = zis.getNextEntry()) != null) {
+        File f = new File(dest, e.getName());
+        if (e.isDirectory()) {
+          f.mkdirs();
+        } else {
+          if (f.getParentFile() != null) f.getParentFile().mkdirs();
+          try (OutputStream out = new FileOutputStream(f)) {
+            int n;
+            while ((n = zis.read(buf)) > 0) out.write(buf, 0, n);
+          }
+        }
+      }
+    }
+  }
+
+  // `<sha256>\t<member>` lines after the magic header; null if unrecognized.
+  private static Map<String, String> parseManifest(byte[] data) {
+    String[] lines = new String(data, StandardCharsets.UTF_8).split("\n");
+    if (lines.length == 0 || !lines[0].equals(MANIFEST_MAGIC)) return null;
+    Map<String, String> digests = new HashMap<>();
+    for (int i = 1; i < lines.length; i++) {
+      int tab = lines[i].indexOf('\t');
+      if (tab > 0) digests.put(lines[i].substring(tab + 1), lines[i].substring(0, tab));
+    }
+    return digests;
+  }
+
+  private static byte[] readFile(File f) throws IOException {
+    try (FileInputStream in = new FileInputStream(f)) {
+      byte[] data = new byte[(int) f.length()];
+      int off = 0;
+      while (off < data.length) {
+        int n = in.read(data, off, data.length - off);
+        if (n < 0) break;
+        off += n;
+      }
+      return data;
+    }
+  }
+
+  private static void writeFile(File f, byte[] data) throws IOException {
+    if (f.getParentFile() != null) f.getParentFile().mkdirs();
+    try (OutputStream out = new FileOutputStream(f)) {
+      out.write(data);
+    }
+  }
+
+  private static void deleteTree(File f) {
+    File[] children = f.listFiles();
+    if (children != null) {
+      for (File c : children) deleteTree(c);
+    }
+    f.delete();
+  }
+
+  private static void pruneEmptyParents(File dir, File root) {
+    while (dir != null && !dir.equals(root)) {
+      String[] left = dir.list();
+      if (left == null || left.length > 0 || !dir.delete()) return;
+      dir = dir.getParentFile();
+    }
+  }
+
+  /**
+   * A zip stored uncompressed in the APK, read in place through its asset file
+   * descriptor: the central directory is parsed once, then members are read with
+   * positional reads, which are safe from several threads at once.
+   */
+  private static final class StoredAsset implements AutoCloseable {
+    private final AssetFileDescriptor afd;
+    private final FileInputStream stream;
+    private final FileChannel channel;
+    private final long start;
+    // member -> {local header offset, size}
+    private final Map<String, long[]> entries = new HashMap<>();
+
+    StoredAsset(AssetFileDescriptor afd) throws IOException {
+      this.afd = afd;
+      this.stream = afd.createInputStream();
+      this.channel = stream.getChannel();
+      this.start = afd.getStartOffset();
+      try {
+        readDirectory(afd.getLength());
+      } catch (IOException e) {
+        close();
+        throw e;
+      }
+    }
+
+    boolean has(String name) {
+      return entries.containsKey(name);
+    }
+
+    byte[] read(String name) throws IOException {
+      return readAt(dataOffset(name), (int) entries.get(name)[1]).array();
+    }
+
+    void copyTo(String name, File f) throws IOException {
+      long pos = dataOffset(name);
+      long end = pos + entries.get(name)[1];
+      if (f.getParentFile() != null) f.getParentFile().mkdirs();
+      try (OutputStream out = new FileOutputStream(f)) {
+        while (pos < end) {
+          ByteBuffer chunk = readAt(pos, (int) Math.min(1 << 16, end - pos));
+          out.write(chunk.array());
+          pos += chunk.capacity();
+        }
+      }
+    }
+
+    private long dataOffset(String name) throws IOException {
+      long[] e = entries.get(name);
+      if (e == null) throw new IOException("no member " + name);
+      ByteBuffer header = readAt(e[0], 30);
+      if (header.getInt(0) != 0x04034b50) throw new IOException("bad local header: " + name);
+      if (header.getShort(8) != 0) throw new IOException("compressed member: " + name);
+      return e[0] + 30 + u16(header, 26) + u16(header, 28);
+    }
+
+    private void readDirectory(long length) throws IOException {
+      int tailLen = (int) Math.min(length, 22 + 0xffff);
+      ByteBuffer tail = readAt(length - tailLen, tailLen);
+      int eocd = -1;
+      for (int i = tailLen - 22; i >= 0; i--) {
+        if (tail.getInt(i) == 0x06054b50) {
+          eocd = i;
+          break;
+        }
+      }
+      if (eocd < 0) throw new IOException("not a zip");
+      long count = u16(tail, eocd + 10);
+      long dirSize = u32(tail, eocd + 12);
+      long dirOffset = u32(tail, eocd + 16);
+      if (eocd >= 20 && tail.getInt(eocd - 20) == 0x07064b50) { // zip64 locator
+        ByteBuffer rec = readAt(tail.getLong(eocd - 20 + 8), 56);
+        if (rec.getInt(0) != 0x06064b50) throw new IOException("bad zip64 record");
+        count = rec.getLong(32);
+        dirSize = rec.getLong(40);
+        dirOffset = rec.getLong(48);
+      }
+      ByteBuffer dir = readAt(dirOffset, (int) dirSize);
+      int p = 0;
+      for (long i = 0; i < count; i++) {
+        if (dir.getInt(p) != 0x02014b50) throw new IOException("bad central directory");
+        int nameLen = u16(dir, p + 28);
+        int extraLen = u16(dir, p + 30);
+        int commentLen = u16(dir, p + 32);
+        long size = u32(dir, p + 20);
+        long offset = u32(dir, p + 42);
+        String name = new String(dir.array(), p + 46, nameLen, StandardCharsets.UTF_8);
+        if (size == 0xffffffffL || offset == 0xffffffffL) {
+          // zip64 extended info: the 0xffffffff fields, in order, as 8-byte values
+          int x = p + 46 + nameLen;
+          int end = x + extraLen;
+          while (x + 4 <= end) {
+            int tag = u16(dir, x);
+            int len = u16(dir, x + 2);
+            if (tag == 0x0001) {
+              int q = x + 4;
+              if (u32(dir, p + 24) == 0xffffffffL) q += 8; // uncompressed size
+              if (size == 0xffffffffL) {
+                size = dir.getLong(q);
+                q += 8;
+              }
+              if (offset == 0xffffffffL) offset = dir.getLong(q);
+              break;
+            }
+            x += 4 + len;
+          }
+        }
+        if (!name.endsWith("/")) entries.put(name, new long[] {offset, size});
+        p += 46 + nameLen + extraLen + commentLen;
+      }
+    }
+
+    private ByteBuffer readAt(long pos, int len) throws IOException {
+      ByteBuffer buf = ByteBuffer.allocate(len).order(ByteOrder.LITTLE_ENDIAN);
+      while (buf.hasRemaining()) {
+        int n = channel.read(buf, start + pos + buf.position());
+        if (n < 0) throw new IOException("truncated asset");
+      }
+      return buf;
+    }
+
+    private static int u16(ByteBuffer b, int at) {
+      return b.getShort(at) & 0xffff;
+    }
+
+    private static long u32(ByteBuffer b, int at) {
+      return b.getInt(at) & 0xffffffffL;
+    }
+
+    @Override
+    public void close() throws IOException {
+      try {
+        stream.close();
+      } finally {
+        afd.close();
+      }
+    }
+  }
+}
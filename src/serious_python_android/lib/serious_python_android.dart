@@ -1,3 +1,4 @@
+import 'dart:async';
 import 'dart:io';
 
 import 'package:flutter/foundation.dart';
@@ -14,12 +15,15 @@ import 'package:serious_python_platform_interface/serious_python_platform_interf
 /// `downloadDartBridge_<abi>` tasks).
 ///
 /// This class:
-/// 1. In [prepareApp], copies the stored asset zips (stdlib / sitepackages /
-///    extract / app) out of the APK into the app-support directory once
-///    (version-keyed), since CPython can't import from inside the .apk and the
-///    app payload must live on a writable path.
-/// 2. In [run], builds env vars + sys.path entries (pointing at those copied
-///    zips) and hands them to `serious_python_run` in a single FFI call.
+/// 1. In [prepareApp], unpacks the app and extract zips and copies `boot.zip`
+///    out of the APK into the app-support directory once per install
+///    (version-keyed); an update rewrites only the files that changed.
+///    `stdlib.zip` and `sitepackages.zip` stay in the APK: `_sp_bootstrap`
+///    imports from them in place (only a compressed copy is extracted).
+/// 2. In [run], builds env vars + sys.path entries and hands them to
+///    `serious_python_run` in a single FFI call.
+/// 3. Passes the `onTrimMemory` levels the plugin forwards on to
+///    [memoryPressure].
 class SeriousPythonAndroid extends SeriousPythonPlatform {
   @visibleForTesting
   final methodChannel = const MethodChannel('android_plugin');
@@ -28,9 +32,24 @@ class SeriousPythonAndroid extends SeriousPythonPlatform {
     SeriousPythonPlatform.instance = SeriousPythonAndroid();
   }
 
+  // Created on first use: the handler needs the Flutter binding.
+  late final StreamController<int> _memoryPressure = _listenForTrims();
+
+  @override
+  Stream<int> get memoryPressure => _memoryPressure.stream;
+
+  StreamController<int> _listenForTrims() {
+    final controller = StreamController<int>.broadcast();
+    methodChannel.setMethodCallHandler((call) async {
+      if (call.method == 'onTrimMemory') controller.add(call.arguments as int);
+    });
+    return controller;
+  }
+
   /// The serious_python/flet-owned storage namespace: `<support>/flet`, where
   /// `<support>` is `getApplicationSupportDirectory()` (== `context.getFilesDir()`
-  /// on Android). Holds `{app, stdlib.zip, sitepackages.zip, extract/, .key}`.
+  /// on Android). Holds `{app, boot.zip, extract/, .key}`, plus `stdlib.zip` /
+  /// `sitepackages.zip` when those can't be read from the APK.
   /// The sibling `<support>/data` (user data / cwd) is never touched here.
   Future<String> _base() async {
     final support = await getApplicationSupportDirectory();
@@ -41,8 +60,7 @@ class SeriousPythonAndroid extends SeriousPythonPlatform {
   Future<String> prepareApp() async {
     final base = await _base();
     final appDir = p.join(base, 'app');
-    final stdlibZip = p.join(base, 'stdlib.zip');
-    final siteZip = p.join(base, 'sitepackages.zip');
+    final bootZip = p.join(base, 'boot.zip');
     final extractDir = p.join(base, 'extract');
 
     // `getAppVersion` returns `versionName+versionCode+lastUpdateTime`, so the
@@ -57,23 +75,31 @@ class SeriousPythonAndroid extends SeriousPythonPlatform {
         await marker.exists() && (await marker.readAsString()) == key;
     if (!upToDate) {
       await Directory(base).create(recursive: true);
-      // Re-materialize the unpacked trees; leave the sibling `<support>/data`
-      // (user data) alone — it must survive app updates.
-      for (final dir in [appDir, extractDir]) {
-        if (await Directory(dir).exists()) {
-          await Directory(dir).delete(recursive: true);
+      // Pure-code zips are imported in place from the APK when stored there;
+      // a compressed one is streamed whole to disk and imported from there.
+      for (final asset in _pureZips) {
+        final copy = p.join(base, asset);
+        if (await _zipEntry(base, asset) == copy) {
+          await methodChannel
+              .invokeMethod('extractAsset', {'asset': asset, 'dest': copy});
+        } else if (await File(copy).exists()) {
+          await File(copy).delete(); // copied by an earlier version
         }
       }
-      // Pure-code zips imported in place via zipimport (streamed whole to disk).
-      await methodChannel.invokeMethod(
-          'extractAsset', {'asset': 'stdlib.zip', 'dest': stdlibZip});
-      await methodChannel.invokeMethod(
-          'extractAsset', {'asset': 'sitepackages.zip', 'dest': siteZip});
-      // Path-hungry packages + the app payload are unpacked to disk.
-      await methodChannel.invokeMethod(
-          'unzipAsset', {'asset': 'extract.zip', 'dest': extractDir});
+      // What the interpreter imports before `_sp_bootstrap` can read the APK.
       await methodChannel
-          .invokeMethod('unzipAsset', {'asset': 'app.zip', 'dest': appDir});
+          .invokeMethod('extractAsset', {'asset': 'boot.zip', 'dest': bootZip});
+      // Path-hungry packages + the app payload are unpacked to disk. Each
+      // tree is synced against the content manifest in its zip: only added
+      // and changed files are written and removed ones deleted, so an update
+      // that touches one file rewrites one file. The sibling `<support>/data`
+      // (user data) is left alone — it must survive app updates.
+      await Future.wait([
+        methodChannel.invokeMethod(
+            'syncAsset', {'asset': 'extract.zip', 'dest': extractDir}),
+        methodChannel
+            .invokeMethod('syncAsset', {'asset': 'app.zip', 'dest': appDir}),
+      ]);
       await marker.writeAsString(key);
     }
 
@@ -89,15 +115,19 @@ class SeriousPythonAndroid extends SeriousPythonPlatform {
     // [prepareApp] has already materialized everything; recompute the paths
     // (deterministic from the support dir) — no unpacking here.
     final base = await _base();
-    final stdlibZip = p.join(base, 'stdlib.zip');
-    final siteZip = p.join(base, 'sitepackages.zip');
+    final bootZip = p.join(base, 'boot.zip');
+    final stdlibZip = await _zipEntry(base, 'stdlib.zip');
+    final siteZip = await _zipEntry(base, 'sitepackages.zip');
     final extractDir = p.join(base, 'extract');
 
     final programDir = p.dirname(appPath);
-    // Highest -> lowest precedence. site-packages before stdlib so pip backports
-    // can override; extract-dir before sitepackages.zip. Natives resolve via the
-    // finder, not a sys.path entry.
+    // Highest -> lowest precedence. boot.zip first: it only holds `encodings`
+    // and the bootstrap, which must resolve before the APK entries can.
+    // site-packages before stdlib so pip backports can override; extract-dir
+    // before sitepackages.zip. Natives resolve via the finder, not a sys.path
+    // entry.
     final pythonPaths = <String>[
+      bootZip,
       ...?modulePaths,
       programDir,
       extractDir,
@@ -145,6 +175,22 @@ class SeriousPythonAndroid extends SeriousPythonPlatform {
     return rc != 0 ? 'Python exited with code $rc' : null;
   }
 
+  static const _pureZips = ['stdlib.zip', 'sitepackages.zip'];
+
+  /// `sys.path` entry for the pure-code zip [asset]: `<apk>/assets/<asset>`,
+  /// which `_sp_bootstrap` reads in place, if the APK stores it uncompressed;
+  /// otherwise its copy in [base].
+  Future<String> _zipEntry(String base, String asset) async {
+    String? apk;
+    try {
+      apk = await methodChannel
+          .invokeMethod<String>('storedAssetApk', {'asset': asset});
+    } catch (_) {
+      // no such method (e.g. in tests): use the extracted copy
+    }
+    return apk != null ? p.join(apk, 'assets', asset) : p.join(base, asset);
+  }
+
   Future<String?> _appVersion() async {
     try {
       return await methodChannel.invokeMethod<String>('getAppVersion');
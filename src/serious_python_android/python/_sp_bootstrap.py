@@ -11,9 +11,22 @@ files (loaded by basename through the Android linker namespace, exactly like
 `FileFinder` — this finder returns `None` for them.
 
 For every relocated extension the build leaves a `.soref` marker at the module's
-original path; its content is the `lib<mangled>.so` filename. The marker is read
-**lazily** in `find_spec` via the frozen `zipimport` `get_data` API (for zip
-entries) or a plain `open` (for entries extracted to disk, e.g. `extract.zip`).
+original path; its content is the `lib<mangled>.so` filename. The build also
+writes a `.soref_index` member at the root of each archive listing every marker
+in it (dotted name, lib name, is-package flag), which `install()` loads once so
+`find_spec` answers with a dict lookup. For a `sys.path` entry with no usable
+index (missing, or stale against the archive) the marker is read **lazily** in
+`find_spec` via the frozen `zipimport` `get_data` API (for zip entries) or a
+plain `open` (for entries extracted to disk, e.g. `extract.zip`).
+
+The pure-code zips themselves (`stdlib.zip`, `sitepackages.zip`) are normally
+not copied out of the APK: they are stored uncompressed there, and their
+`sys.path` entries have the form `<base.apk>/assets/<name>.zip`. `install()`
+registers `_ApkZipImporter` as the first path hook. It is a `zipimporter` whose
+directory comes from the inner zip, located inside the APK once, with member
+offsets made absolute so `zipimport` reads each one in place from the APK
+file. Only the small `boot.zip` (`encodings` and this module, needed before
+`install()` runs) is copied to disk.
 
 CRITICAL: this module must load and run *before any native module is resolvable*,
 so it imports **only builtin/frozen** machinery — `sys`, `zipimport`,
@@ -27,6 +40,13 @@ import zipimport
 from importlib.machinery import ExtensionFileLoader, ModuleSpec
 
 _MARKER_SUFFIX = ".soref"
+# Marker index written by the gradle split tasks (`StoredZip.writeSorefIndex`).
+_INDEX_MEMBER = ".soref_index"
+_INDEX_MAGIC = "sp-soref-index/1"
+# Bound on `_SorefFinder`'s negative cache (oldest entries evicted first).
+_NEGATIVE_CACHE_SIZE = 4096
+# `sys.path` entries of zips read in place from the APK contain this.
+_APK_ASSETS = ".apk/assets/"
 _installed = False
 
 
@@ -47,6 +67,200 @@ def _apk_native_prefix():
     return v.decode("utf-8") if v else None
 
 
+def _zip_files(zi):
+    """The central-directory dict zipimport already holds for `zi` (member ->
+    toc entry), or None. `_get_files()` is 3.13+; 3.12 keeps it in `_files`."""
+    try:
+        get = getattr(zi, "_get_files", None)
+        return get() if get is not None else zi._files
+    except Exception:
+        return None
+
+
+def _u16(b, i):
+    return b[i] | b[i + 1] << 8
+
+
+def _u32(b, i):
+    return b[i] | b[i + 1] << 8 | b[i + 2] << 16 | b[i + 3] << 24
+
+
+def _u64(b, i):
+    return _u32(b, i) | _u32(b, i + 4) << 32
+
+
+def _zip_directory(fd, start, size):
+    """Return `(cd_offset, cd_size, count)` of the zip occupying `size` bytes
+    at `start` in `fd`, with `cd_offset` relative to `start`."""
+    tail_size = min(size, 0x10000 + 22)
+    tail = posix.pread(fd, tail_size, start + size - tail_size)
+    i = tail.rfind(b"PK\x05\x06")
+    if i < 0:
+        raise zipimport.ZipImportError("no end of central directory")
+    count, cd_size, cd_offset = _u16(tail, i + 10), _u32(tail, i + 12), _u32(tail, i + 16)
+    if (count == 0xFFFF or cd_offset == 0xFFFFFFFF) and tail[i - 20 : i - 16] == b"PK\x06\x07":
+        # Zip64 (more than 65535 members): the locator points at the real record.
+        rec = posix.pread(fd, 56, start + _u64(tail, i - 12))
+        count, cd_size, cd_offset = _u64(rec, 32), _u64(rec, 40), _u64(rec, 48)
+    return cd_offset, cd_size, count
+
+
+def _apk_asset(fd, apk_size, name):
+    """Return `(start, size)` of the data of asset `name` in the APK, which
+    must be stored uncompressed."""
+    cd_offset, cd_size, _ = _zip_directory(fd, 0, apk_size)
+    cd = posix.pread(fd, cd_size, cd_offset)
+    member = ("assets/" + name).encode("utf-8")
+    i = cd.find(member)
+    while i >= 0:
+        h = i - 46
+        if h >= 0 and cd[h : h + 4] == b"PK\x01\x02" and _u16(cd, h + 28) == len(member):
+            if _u16(cd, h + 10) != 0:
+                raise zipimport.ZipImportError("asset %s is compressed in the APK" % name)
+            local = _u32(cd, h + 42)
+            header = posix.pread(fd, 30, local)
+            return local + 30 + _u16(header, 26) + _u16(header, 28), _u32(cd, h + 20)
+        i = cd.find(member, i + 1)
+    raise zipimport.ZipImportError("asset %s not in the APK" % name)
+
+
+def _read_apk_zip(apk, name, archive):
+    """`zipimport` directory of the zip stored as asset `name` in `apk`, with
+    member offsets relative to the APK file and paths under `archive`."""
+    fd = posix.open(apk, posix.O_RDONLY)
+    try:
+        start, size = _apk_asset(fd, posix.fstat(fd).st_size, name)
+        cd_offset, cd_size, count = _zip_directory(fd, start, size)
+        cd = posix.pread(fd, cd_size, start + cd_offset)
+    finally:
+        posix.close(fd)
+    files = {}
+    p = 0
+    for _ in range(count):
+        if cd[p : p + 4] != b"PK\x01\x02":
+            raise zipimport.ZipImportError("bad central directory in asset %s" % name)
+        name_size, extra_size, comment_size = _u16(cd, p + 28), _u16(cd, p + 30), _u16(cd, p + 32)
+        raw = cd[p + 46 : p + 46 + name_size]
+        member = raw.decode("utf-8" if _u16(cd, p + 8) & 0x800 else "latin-1")
+        # (path, compress, data_size, file_size, file_offset, time, date, crc)
+        files[member] = (
+            archive + "/" + member,
+            _u16(cd, p + 10),
+            _u32(cd, p + 20),
+            _u32(cd, p + 24),
+            start + _u32(cd, p + 42),
+            _u16(cd, p + 12),
+            _u16(cd, p + 14),
+            _u32(cd, p + 16),
+        )
+        p += 46 + name_size + extra_size + comment_size
+    return files, start, size
+
+
+# archive ("<apk>/assets/<name>.zip") -> (apk path, data start, data size)
+_apk_zips = {}
+
+
+class _ApkWindow:
+    """Read-only file over the bytes of an APK asset, for `zipfile`."""
+
+    def __init__(self, apk, start, size):
+        self._f = open(apk, "rb")
+        self._start = start
+        self._size = size
+        self._pos = 0
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            offset += self._size
+        self._pos = max(0, min(offset, self._size))
+        return self._pos
+
+    def read(self, n=-1):
+        if n is None or n < 0 or n > self._size - self._pos:
+            n = self._size - self._pos
+        self._f.seek(self._start + self._pos)
+        data = self._f.read(n)
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        self._f.close()
+
+
+class _ApkZipImporter(zipimport.zipimporter):
+    """Path hook for `<apk>/assets/<name>.zip[/<dir>]` entries: a zipimporter
+    serving the zip stored (uncompressed) as an APK asset, in place.
+
+    `archive` is the asset path, which module `__file__`s and package
+    `__path__`s are built from; `_get_data` (patched in `_install_apk_importer`)
+    maps it back to the APK file to read members from.
+    """
+
+    def __init__(self, path):
+        i = path.find(_APK_ASSETS)
+        if i < 0:
+            raise zipimport.ZipImportError("not an APK asset path", path=path)
+        j = path.find("/", i + len(_APK_ASSETS))
+        archive = path if j < 0 else path[:j]
+        files = zipimport._zip_directory_cache.get(archive)
+        if archive not in _apk_zips or files is None:
+            apk = path[: i + 4]
+            try:
+                files, start, size = _read_apk_zip(apk, archive[i + len(_APK_ASSETS) :], archive)
+            except OSError as e:
+                raise zipimport.ZipImportError("can't read APK asset: %r" % (e,), path=path)
+            _apk_zips[archive] = (apk, start, size)
+            zipimport._zip_directory_cache[archive] = files
+        self._files = files
+        self.archive = archive
+        self.prefix = "" if j < 0 else path[j + 1 :].rstrip("/") + "/"
+
+    def _get_files(self):
+        return self._files
+
+    def invalidate_caches(self):
+        pass  # an installed APK never changes under a running process
+
+    def get_resource_reader(self, fullname):
+        reader = super().get_resource_reader(fullname)
+        if reader is not None:
+            # importlib's ZipReader opens `archive` with zipfile; hand it the
+            # asset's bytes instead.
+            import zipfile
+
+            reader.archive = zipfile.ZipFile(_ApkWindow(*_apk_zips[self.archive]))
+        return reader
+
+
+def _install_apk_importer():
+    """Serve `<apk>/assets/*.zip` sys.path entries in place (idempotent)."""
+    get_data = zipimport._get_data
+    if not getattr(get_data, "_sp_patched", False):
+
+        def _get_data(archive, toc_entry):
+            apk = _apk_zips.get(archive)
+            return get_data(apk[0] if apk is not None else archive, toc_entry)
+
+        _get_data._sp_patched = True
+        zipimport._get_data = _get_data
+    if _ApkZipImporter not in sys.path_hooks:
+        sys.path_hooks.insert(0, _ApkZipImporter)
+    # Entries looked up before the hook existed got the wrong importer (or
+    # none); let the path finder ask again.
+    for entry in list(sys.path_importer_cache):
+        if _APK_ASSETS in entry:
+            del sys.path_importer_cache[entry]
+
+
 class _SorefFinder:
     """meta_path finder: dotted name -> jniLibs lib via its `.soref` marker."""
 
@@ -54,62 +268,202 @@ class _SorefFinder:
         # Cache one zipimporter per zip sys.path entry. Value is None for entries
         # that are not zips (plain directories) so we don't retry zipimporter().
         self._zi_cache = {}
+        # Per sys.path entry: {dotted: (soname, is_package)} of every marker in
+        # it — from its `.soref_index`, or (zip entries without a usable index)
+        # from one scan of the archive directory, with soname None until the
+        # marker is first read. None for directory entries without an index:
+        # those are probed through `_dir_cache`.
+        self._indexes = {}
+        # Directory path -> set of file names in it, from one `listdir` each,
+        # built lazily as unindexed directory entries are probed.
+        self._dir_cache = {}
+        # Names recently decided not to be relocated natives (insertion-ordered
+        # dict used as a bounded FIFO set). Pure-Python imports — the vast
+        # majority — hit this on every re-import attempt instead of re-walking
+        # sys.path. Dropped whenever sys.path changes.
+        self._negative = {}
+        self._path_snapshot = list(sys.path)
         self._native_dir = _native_lib_dir()
         self._apk_prefix = _apk_native_prefix()
 
+    def invalidate_caches(self):
+        """Drop every cached lookup; called by `importlib.invalidate_caches()`."""
+        self._zi_cache.clear()
+        self._indexes.clear()
+        self._dir_cache.clear()
+        self._negative.clear()
+        self._path_snapshot = list(sys.path)
+
     def _zipimporter(self, entry):
         try:
             return self._zi_cache[entry]
         except KeyError:
             try:
-                zi = zipimport.zipimporter(entry)
+                if _APK_ASSETS in entry:
+                    zi = _ApkZipImporter(entry)
+                else:
+                    zi = zipimport.zipimporter(entry)
             except Exception:
                 zi = None  # not a zip (e.g. a directory)
             self._zi_cache[entry] = zi
             return zi
 
-    def _read_marker(self, member):
-        """Return `(soref_bytes, sys.path entry)` for `member`, or
-        `(None, None)` if absent.
+    def _read_member(self, entry, member):
+        """Return the bytes of `member` in sys.path `entry`, or None if absent.
 
-        Probes every current `sys.path` entry: zip entries via the frozen
-        `zipimport.get_data` (known member, no native deps), directory entries
-        via a plain `open` (covers packages unpacked from `extract.zip`). The
-        winning entry is returned too so a package whose `__init__` is the
-        native extension can locate its pure-Python submodules beside it.
+        Zip entries go through the frozen `zipimport.get_data` (known member,
+        no native deps); directory entries (packages unpacked from
+        `extract.zip`) through a plain `open`.
         """
-        for entry in sys.path:
-            if not entry:
+        zi = self._zipimporter(entry)
+        if zi is not None:
+            try:
+                return zi.get_data(member)  # archive-relative member
+            except Exception:
+                return None
+        try:
+            with open(entry + "/" + member, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _scan_zip(self, zi):
+        """Build `{dotted: (None, is_package)}` from the `.soref` members of
+        `zi`'s directory (already in memory — no I/O), or None if the
+        directory is unavailable."""
+        files = _zip_files(zi)
+        if files is None:
+            return None
+        prefix = zi.prefix
+        index = {}
+        for name in files:
+            if not name.endswith(_MARKER_SUFFIX) or not name.startswith(prefix):
                 continue
-            zi = self._zipimporter(entry)
-            if zi is not None:
-                try:
-                    return zi.get_data(member), entry  # archive-relative member
-                except Exception:
-                    continue
+            name = name[len(prefix):-len(_MARKER_SUFFIX)]
+            if name.endswith("/__init__"):
+                index[name[:-9].replace("/", ".")] = (None, True)
             else:
-                # Directory entry: try the marker as a real file on disk.
-                path = entry + "/" + member
-                try:
-                    with open(path, "rb") as f:
-                        return f.read(), entry
-                except OSError:
-                    continue
-        return None, None
+                index[name.replace("/", ".")] = (None, False)
+        return index
 
-    def find_spec(self, fullname, path=None, target=None):
-        base = fullname.replace(".", "/")
-        # A plain extension module: its marker is "<dotted>.soref".
-        data, entry = self._read_marker(base + _MARKER_SUFFIX)
-        is_package = False
+    def _load_index(self, entry):
+        """Return the marker table for `entry` (see `_indexes`).
+
+        Prefers the build's `.soref_index`. It is ignored when absent, of an
+        unknown format, or stale — for zip entries its marker count must match
+        the `.soref` members in the archive directory — and the table is then
+        rebuilt from that directory scan instead.
+        """
+        zi = self._zipimporter(entry)
+        scanned = self._scan_zip(zi) if zi is not None else None
+        data = self._read_member(entry, _INDEX_MEMBER)
         if data is None:
+            return scanned
+        try:
+            lines = data.decode("utf-8").splitlines()
+            magic, count = lines[0].split("\t")
+            if magic != _INDEX_MAGIC:
+                return scanned
+            index = {}
+            for line in lines[1:]:
+                if line:
+                    dotted, soname, pkg = line.split("\t")
+                    index[dotted] = (soname, pkg == "1")
+            if len(index) != int(count):
+                return scanned
+        except Exception:
+            return scanned
+        if scanned is not None and len(scanned) != len(index):
+            return scanned
+        return index
+
+    def _index(self, entry):
+        try:
+            return self._indexes[entry]
+        except KeyError:
+            index = self._indexes[entry] = self._load_index(entry)
+            return index
+
+    def load_indexes(self):
+        """Load the marker table of every current `sys.path` entry (once)."""
+        for entry in sys.path:
+            if entry:
+                self._index(entry)
+
+    def _dir_has(self, entry, member):
+        """True if `member` exists under directory `entry`, answered from a
+        cached `listdir` of its parent directory."""
+        parent, _, leaf = (entry + "/" + member).rpartition("/")
+        try:
+            names = self._dir_cache[parent]
+        except KeyError:
+            try:
+                names = set(posix.listdir(parent))
+            except OSError:
+                names = ()
+            self._dir_cache[parent] = names
+        return leaf in names
+
+    def _lookup(self, fullname):
+        """Return `(soname, is_package, sys.path entry)` for `fullname`, or
+        `(None, False, None)` if it is not a relocated native module.
+
+        Walks `sys.path` in order so precedence matches the path finder: a zip
+        entry or indexed directory costs one dict lookup (plus one marker read
+        the first time an unindexed zip's marker is hit); any other directory
+        costs a set lookup in a cached listing. The winning entry is returned
+        too so a package whose `__init__` is the native extension can locate
+        its pure-Python submodules beside it.
+        """
+        base = None
+        for entry in sys.path:
+            if not entry:
+                continue
+            index = self._index(entry)
+            if index is not None:
+                hit = index.get(fullname)
+                if hit is None:
+                    continue
+                soname, is_package = hit
+                if soname is None:
+                    base = fullname.replace(".", "/")
+                    member = base + ("/__init__" if is_package else "") + _MARKER_SUFFIX
+                    data = self._read_member(entry, member)
+                    if data is None:
+                        continue
+                    soname = data.decode("utf-8").strip()
+                    index[fullname] = (soname, is_package)
+                return soname, is_package, entry
+            if base is None:
+                base = fullname.replace(".", "/")
+            # A plain extension module: its marker is "<dotted>.soref".
             # A package whose __init__ IS the native extension (e.g. apsw ships
             # apsw/__init__.<abi>.so): the marker sits at "<dotted>/__init__.soref".
-            data, entry = self._read_marker(base + "/__init__" + _MARKER_SUFFIX)
-            is_package = data is not None
-        if data is None:
+            for member, is_package in (
+                (base + _MARKER_SUFFIX, False),
+                (base + "/__init__" + _MARKER_SUFFIX, True),
+            ):
+                if self._dir_has(entry, member):
+                    data = self._read_member(entry, member)
+                    if data is not None:
+                        return data.decode("utf-8").strip(), is_package, entry
+        return None, False, None
+
+    def find_spec(self, fullname, path=None, target=None):
+        if sys.path != self._path_snapshot:
+            # Entries added/removed/reordered: a cached miss may now be a hit.
+            # Per-entry tables stay valid (keyed by entry), new entries load lazily.
+            self._negative.clear()
+            self._path_snapshot = list(sys.path)
+        elif fullname in self._negative:
+            return None
+        soname, is_package, entry = self._lookup(fullname)
+        if soname is None:
+            negative = self._negative
+            if len(negative) >= _NEGATIVE_CACHE_SIZE:
+                del negative[next(iter(negative))]
+            negative[fullname] = None
             return None  # not a relocated native module -> let others handle it
-        soname = data.decode("utf-8").strip()
         # Resolve the lib to an absolute origin (CPython prepends "./" to a no-slash
         # origin, which breaks bare-soname loading). Prefer the extracted copy under
         # nativeLibraryDir (legacy packaging); else the Bionic APK zip-path (modern
@@ -132,7 +486,7 @@ class _SorefFinder:
             # sys.path entry (sitepackages.zip or an extract.zip dir). Point
             # __path__ there so `import <pkg>.<sub>` resolves via the normal
             # zipimport/FileFinder machinery.
-            spec.submodule_search_locations = [entry + "/" + base]
+            spec.submodule_search_locations = [entry + "/" + fullname.replace(".", "/")]
         return spec
 
 
@@ -156,7 +510,11 @@ def _install_finder():
         if isinstance(f, _SorefFinder):
             _installed = True
             return
-    sys.meta_path.insert(0, _SorefFinder())
+    finder = _SorefFinder()
+    # Read every archive's marker index up front, while sys.path is exactly the
+    # embedder's layout; entries added later are indexed on first lookup.
+    finder.load_indexes()
+    sys.meta_path.insert(0, finder)
     _installed = True
 
 
@@ -197,7 +555,7 @@ def _patch_subinterpreters():
     def create(*args, **kwargs):
         interp = _orig_create(*args, **kwargs)
         try:
-            interp.exec("import _sp_bootstrap\n_sp_bootstrap.install()\n")
+            interp.exec("import _sp_bootstrap\n_sp_bootstrap.install(subinterpreter=True)\n")
         except Exception as e:
             # Finder not installed in the child: it will hit the original
             # ModuleNotFoundError on its first relocated import. Leave a
@@ -210,12 +568,53 @@ def _patch_subinterpreters():
     interpreters.create = create
 
 
-def install():
+def _trace_imports():
+    """Start `_sp_importtrace` if `SERIOUS_PYTHON_IMPORT_PROFILE` is set.
+
+    Runs after `_install_finder` so the tracer sits in front of the
+    `_SorefFinder` and sees which finder serves every later import.
+    """
+    v = posix.environ.get(b"SERIOUS_PYTHON_IMPORT_PROFILE", b"")
+    if v in (b"", b"0"):
+        return
+    try:
+        import _sp_importtrace
+
+        _sp_importtrace.enable()
+    except Exception as e:
+        sys.stderr.write("SP_BOOTSTRAP import profiler not started: %r\n" % (e,))
+
+
+def _lazy_imports():
+    """Start `_sp_lazyimport` for the modules in `SERIOUS_PYTHON_LAZY_IMPORTS`.
+
+    Runs before `_trace_imports` so the tracer, inserted in front of it,
+    still sees every import.
+    """
+    v = posix.environ.get(b"SERIOUS_PYTHON_LAZY_IMPORTS", b"")
+    if not v:
+        return
+    try:
+        import _sp_lazyimport
+
+        _sp_lazyimport.enable([n.strip() for n in v.decode("utf-8").split(",")])
+    except Exception as e:
+        sys.stderr.write("SP_BOOTSTRAP lazy imports not enabled: %r\n" % (e,))
+
+
+def install(subinterpreter=False):
     """Entry point called from the dart-bridge Android bootstrap.
 
-    Installs the native-module finder in the current interpreter and — on
-    3.14+ — teaches every future subinterpreter to install it too.
-    Safe to call in any interpreter; idempotent.
+    Installs the in-APK zip importer and the native-module finder in the
+    current interpreter and — on 3.14+ — teaches every future subinterpreter
+    to install them too.
+    Safe to call in any interpreter; idempotent. The opt-in lazy imports and
+    import profiler are process-level and only started for the main
+    interpreter (`subinterpreter=False`).
     """
+    _install_apk_importer()
     _install_finder()
     _patch_subinterpreters()
+    if not subinterpreter:
+        _lazy_imports()
+        _trace_imports()
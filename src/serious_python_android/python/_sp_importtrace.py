@@ -0,0 +1,285 @@
+"""serious_python Android import profiler.
+
+Opt-in startup trace, enabled by `_sp_bootstrap.install()` when the app passes
+`SERIOUS_PYTHON_IMPORT_PROFILE` through `SeriousPython.run(environmentVariables:
+...)`. Set it to `1` to write the report into the current directory (the
+writable `<application-support>/data` dir `SeriousPython.run` switches to), or
+to a directory path to write it there.
+
+For every module imported from then on it records which `sys.meta_path` finder
+served it (`_SorefFinder`, `PathFinder`, `BuiltinImporter`, ...) and which
+loader ran it (`zipimporter`, `SourceFileLoader` from a `FileFinder`,
+`ExtensionFileLoader`, ...), the time spent finding it, creating it (for an
+extension module that is the `dlopen` + `PyInit`), and executing its body, and
+the size of the file the loader reads. Timings nest the way `-X importtime`
+does: a module's cumulative time includes the imports it triggers, its self
+time does not.
+
+Two files are written on `dump()` — called automatically at interpreter exit,
+and callable from app code once startup is done (e.g. as the first line of
+`main.py`'s event loop, since a bridge app never exits)::
+
+    import _sp_importtrace; _sp_importtrace.dump()
+
+- `sp_import_profile.json` — one record per module, in completion order.
+- `sp_importtime.txt` — the same data in `-X importtime` format, so existing
+  tooling (e.g. tuna) can read it.
+
+Like `_sp_bootstrap`, this module is imported before `site` runs: only
+builtin/frozen modules at import time. `json` is imported at dump time, when
+the native-module finder is long installed.
+"""
+
+import sys
+import posix
+import _thread
+from time import perf_counter_ns
+
+_PROFILE_JSON = "sp_import_profile.json"
+_PROFILE_TXT = "sp_importtime.txt"
+
+_tracer = None
+
+
+class _Record:
+    __slots__ = (
+        "name",
+        "finder",
+        "loader",
+        "depth",
+        "find_ns",
+        "create_ns",
+        "exec_ns",
+        "children_ns",
+        "bytes",
+    )
+
+    def __init__(self, name, finder, loader, depth, find_ns, nbytes):
+        self.name = name
+        self.finder = finder
+        self.loader = loader
+        self.depth = depth
+        self.find_ns = find_ns
+        self.create_ns = 0
+        self.exec_ns = 0
+        self.children_ns = 0
+        self.bytes = nbytes
+
+    @property
+    def cumulative_ns(self):
+        return self.find_ns + self.create_ns + self.exec_ns
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "finder": self.finder,
+            "loader": self.loader,
+            "depth": self.depth,
+            "find_us": self.find_ns // 1000,
+            # For extension modules create_module is the dlopen + PyInit.
+            "create_us": self.create_ns // 1000,
+            "exec_us": self.exec_ns // 1000,
+            "self_us": (self.cumulative_ns - self.children_ns) // 1000,
+            "cumulative_us": self.cumulative_ns // 1000,
+            "bytes": self.bytes,
+        }
+
+
+def _loaded_bytes(spec):
+    """Size of the file the loader reads for `spec`, or 0 if unknown (e.g. a
+    relocated extension mmap'd straight from the APK)."""
+    loader = spec.loader
+    origin = spec.origin
+    if not origin:
+        return 0
+    archive = getattr(loader, "archive", None)
+    if archive is not None and origin.startswith(archive + "/"):
+        # zipimporter: compressed size from the directory it already holds.
+        from _sp_bootstrap import _zip_files
+
+        files = _zip_files(loader)
+        toc = files.get(origin[len(archive) + 1 :]) if files else None
+        return toc[2] if toc else 0
+    try:
+        return posix.stat(spec.cached or origin).st_size
+    except (OSError, TypeError, ValueError):
+        try:
+            return posix.stat(origin).st_size
+        except (OSError, ValueError):
+            return 0
+
+
+def _type_name(obj):
+    # BuiltinImporter / FrozenImporter / PathFinder are used as classes.
+    return obj.__name__ if isinstance(obj, type) else type(obj).__name__
+
+
+class _TimedLoader:
+    """Wraps a spec's loader for the duration of one import to time
+    `create_module` and `exec_module`. The real loader is put back on the
+    module and its spec before the body runs, so nothing after the import
+    sees the wrapper."""
+
+    def __init__(self, loader, record, tracer):
+        self._loader = loader
+        self._record = record
+        self._tracer = tracer
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        create = getattr(self._loader, "create_module", None)
+        if create is None:
+            return None
+        t0 = perf_counter_ns()
+        try:
+            return create(spec)
+        finally:
+            self._record.create_ns = perf_counter_ns() - t0
+
+    def exec_module(self, module):
+        loader = self._loader
+        try:
+            module.__loader__ = loader
+            module.__spec__.loader = loader
+        except AttributeError:
+            pass
+        record = self._record
+        stack = self._tracer.stack()
+        stack.append(record)
+        t0 = perf_counter_ns()
+        try:
+            loader.exec_module(module)
+        finally:
+            record.exec_ns = perf_counter_ns() - t0
+            stack.pop()
+            if stack:
+                stack[-1].children_ns += record.cumulative_ns
+            self._tracer.records.append(record)
+
+
+class _TraceFinder:
+    """First `sys.meta_path` entry: asks the other finders in order, records
+    which one answered, and wraps the loader of the spec it returns."""
+
+    def __init__(self):
+        self.records = []
+        self._stacks = {}
+        self.started_ns = perf_counter_ns()
+
+    def stack(self):
+        ident = _thread.get_ident()
+        try:
+            return self._stacks[ident]
+        except KeyError:
+            stack = self._stacks[ident] = []
+            return stack
+
+    def find_spec(self, fullname, path=None, target=None):
+        depth = len(self.stack())
+        t0 = perf_counter_ns()
+        spec = None
+        served = None
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find = getattr(finder, "find_spec", None)
+            if find is None:
+                continue
+            spec = find(fullname, path, target)
+            if spec is not None:
+                served = finder
+                break
+        find_ns = perf_counter_ns() - t0
+        if spec is None:
+            return None  # the import system asks the others itself
+        loader = spec.loader
+        if loader is None or not hasattr(loader, "exec_module"):
+            return spec  # namespace portion / legacy loader: not timed
+        record = _Record(
+            fullname,
+            _type_name(served),
+            _type_name(loader),
+            depth,
+            find_ns,
+            _loaded_bytes(spec),
+        )
+        spec.loader = _TimedLoader(loader, record, self)
+        return spec
+
+    def invalidate_caches(self):
+        pass
+
+
+def _output_dir():
+    v = posix.environ.get(b"SERIOUS_PYTHON_IMPORT_PROFILE", b"").decode("utf-8")
+    if "/" in v:
+        return v
+    return posix.getcwd()
+
+
+_out_dir = None
+
+
+def enable():
+    """Start tracing imports in this interpreter (idempotent)."""
+    global _tracer, _out_dir
+    if _tracer is not None:
+        return
+    _out_dir = _output_dir()
+    _tracer = _TraceFinder()
+    sys.meta_path.insert(0, _tracer)
+    import atexit
+
+    atexit.register(dump)
+
+
+def report():
+    """Return the trace so far as a JSON-serializable dict."""
+    if _tracer is None:
+        return None
+    modules = [r.as_dict() for r in _tracer.records]
+    by_loader = {}
+    for r in modules:
+        agg = by_loader.setdefault(
+            r["loader"], {"modules": 0, "self_us": 0, "bytes": 0}
+        )
+        agg["modules"] += 1
+        agg["self_us"] += r["self_us"]
+        agg["bytes"] += r["bytes"]
+    return {
+        "version": 1,
+        "python": sys.version,
+        "elapsed_us": (perf_counter_ns() - _tracer.started_ns) // 1000,
+        "import_us": sum(r["cumulative_us"] for r in modules if r["depth"] == 0),
+        "by_loader": by_loader,
+        "modules": modules,
+    }
+
+
+def dump(directory=None):
+    """Write `sp_import_profile.json` and `sp_importtime.txt` to `directory`
+    (default: see module docstring). Returns the JSON path, or None if
+    tracing is off or the report could not be written."""
+    data = report()
+    if data is None:
+        return None
+    directory = directory or _out_dir
+    json_path = directory + "/" + _PROFILE_JSON
+    try:
+        import json
+
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        with open(directory + "/" + _PROFILE_TXT, "w", encoding="utf-8") as f:
+            f.write("import time: self [us] | cumulative | imported package\n")
+            for r in data["modules"]:
+                f.write(
+                    "import time: %9d | %10d | %s%s\n"
+                    % (r["self_us"], r["cumulative_us"], "  " * r["depth"], r["name"])
+                )
+    except Exception as e:
+        sys.stderr.write("SP_BOOTSTRAP import profile not written: %r\n" % (e,))
+        return None
+    return json_path
@@ -0,0 +1,328 @@
+"""serious_python Android lazy imports.
+
+Opt-in, enabled by `_sp_bootstrap.install()` when the app passes
+`SERIOUS_PYTHON_LAZY_IMPORTS` — a comma-separated list of module names —
+through `SeriousPython.run(environmentVariables: ...)`. An `import numpy` of a
+listed module then binds a module object without running the module: its body
+runs on the first attribute access (`numpy.array`), so a heavy import that is
+only needed on some screen stays out of time-to-first-frame.
+
+A pure-Python module is deferred the way `importlib.util.LazyLoader` does it:
+the module object is created as usual and its body runs in place on first
+use, so the object is the real module. Unlike `LazyLoader`, reading the
+attributes the import system itself checks (`__spec__`, `__name__`, ...)
+does not count as use, so a second `import numpy` elsewhere stays lazy. An
+extension module can't be deferred that way (`create_module` is what runs
+`PyInit`), so a listed module served by `ExtensionFileLoader` — including the
+relocated natives `_SorefFinder` resolves — is bound to a placeholder that
+imports the real module on first use and forwards every attribute to it;
+`sys.modules` then holds the real module.
+
+Only the listed names themselves are deferred. Importing a submodule
+(`import numpy.linalg`) or a name from one (`from numpy import array`) needs
+the module right away, as does anything that reads an attribute of it at
+import time.
+
+Which listed modules were actually materialized, when, by which attribute
+access, and how long running them took is in `report()`, and written as
+`sp_lazy_imports.json` on `dump()` — called at interpreter exit, and callable
+from app code (see `_sp_importtrace` for where the file goes). A module that
+is always materialized during startup gains nothing from being listed.
+"""
+
+import sys
+import posix
+import _thread
+from importlib.machinery import ExtensionFileLoader
+from time import perf_counter_ns
+
+_REPORT_JSON = "sp_lazy_imports.json"
+
+_finder = None
+_out_dir = None
+
+
+class _Entry:
+    __slots__ = ("name", "deferred", "materialized_ns", "attr", "load_ns")
+
+    def __init__(self, name):
+        self.name = name
+        self.deferred = False
+        self.materialized_ns = None
+        self.attr = None
+        self.load_ns = 0
+
+    def as_dict(self, started_ns):
+        at = self.materialized_ns
+        return {
+            "name": self.name,
+            "deferred": self.deferred,
+            "materialized": at is not None,
+            "at_ms": (at - started_ns) / 1e6 if at is not None else None,
+            "attr": self.attr,
+            "load_ms": self.load_ns / 1e6,
+        }
+
+
+_ModuleType = type(sys)
+
+# Read by the import system itself (a repeated `import x` checks
+# `x.__spec__._initializing`), so reading them must not run the module.
+_PASSTHROUGH = frozenset(("__class__", "__name__", "__spec__", "__loader__", "__package__"))
+
+
+class _LazyModule(_ModuleType):
+    """A deferred pure-Python module. The first other attribute access runs
+    its body in place and turns it into a plain module."""
+
+    def __getattribute__(self, attr):
+        if attr not in _PASSTHROUGH:
+            _finder.materialize_source(self, attr)
+        return _ModuleType.__getattribute__(self, attr)
+
+    def __setattr__(self, attr, value):
+        _finder.materialize_source(self, attr)
+        _ModuleType.__setattr__(self, attr, value)
+
+    def __delattr__(self, attr):
+        _finder.materialize_source(self, attr)
+        _ModuleType.__delattr__(self, attr)
+
+
+class _LazyNativeModule(_ModuleType):
+    """Stands in for a deferred extension module. The first other attribute
+    access imports the real module; every access is then forwarded to it."""
+
+    def __getattribute__(self, attr):
+        if attr in _PASSTHROUGH or not _ModuleType.__getattribute__(
+            self, "__dict__"
+        ).get("_sp_lazy_armed"):
+            return _ModuleType.__getattribute__(self, attr)
+        return getattr(_finder.materialize_native(self, attr), attr)
+
+    def __setattr__(self, attr, value):
+        if not _ModuleType.__getattribute__(self, "__dict__").get("_sp_lazy_armed"):
+            return _ModuleType.__setattr__(self, attr, value)
+        setattr(_finder.materialize_native(self, attr), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(_finder.materialize_native(self, attr), attr)
+
+
+class _LazySourceLoader:
+    """Creates the module with the real loader but leaves its body for later."""
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def create_module(self, spec):
+        create = getattr(self.loader, "create_module", None)
+        return create(spec) if create is not None else None
+
+    def exec_module(self, module):
+        module.__class__ = _LazyModule
+
+
+class _PendingSource:
+    """A deferred pure-Python module's real loader, and the lock its body runs
+    under: other threads wait on it, the running body re-enters it."""
+
+    __slots__ = ("loader", "lock", "initializing")
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.lock = _thread.RLock()
+        self.initializing = False
+
+
+class _LazyNativeLoader:
+    def create_module(self, spec):
+        return _LazyNativeModule(spec.name)
+
+    def exec_module(self, module):
+        module.__dict__["_sp_lazy_armed"] = True
+
+
+class _LazyFinder:
+    """`sys.meta_path` entry in front of the finders it defers for: asks
+    the ones after it for a listed module's spec and swaps in a lazy
+    loader."""
+
+    def __init__(self, names):
+        self.entries = {name: _Entry(name) for name in names}
+        self.started_ns = perf_counter_ns()
+        self._real = {}
+        self._pending = {}
+        self._loading = set()
+        self._lock = _thread.RLock()
+
+    def find_spec(self, fullname, path=None, target=None):
+        entry = self.entries.get(fullname)
+        if entry is None or fullname in self._loading or fullname in self._real:
+            return None
+        spec = self._find_after_self(fullname, path, target)
+        if spec is None or spec.loader is None:
+            return spec
+        loader = spec.loader
+        if isinstance(loader, ExtensionFileLoader):
+            # `create_module` is what runs PyInit: stand in a placeholder.
+            spec.loader = _LazyNativeLoader()
+        elif hasattr(loader, "exec_module"):
+            self._pending[fullname] = _PendingSource(loader)
+            spec.loader = _LazySourceLoader(loader)
+        else:
+            return spec  # legacy loader: imported eagerly
+        entry.deferred = True
+        return spec
+
+    def _find_after_self(self, fullname, path, target):
+        # Only the finders after this one: `_sp_importtrace`'s tracer, when on,
+        # sits in front and asks this finder in turn.
+        meta_path = sys.meta_path
+        try:
+            later = meta_path[meta_path.index(self) + 1 :]
+        except ValueError:
+            later = list(meta_path)
+        for finder in later:
+            find = getattr(finder, "find_spec", None)
+            if find is None:
+                continue
+            spec = find(fullname, path, target)
+            if spec is not None:
+                return spec
+        return None
+
+    def materialize_source(self, module, attr):
+        """Run the body of a deferred pure-Python module, in place.
+
+        Returns once the module is a plain one, or right away on the thread
+        that is running its body. The module stays lazy until the body has
+        run, so other threads wait here rather than see it half-initialized;
+        if the body raises, the module is put back as it was, lazy, and the
+        next access runs it again.
+        """
+        if _ModuleType.__getattribute__(module, "__class__") is not _LazyModule:
+            return
+        name = _ModuleType.__getattribute__(module, "__name__")
+        with self._lock:
+            pending = self._pending.get(name)
+        if pending is None:
+            return
+        with pending.lock:
+            if pending.initializing:
+                return  # this thread is running the body
+            if _ModuleType.__getattribute__(module, "__class__") is not _LazyModule:
+                return  # another thread ran it while this one waited
+            pending.initializing = True
+            namespace = _ModuleType.__getattribute__(module, "__dict__")
+            saved = dict(namespace)
+            spec = namespace["__spec__"]
+            lazy_loader = spec.loader
+            namespace["__loader__"] = spec.loader = pending.loader
+            entry = self.entries[name]
+            entry.attr = attr
+            entry.materialized_ns = t0 = perf_counter_ns()
+            try:
+                pending.loader.exec_module(module)
+            except BaseException:
+                namespace.clear()
+                namespace.update(saved)
+                spec.loader = lazy_loader
+                entry.materialized_ns = None
+                raise
+            finally:
+                entry.load_ns = perf_counter_ns() - t0
+                pending.initializing = False
+            _ModuleType.__setattr__(module, "__class__", _ModuleType)
+            with self._lock:
+                self._pending.pop(name, None)
+
+    def materialize_native(self, placeholder, attr):
+        """Import the extension module `placeholder` stands in for."""
+        name = _ModuleType.__getattribute__(placeholder, "__name__")
+        real = self._real.get(name)
+        if real is not None:
+            return real
+        with self._lock:
+            real = self._real.get(name)
+            if real is not None:
+                return real
+            entry = self.entries[name]
+            entry.attr = attr
+            entry.materialized_ns = t0 = perf_counter_ns()
+            self._loading.add(name)
+            if sys.modules.get(name) is placeholder:
+                del sys.modules[name]
+            try:
+                __import__(name)
+                real = sys.modules[name]
+            except BaseException:
+                sys.modules.setdefault(name, placeholder)
+                entry.materialized_ns = None
+                raise
+            finally:
+                self._loading.discard(name)
+            entry.load_ns = perf_counter_ns() - t0
+            self._real[name] = real
+            return real
+
+    def invalidate_caches(self):
+        pass
+
+
+def _output_dir():
+    v = posix.environ.get(b"SERIOUS_PYTHON_IMPORT_PROFILE", b"").decode("utf-8")
+    if "/" in v:
+        return v
+    return posix.getcwd()
+
+
+def enable(names):
+    """Defer the imports of `names` in this interpreter (idempotent)."""
+    global _finder, _out_dir
+    if _finder is not None:
+        return
+    names = [n for n in names if n]
+    if not names:
+        return
+    _out_dir = _output_dir()
+    _finder = _LazyFinder(names)
+    sys.meta_path.insert(0, _finder)
+    import atexit
+
+    atexit.register(dump)
+
+
+def report():
+    """Return the lazy modules' state as a JSON-serializable dict."""
+    if _finder is None:
+        return None
+    modules = [e.as_dict(_finder.started_ns) for e in _finder.entries.values()]
+    return {
+        "version": 1,
+        "elapsed_ms": (perf_counter_ns() - _finder.started_ns) / 1e6,
+        "materialized": sorted(m["name"] for m in modules if m["materialized"]),
+        "never_materialized": sorted(
+            m["name"] for m in modules if m["deferred"] and not m["materialized"]
+        ),
+        "modules": modules,
+    }
+
+
+def dump(directory=None):
+    """Write `sp_lazy_imports.json` to `directory` (default: where
+    `_sp_importtrace` writes its report). Returns the path, or None if lazy
+    imports are off or the report could not be written."""
+    data = report()
+    if data is None:
+        return None
+    path = (directory or _out_dir) + "/" + _REPORT_JSON
+    try:
+        import json
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+    except Exception as e:
+        sys.stderr.write("SP_BOOTSTRAP lazy import report not written: %r\n" % (e,))
+        return None
+    return path
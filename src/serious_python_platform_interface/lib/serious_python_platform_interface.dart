@@ -48,4 +48,10 @@ abstract class SeriousPythonPlatform extends PlatformInterface {
   void terminate() {
     // nothing to do
   }
+
+  /// Memory-pressure levels the host OS reports beyond what Flutter's
+  /// `didHaveMemoryPressure` carries: Android's `onTrimMemory` levels
+  /// (`ComponentCallbacks2.TRIM_MEMORY_*`), including those sent while no
+  /// activity is attached. Empty where the platform has none.
+  Stream<int> get memoryPressure => const Stream.empty();
 }